@@ -0,0 +1,39 @@
+"""added city search table
+
+Revision ID: b5fef56b29a4
+Revises: 688789f3e9a1
+Create Date: 2026-10-19 07:05:47.884890
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5fef56b29a4'
+down_revision: Union[str, None] = '688789f3e9a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Populated afterwards with `flask rebuild_search_index`, which strips the guide HTML
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE city_search ("
+            "eurostat_code VARCHAR(50) PRIMARY KEY REFERENCES cities (eurostat_code) ON DELETE CASCADE, "
+            "name TEXT NOT NULL, universities TEXT NOT NULL, guide TEXT NOT NULL, document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX ix_city_search_document ON city_search USING GIN (document)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE city_search USING fts5("
+            "eurostat_code UNINDEXED, name, universities, guide, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE city_search")
@@ -1,35 +1,46 @@
+import hmac
 import json
 import logging
 import os
 import re
-import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from functools import wraps
 from urllib.parse import quote_plus, urlencode
 
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
 from flask import Flask, jsonify, make_response, redirect, render_template, request, session, url_for
-from flask_mail import Mail, Message
+from flask_caching import Cache
+from flask_mail import Mail
 from flask.cli import with_appcontext
 import click
 from alembic.config import Config as AlembicConfig
 from alembic import command
 
 from data_manager import Config, DataManager
+from data_update import SOURCES as UPDATE_SOURCES, run_update
+from data_version import DataVersionWatcher, litefs_position
 from helpers import sanitize_filename
-from models import Feedback, User
+from http_cache import HttpCache
+from images import DEFAULT_WIDTH, ImageManifest
+from logging_setup import configure_logging
+from mail_outbox import MailOutbox, feedback_notification, waitlist_confirmation
+from models import City, User
+from ranking import DEFAULT_WEIGHTS, SUB_SCORES, normalize_weights
+from search_index import SearchIndexUnavailable
+from static_export import StaticExport
+from university_aggregates import FIELDS_OF_STUDY, AggregatesNotBuilt
+from user_sync import UserProfileSync
+from view_shapes import CITY_DETAIL_SHAPE, CITY_OVERVIEW_SHAPE, find_shape_drift
+from write_queue import WriteForwarder, WriteJournal, WriteQueue
 
 # Load environment variables from .env file for local development
 if os.environ.get('FLASK_ENV') != 'production':
     load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Configure logging; handlers run on a background thread, see logging_setup.py for the LOG_* settings
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -40,7 +51,43 @@ config = Config(
     SUPPORTED_LANGUAGES_FILE=os.environ.get('SUPPORTED_LANGUAGES_FILE', 'config/supported_languages.json'),
     DATABASE_URL=os.environ.get('DATABASE_URL', 'sqlite:///instance/cities.db')
 )
-data_manager = DataManager(config)
+
+# Values built by one gunicorn worker are shared with the others through a cachelib store on disk
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'FileSystemCache')
+app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR', 'instance/cache')
+app.config['CACHE_DEFAULT_TIMEOUT'] = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+app.config['CACHE_THRESHOLD'] = int(os.environ.get('CACHE_THRESHOLD', 2000))
+cache = Cache(app)
+data_manager = DataManager(config, cache_backend=cache.cache)
+
+def is_primary_region():
+    return os.environ.get('FLY_REGION') == os.environ.get('PRIMARY_REGION')
+
+# Feedback and waitlist writes are journaled and applied in batches off the request thread.
+# Replicas with WRITE_FORWARD_URL set use the journal as an outbox shipped to the primary instead.
+write_forward_url = os.environ.get('WRITE_FORWARD_URL')
+write_forward_token = os.environ.get('WRITE_FORWARD_TOKEN')
+if write_forward_url and not write_forward_token:
+    logger.warning("WRITE_FORWARD_URL is set without WRITE_FORWARD_TOKEN; writes are replayed to the primary instead")
+    write_forward_url = None
+write_queue = WriteQueue(
+    WriteJournal(os.environ.get('WRITE_JOURNAL_PATH', 'instance/write_journal.jsonl')),
+    database_manager=data_manager.database_manager,
+    forwarder=WriteForwarder(write_forward_url, write_forward_token)
+    if write_forward_url and not is_primary_region() else None
+)
+write_queue.start()
+
+user_sync = UserProfileSync(
+    data_manager.database_manager,
+    last_login_resolution=timedelta(minutes=int(os.environ.get('LAST_LOGIN_RESOLUTION_MINUTES', 60)))
+)
+
+# Anonymous landing and error pages are served from a pre-rendered export (see `flask export-static`)
+static_export = StaticExport(
+    os.environ.get('STATIC_EXPORT_DIR', 'instance/static_export'),
+    data_manager.database_manager
+)
 
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -52,22 +99,41 @@ app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER')
 
 mail = Mail(app)
 
+# Outgoing mail is journaled and sent by a background thread over a reused SMTP connection
+mail_outbox = MailOutbox(
+    app, mail,
+    WriteJournal(os.environ.get('MAIL_OUTBOX_PATH', 'instance/mail_outbox.jsonl')),
+    rate_per_second=float(os.environ.get('MAIL_RATE_LIMIT', 1.0))
+)
+
+def send_waitlist_confirmations(emails):
+    for email in emails:
+        mail_outbox.enqueue(**waitlist_confirmation(email))
+
+def send_feedback_notification(feedback):
+    mail_outbox.enqueue(**feedback_notification(os.environ['FEEDBACK_NOTIFY_EMAIL'], feedback))
+
+if app.config['MAIL_DEFAULT_SENDER']:
+    write_queue.add_listener('waitlist', send_waitlist_confirmations)
+    if os.environ.get('FEEDBACK_NOTIFY_EMAIL'):
+        write_queue.add_listener('feedback', send_feedback_notification)
+    mail_outbox.start()
+
 # Auth0 configuration
+# AUTH0_BASE_URL lets local runs point at a stand-in provider (see loadtest/oidc_stub.py)
+auth0_base_url = os.environ.get('AUTH0_BASE_URL', f"https://{os.environ.get('AUTH0_DOMAIN')}").rstrip('/')
 oauth = OAuth(app)
 auth0 = oauth.register(
     'auth0',
     client_id=os.environ.get('AUTH0_CLIENT_ID'),
     client_secret=os.environ.get('AUTH0_CLIENT_SECRET'),
-    api_base_url=f"https://{os.environ.get('AUTH0_DOMAIN')}",
+    api_base_url=auth0_base_url,
     client_kwargs={
         'scope': 'openid profile email',
     },
-    server_metadata_url=f'https://{os.environ.get("AUTH0_DOMAIN")}/.well-known/openid-configuration',
+    server_metadata_url=f'{auth0_base_url}/.well-known/openid-configuration',
 )
 
-def is_primary_region():
-    return os.environ.get('FLY_REGION') == os.environ.get('PRIMARY_REGION')
-
 def primary_region_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -78,6 +144,16 @@ def primary_region_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def queued_write(f):
+    # Only replayed to the primary when this replica cannot forward queued writes itself
+    replayed = primary_region_required(f)
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if write_queue.forwarder is not None:
+            return f(*args, **kwargs)
+        return replayed(*args, **kwargs)
+    return decorated_function
+
 @app.before_request
 def redirect_www():
     if request.headers.get('X-Forwarded-Proto', 'http') == 'https':
@@ -87,6 +163,35 @@ def redirect_www():
                 code=301
             )
 
+# Caches are dropped as soon as the data changes, including on replicas where LiteFS applies the primary's writes
+data_version_watcher = DataVersionWatcher(
+    data_manager.database_manager.fetch_read_model_fingerprint,
+    position=litefs_position(config.DATABASE_URL),
+    check_interval=float(os.environ.get('DATA_VERSION_CHECK_INTERVAL', 1.0))
+)
+
+@app.before_request
+def check_data_version():
+    data_version_watcher.check()
+
+# Cache-Control/Vary per route and 304s for unchanged pages, answered before the static export and the views
+http_cache = HttpCache(data_manager.database_manager)
+http_cache.init_app(app)
+
+data_version_watcher.add_listener(data_manager.invalidate)
+data_version_watcher.add_listener(http_cache.invalidate)
+data_version_watcher.add_listener(static_export.invalidate)
+
+@app.before_request
+def serve_static_export():
+    if request.method != 'GET' or request.path != '/' or 'user' in session:
+        return None
+    language = resolve_language(request.args.get('language'))
+    return static_export.response(f"index-{language}", request.headers.get('Accept-Encoding', ''))
+
+def resolve_language(language):
+    return language if language in data_manager.supported_languages else 'English'
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -100,18 +205,17 @@ def index():
     """ 
     Renders the landing page with a grid of cities.
     """
-    
-    cities_overview = data_manager.get_cities_overview()
-    selected_language = request.args.get('language', 'English')
-    supported_languages = data_manager.supported_languages
+    return render_template('index.html', **index_context(resolve_language(request.args.get('language'))))
 
-    if selected_language not in supported_languages:
-        selected_language = 'English'
-    
-    return render_template('index.html', 
-                           cities=cities_overview, 
-                           supported_languages=supported_languages, 
-                           selected_language=selected_language)
+def index_context(selected_language):
+    # Also used by benchmarks/run.py, so the benchmark renders the page with what the view passes
+    return {
+        'cities': data_manager.get_cities_overview(),
+        'supported_languages': data_manager.supported_languages,
+        'selected_language': selected_language,
+        'fields_of_study': FIELDS_OF_STUDY,
+        'strong_fields': data_manager.strong_fields.get(),
+    }
 
 @app.route('/city/<eurostat_code>')
 @login_required
@@ -123,28 +227,220 @@ def city_detail(eurostat_code):
     if city_full_details is None:
         return render_template('city_not_found.html', eurostat_code=eurostat_code), 404
     else:   
-        return render_template('city_detail.html', city=city_full_details)
+        similar_cities = data_manager.similar_cities(eurostat_code) or []
+        return render_template('city_detail.html', city=city_full_details, similar_cities=similar_cities)
+
+@app.route('/compare')
+@login_required
+def compare():
+    """
+    Renders a side-by-side comparison of the cities in ?codes=ES025C,DE001C,...
+    """
+    comparison = data_manager.compare_cities(codes_from_args())
+    if not comparison['cities']:
+        return render_template('city_not_found.html', city_name=request.args.get('codes', '')), 404
+    return render_template('compare.html', cities=comparison['cities'], missing=comparison['missing'])
+
+@app.route('/compare/data')
+@login_required
+def compare_data():
+    """
+    Detailed data of the cities in ?codes=ES025C,DE001C,... as JSON, in the requested order.
+    """
+    codes = codes_from_args()
+    if not codes:
+        return jsonify({"message": "No city codes provided"}), 400
+    return jsonify(data_manager.compare_cities(codes))
+
+def codes_from_args():
+    return [code for code in request.args.get('codes', '').split(',') if code.strip()]
+
+@app.route('/search')
+def search():
+    """
+    Ranked full-text search over city names, universities and guides.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"message": "No search query provided"}), 400
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    try:
+        results = data_manager.search_cities(query, limit=max(limit, 1))
+    except SearchIndexUnavailable as e:
+        logger.error("Search index missing: %s", e)
+        return jsonify({"message": "Search is not available right now"}), 503
+    except Exception as e:
+        logger.error("Error searching for '%s': %s", query, e)
+        return jsonify({"message": "An error occurred while searching"}), 500
+    return jsonify({"query": query, "results": results})
+
+def coordinates_from_args():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        return None
+    return lat, lon
+
+@app.route('/nearby/cities')
+def nearby_cities():
+    """
+    Cities within radius_km (default 100, at most 2000) of lat/lon, nearest first.
+    """
+    coordinates = coordinates_from_args()
+    if coordinates is None:
+        return jsonify({"message": "Valid lat and lon are required"}), 400
+    radius_km = min(max(request.args.get('radius_km', 100.0, type=float), 0.0), 2000.0)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    cities = data_manager.cities_within(*coordinates, radius_km=radius_km, limit=limit)
+    return jsonify({"radius_km": radius_km, "cities": cities})
+
+@app.route('/nearby/universities')
+def nearby_universities():
+    """
+    Universities closest to lat/lon, optionally within radius_km.
+    """
+    coordinates = coordinates_from_args()
+    if coordinates is None:
+        return jsonify({"message": "Valid lat and lon are required"}), 400
+    radius_km = request.args.get('radius_km', type=float)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    universities = data_manager.universities_near(*coordinates, limit=limit, radius_km=radius_km)
+    return jsonify({"universities": universities})
+
+@app.route('/nearby/cities/<eurostat_code>')
+def nearest_alternative_cities(eurostat_code):
+    """
+    The cities closest to a given city.
+    """
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    cities = data_manager.nearest_cities(eurostat_code, limit=limit)
+    if cities is None:
+        return jsonify({"message": f"City {eurostat_code} not found"}), 404
+    return jsonify({"eurostat_code": eurostat_code, "cities": cities})
+
+@app.route('/similar/cities/<eurostat_code>')
+def similar_cities(eurostat_code):
+    """
+    The cities most similar to a given city.
+    """
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    cities = data_manager.similar_cities(eurostat_code, limit=limit)
+    if cities is None:
+        return jsonify({"message": f"City {eurostat_code} not found"}), 404
+    return jsonify({"eurostat_code": eurostat_code, "cities": cities})
+
+@app.route('/trends/<eurostat_code>')
+def metric_trends(eurostat_code):
+    """
+    Yearly safety and public transport survey results of a city, from the metric history tables.
+    """
+    trends = data_manager.metric_trends(eurostat_code)
+    if trends is None:
+        return jsonify({"message": f"City {eurostat_code} not found"}), 404
+    return jsonify({"eurostat_code": eurostat_code, **trends})
+
+@app.route('/recommendations')
+def recommendations():
+    """
+    Cities matching the preferences given as query parameters, e.g.
+    /recommendations?monthly_budget=900&mean_jul_max=28&language=Spanish
+    """
+    preferences = {name: value for name, value in request.args.items() if name != 'limit'}
+    if not preferences:
+        return jsonify({"message": "No preferences provided"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    try:
+        cities = data_manager.recommend_cities(preferences, limit=limit)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"preferences": preferences, "cities": cities})
+
+@app.route('/fields')
+def fields_of_study():
+    """
+    Field-of-study keys and labels accepted by /fields/<field>/cities.
+    """
+    return jsonify({"fields": [{"field": field, "label": label} for field, (_, label) in FIELDS_OF_STUDY.items()]})
+
+@app.route('/fields/<field>/cities')
+def field_cities(field):
+    """
+    Cities with the most students in a field of study, e.g. /fields/med/cities
+    """
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    try:
+        cities = data_manager.cities_strong_in(field, limit=limit)
+    except AggregatesNotBuilt as e:
+        logger.warning("Field index missing: %s", e)
+        return jsonify({"message": "Field rankings are not available right now"}), 503
+    if cities is None:
+        return jsonify({"message": f"Unknown field of study: {field}"}), 404
+    return jsonify({"field": field, "cities": cities})
+
+@app.route('/weather/<category>/cities')
+def weather_cities(category):
+    """
+    Cities of a weather category (cold, mild or warm winters), e.g. /weather/warm/cities
+    """
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    cities = data_manager.cities_with_weather(category, limit=limit)
+    if cities is None:
+        return jsonify({"message": f"Unknown weather category: {category}"}), 404
+    return jsonify({"weather_category": category, "cities": cities})
+
+@app.route('/ranking')
+def ranking():
+    """
+    Cities ranked by moonScore with custom sub-score weights, e.g.
+    /ranking?language=Spanish&weight_affordability=3&weight_safety=2
+    Without weights, logged-in users get their saved weights and everyone else the default.
+    """
+    weights = {name: request.args[f'weight_{name}'] for name in SUB_SCORES if f'weight_{name}' in request.args}
+    if not weights and 'user' in session:
+        weights = data_manager.database_manager.fetch_ranking_weights(session['user']['user_id'])
+    language = request.args.get('language', 'English')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    try:
+        cities = data_manager.rank_cities(language, weights or None, limit=limit)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"language": language, "weights": weights or DEFAULT_WEIGHTS, "cities": cities})
+
+@app.route('/ranking/weights', methods=['POST'])
+@queued_write
+def save_ranking_weights():
+    if 'user' not in session:
+        return jsonify({"message": "Login required"}), 401
+    weights = request.get_json(silent=True)
+    if not isinstance(weights, dict):
+        return jsonify({"message": "Weights must be a JSON object"}), 400
+    try:
+        normalized = dict(zip(SUB_SCORES, normalize_weights(weights)))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        write_queue.enqueue('ranking_weights', {'auth0_id': session['user']['user_id'], 'weights': normalized})
+        return jsonify({"weights": normalized}), 200
+    except Exception as e:
+        logger.error("Error saving ranking weights: %s", e)
+        return jsonify({"message": "An error occurred while saving your weights"}), 500
 
 @app.route('/submit_feedback', methods=['POST'])
-@primary_region_required
+@queued_write
 def submit_feedback():
     content = request.json.get('feedback')
     if content:
-        with data_manager.database_manager.get_session() as db:
-            try:
-                new_feedback = Feedback(content=content, timestamp=datetime.utcnow())
-                db.add(new_feedback)
-                db.commit()
-                logger.info(f"Feedback submitted: {content[:50]}...")
-                return jsonify({"message": "Feedback submitted successfully"}), 200
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Error submitting feedback: {str(e)}")
-                return jsonify({"message": 'An error occurred while submitting your feedback'}), 500
+        try:
+            write_queue.enqueue('feedback', {'content': content, 'timestamp': datetime.utcnow().isoformat()})
+            logger.info("Feedback queued: %s...", content[:50])
+            return jsonify({"message": "Feedback submitted successfully"}), 200
+        except Exception as e:
+            logger.error("Error submitting feedback: %s", e)
+            return jsonify({"message": 'An error occurred while submitting your feedback'}), 500
     return jsonify({"message": "No feedback content provided"}), 400
 
 @app.route('/join_waitlist', methods=['POST'])
-@primary_region_required
+@queued_write
 def join_waitlist():
     data = request.json
     email = data.get('email')
@@ -157,24 +453,37 @@ def join_waitlist():
     if not email_regex.match(email):
         return jsonify({'success': False, 'message': 'Invalid email format'}), 400
     
-    with data_manager.database_manager.get_session() as db:
-        try:
-            existing_user = db.query(User).filter_by(email=email).first()
-            if existing_user:
+    try:
+        # Reading is cheap on any node; the authoritative dedup happens when the batch is applied
+        with data_manager.database_manager.get_session() as db:
+            if db.query(User.id).filter_by(email=email).first():
                 return jsonify({'success': False, 'message': 'This email is already registered'}), 400
 
-            new_user = User(email=email, auth0_id=f"waitlist_{email}")
-            db.add(new_user)
-            db.commit()
-            logger.info(f"New user added to waitlist: {email}")
-            return jsonify({'success': True, 'message': 'Successfully added to waitlist'}), 200
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error adding user to waitlist: {str(e)}")
-            return jsonify({'success': False, 'message': 'Error adding to waitlist'}), 500
+        write_queue.enqueue('waitlist', {'email': email})
+        logger.info("Waitlist signup queued: %s", email)
+        return jsonify({'success': True, 'message': 'Successfully added to waitlist'}), 200
+    except Exception as e:
+        logger.error("Error adding user to waitlist: %s", e)
+        return jsonify({'success': False, 'message': 'Error adding to waitlist'}), 500
+
+@app.route('/internal/writes', methods=['POST'])
+def accept_forwarded_writes():
+    token = os.environ.get('WRITE_FORWARD_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('X-Write-Forward-Token', ''), token):
+        return jsonify({"message": "Forbidden"}), 403
+    if not is_primary_region():
+        # Not replayed: the forwarder must see a failure and keep the batch
+        return jsonify({"message": "Not the primary region"}), 503
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('records'), list):
+        return jsonify({"message": "Expected a JSON object with a records list"}), 400
+    try:
+        accepted = write_queue.accept_forwarded(data['records'])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"accepted": accepted}), 202
 
 @app.route("/callback")
-@primary_region_required
 def callback():
     auth0.authorize_access_token()
     resp = auth0.get('userinfo')
@@ -184,29 +493,29 @@ def callback():
         "user_id": userinfo["sub"],
         "email": userinfo["email"],
         "name": userinfo['name'],
-        "picture": userinfo.get('picture',''),
-        "email_verified": userinfo.get('email_verified',False)
+        # Only what Auth0 sent, so the sync keeps stored values for fields it left out
+        **{field: userinfo[field] for field in ('picture', 'email_verified') if field in userinfo},
     }
 
-    # Create or update user in local database
-    with data_manager.database_manager.get_session() as db:
-        user = db.query(User).filter_by(auth0_id=userinfo["sub"]).first()
-        if not user:
-            user = User(
-                auth0_id=userinfo["sub"],
-                email=userinfo["email"],
-                name=userinfo['name'],
-                picture=userinfo.get("picture", ""),
-                email_verified=userinfo.get("email_verified", False)
-            )
-            db.add(user)
-        else:
-            user.name = userinfo['name']
-            user.picture = userinfo.get("picture", user.picture)
-            user.email_verified = userinfo.get("email_verified", user.email_verified)
-        user.last_login = datetime.utcnow()
-        db.commit()
+    # Most logins change nothing; only go to the primary when the stored user is out of date.
+    # The authorization code is single-use, so the replayed request is /sync_profile, not /callback.
+    if not is_primary_region():
+        if user_sync.needs_write(session["user"]):
+            return redirect(url_for('sync_profile'))
+    else:
+        user_sync.sync(session["user"])
+
+    return login_complete_response()
 
+@app.route("/sync_profile")
+@primary_region_required
+def sync_profile():
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    user_sync.sync(session["user"])
+    return login_complete_response()
+
+def login_complete_response():
     # Set user in sessionStorage and reload the page
     return """
     <script>
@@ -224,8 +533,7 @@ def login():
 def logout():
     session.clear()
     return redirect(
-        "https://"
-        + os.environ.get("AUTH0_DOMAIN")
+        auth0_base_url
         + "/v2/logout?"
         + urlencode(
             {
@@ -238,14 +546,33 @@ def logout():
 
 @app.errorhandler(404)
 def not_found_error(error):
+    exported = static_export.response('404', request.headers.get('Accept-Encoding', ''),
+                                      status=404, require_fresh=False)
+    if exported is not None:
+        return exported
     return render_template('404.html'), 404
 
 @app.errorhandler(500)
 def internal_error(error):
+    exported = static_export.response('500', request.headers.get('Accept-Encoding', ''),
+                                      status=500, require_fresh=False)
+    if exported is not None:
+        return exported
     return render_template('500.html'), 500
 
-# Make this function available in templates
-app.jinja_env.filters['sanitize_filename'] = sanitize_filename
+# Image URLs come from the precomputed City.image_slug and the manifest of files in static/images
+image_manifest = ImageManifest.scan(app.static_folder)
+
+def image_url(image_slug, width=DEFAULT_WIDTH):
+    return url_for('static', filename=image_manifest.filename(image_slug, width))
+
+def image_srcset(image_slug):
+    return ', '.join(
+        f"{url_for('static', filename=filename)} {width}w" for filename, width in image_manifest.sources(image_slug)
+    )
+
+app.jinja_env.globals['image_url'] = image_url
+app.jinja_env.globals['image_srcset'] = image_srcset
 
 @app.cli.command("db_upgrade")
 @with_appcontext
@@ -255,6 +582,158 @@ def db_upgrade():
     command.upgrade(alembic_cfg, "head")
     click.echo("Database schema updated.")
 
+@app.cli.command("refresh_read_model")
+@with_appcontext
+def refresh_read_model():
+    """Regenerate the materialized city payloads from the normalized tables."""
+    count = data_manager.refresh_city_read_model()
+    click.echo(f"City read model rebuilt for {count} cities.")
+
+@app.cli.command("refresh_university_aggregates")
+@with_appcontext
+def refresh_university_aggregates():
+    """Recompute the per-city university rollups, then the read model that embeds them."""
+    count = data_manager.refresh_university_aggregates()
+    data_manager.refresh_city_read_model()
+    click.echo(f"University aggregates rebuilt for {count} cities.")
+
+@app.cli.command("refresh_climate_summaries")
+@with_appcontext
+def refresh_climate_summaries():
+    """Recompute the packed temperatures and weather categories, then the read model that embeds them."""
+    count = data_manager.refresh_climate_summaries()
+    data_manager.refresh_city_read_model()
+    click.echo(f"Climate summaries rebuilt for {count} cities.")
+
+@app.cli.command("export-static")
+@with_appcontext
+def export_static():
+    """Pre-render the anonymous landing page per language and the error pages."""
+    manifest = export_static_pages()
+    click.echo(f"Exported {len(manifest['pages'])} pages to {static_export.directory}.")
+
+def export_static_pages():
+    def render_page(path, view):
+        def render():
+            with app.test_request_context(path):
+                return view()
+        return render
+
+    pages = {
+        f"index-{language}": render_page(f"/?{urlencode({'language': language})}", index)
+        for language in data_manager.supported_languages
+    }
+    pages['404'] = render_page('/', lambda: render_template('404.html'))
+    pages['500'] = render_page('/', lambda: render_template('500.html'))
+    return static_export.export(pages)
+
+@app.cli.group("data")
+def data_cli():
+    """Load external datasets into the database."""
+
+@data_cli.command("update")
+@click.option('--source', 'sources', multiple=True, type=click.Choice(sorted(UPDATE_SOURCES)),
+              help='Source to load; repeat for several. Defaults to all sources.')
+@click.option('--topic', 'topics', multiple=True,
+              help='Topic of the selected sources to load, e.g. safety; repeat for several. Defaults to all.')
+@click.option('--dry-run', is_flag=True, help='Show what would change without writing anything.')
+@click.option('--workers', type=int, help='Processes loading topics in parallel; one per topic by default.')
+@click.option('--no-export', is_flag=True, help='Do not re-render the static export after an update.')
+@with_appcontext
+def data_update(sources, topics, dry_run, workers, no_export):
+    """Run the ingestion pipelines of the selected sources and write what changed, one transaction per table."""
+    try:
+        report = run_update(data_manager, list(sources), list(topics), dry_run=dry_run, workers=workers)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    for diff in report.diffs.values():
+        click.echo(f"{diff.table}: {len(diff.inserts)} new rows, {len(diff.updates)} changed rows")
+        for row in diff.inserts:
+            click.echo(f"  + {row}")
+        for eurostat_code, changes in sorted(diff.updates.items()):
+            click.echo(f"  ~ {eurostat_code}: " + ', '.join(
+                f"{column} {old!r} -> {new!r}" for column, (old, new) in changes.items()
+            ))
+
+    if report.data_version is not None and not no_export:
+        start = time.perf_counter()
+        export_static_pages()
+        report.timings['export static pages'] = time.perf_counter() - start
+
+    click.echo("Pipelines:")
+    for result in report.sources:
+        if result.skipped:
+            click.echo(f"  {result.source}/{result.topic}: skipped, {result.skipped}")
+            continue
+        click.echo(f"  {result.source}/{result.topic}: " + ', '.join(
+            f"{timing.stage} {timing.seconds * 1000:.1f} ms"
+            + (f" ({timing.rows} rows)" if timing.rows is not None else '')
+            for timing in result.stages
+        ))
+    click.echo("Timings:")
+    for step, seconds in report.timings.items():
+        click.echo(f"  {step:<40} {seconds * 1000:>9.1f} ms")
+    if dry_run:
+        click.echo("Dry run, nothing written.")
+    elif report.data_version is None:
+        click.echo("No changes.")
+    else:
+        click.echo(f"Data version: {report.data_version}")
+
+@app.cli.command("rebuild_search_index")
+@click.option('--if-empty', is_flag=True, help='Only build the index if it has no data yet.')
+@with_appcontext
+def rebuild_search_index(if_empty):
+    """Re-index city names, universities and guides for full-text search."""
+    count = data_manager.database_manager.rebuild_search_index(only_if_empty=if_empty)
+    if count is None:
+        click.echo("Search index already populated, skipping.")
+    else:
+        click.echo(f"Search index rebuilt for {count} cities.")
+
+@app.cli.command("check_images")
+@with_appcontext
+def check_images():
+    """Check that every city has an image slug matching its name and a 640px image in static/images."""
+    with data_manager.database_manager.get_session() as db:
+        cities = db.query(City.eurostat_code, City.english_name, City.image_slug).all()
+    ok = True
+    for eurostat_code, english_name, image_slug in cities:
+        if image_slug != sanitize_filename(english_name):
+            ok = False
+            click.echo(f"{eurostat_code}: image_slug {image_slug!r} does not match {english_name!r}")
+    for image_slug in image_manifest.missing(image_slug for _, _, image_slug in cities if image_slug):
+        ok = False
+        click.echo(f"Missing image: static/{image_manifest.filename(image_slug)}")
+    for image_slug in image_manifest.unused(image_slug for _, _, image_slug in cities):
+        click.echo(f"Unused image: {image_slug}")
+    if not ok:
+        raise SystemExit(1)
+    click.echo(f"Images are in place for {len(cities)} cities.")
+
+@app.cli.command("check_view_shapes")
+@with_appcontext
+def check_view_shapes():
+    """Check that the city view shapes match what the enrich code reads."""
+    processor = data_manager.data_processor
+    views = {
+        'overview': (CITY_OVERVIEW_SHAPE, processor.enrich_overview),
+        'detail': (CITY_DETAIL_SHAPE, processor.enrich_full_details),
+    }
+    in_sync = True
+    for view, (shape, enrich) in views.items():
+        drift = find_shape_drift(shape, enrich)
+        for relation, column in sorted(drift['undeclared']):
+            in_sync = False
+            click.echo(f"{view}: reads undeclared {relation or 'city'}.{column}")
+        for relation, column in sorted(drift['unused']):
+            in_sync = False
+            click.echo(f"{view}: declares unused {relation or 'city'}.{column}")
+    if not in_sync:
+        raise SystemExit(1)
+    click.echo("View shapes are in sync.")
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8081))
     debug = os.environ.get('FLASK_DEBUG', False)
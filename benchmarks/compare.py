@@ -0,0 +1,51 @@
+"""
+Compares two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict, List
+
+
+def load_medians(path: str) -> Dict[int, Dict[str, float]]:
+    """
+    Loads median timings keyed by city count and operation.
+
+    Args:
+        path (str): Result file written by benchmarks.run.
+
+    Returns:
+        Dict[int, Dict[str, float]]: Median milliseconds per operation per size.
+    """
+    with open(path) as file:
+        report = json.load(file)
+    return {
+        size['cities']: {name: timing['median_ms'] for name, timing in size['operations'].items()}
+        for size in report['sizes']
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args(argv)
+
+    baseline = load_medians(args.baseline)
+    candidate = load_medians(args.candidate)
+
+    print(f"{'cities':>7}  {'operation':<28} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for n_cities in sorted(set(baseline) & set(candidate)):
+        for name in sorted(set(baseline[n_cities]) & set(candidate[n_cities])):
+            old: Any = baseline[n_cities][name]
+            new: Any = candidate[n_cities][name]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"{n_cities:>7}  {name:<28} {old:>10.2f}ms {new:>10.2f}ms {change:>+8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Times the data layer and page rendering against synthetic databases.
+
+Usage:
+    python -m benchmarks.run                       # 160, 2,000 and 20,000 cities
+    python -m benchmarks.run --sizes 160 2000 --repeat 10
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Each size runs in its own interpreter, because database.py binds its engine
+from DATABASE_URL at import time. Results are written to
+benchmarks/results/<commit>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [160, 2000, 20000]
+DETAIL_SAMPLE = 20
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Times a callable over several runs.
+
+    Args:
+        func (Callable[[], Any]): The operation to time.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        Dict[str, Any]: Summary statistics and raw samples in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'samples_ms': [round(sample, 3) for sample in samples],
+    }
+
+
+def run_size(n_cities: int, repeat: int, workdir: str) -> Dict[str, Any]:
+    """
+    Generates a database of the given size and times every benchmarked operation.
+
+    Must run in a fresh interpreter: it points DATABASE_URL and the config files
+    at the synthetic data before importing the app.
+
+    Args:
+        n_cities (int): Number of synthetic cities.
+        repeat (int): Number of timed runs per operation.
+        workdir (str): Directory for the database and input files.
+
+    Returns:
+        Dict[str, Any]: Timings keyed by operation name.
+    """
+    from benchmarks.synthetic import (generate_database, instance_environment, write_supported_cities,
+                                      write_urb_percep_csv)
+
+    with open(os.path.join(REPO_ROOT, 'config', 'supported_languages.json')) as file:
+        supported_languages = json.load(file)
+
+    database_url = f"sqlite:///{os.path.join(workdir, 'cities.db')}"
+    supported_cities_file = os.path.join(workdir, 'supported_cities.json')
+
+    start = time.perf_counter()
+    codes = generate_database(database_url, n_cities, supported_languages)
+    write_supported_cities(supported_cities_file, codes)
+    write_urb_percep_csv(workdir, codes)
+    generation_s = time.perf_counter() - start
+
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['DATA_DIR'] = workdir
+    os.environ['SUPPORTED_CITIES_FILE'] = supported_cities_file
+    os.environ.update(instance_environment(workdir))
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    from flask import render_template
+    import app as web
+    from data_update import run_update
+
+    data_manager = web.data_manager
+    sample_codes = codes[::max(1, len(codes) // DETAIL_SAMPLE)][:DETAIL_SAMPLE]
+    overview = data_manager.get_cities_overview()
+    data_manager.spatial_index.get()  # built once per data version, so time only the queries
+
+    index_context = web.index_context('English')
+
+    def render_index():
+        with web.app.test_request_context('/'):
+            render_template('index.html', **index_context)
+
+    def city_details():
+        for code in sample_codes:
+            data_manager.get_city_full_details(code)
+
+    operations = {
+        'get_cities_overview': data_manager.get_cities_overview,
+        'get_city_full_details': city_details,
+        'render_index': render_index,
+        'update_urb_percep_dry_run': lambda: run_update(data_manager, ['eurostat_urb_percep'], dry_run=True, workers=1),
+        'universities_near': lambda: data_manager.universities_near(48.14, 11.58, limit=10),
+        'cities_within_100km': lambda: data_manager.cities_within(48.14, 11.58, radius_km=100),
+    }
+
+    results = {name: time_call(func, repeat) for name, func in operations.items()}
+    results['get_city_full_details']['cities_per_run'] = len(sample_codes)
+    return {
+        'cities': n_cities,
+        'universities': n_cities * 4,
+        'overview_rows': len(overview or []),
+        'generation_s': round(generation_s, 3),
+        'operations': results,
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    """
+    Returns the current commit and whether the working tree has local changes.
+    """
+    def git(*args: str) -> str:
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {'commit': git('rev-parse', '--short', 'HEAD') or 'unknown', 'dirty': bool(git('status', '--porcelain'))}
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='City counts to benchmark.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per operation.')
+    parser.add_argument('--output', default=os.path.join(REPO_ROOT, 'benchmarks', 'results'),
+                        help='Directory for result files.')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        # app.py logs to stdout, so results travel through a file in the workdir
+        with open(os.path.join(args.workdir, 'result.json'), 'w') as file:
+            json.dump(run_size(args.worker, args.repeat, args.workdir), file)
+        return
+
+    revision = git_revision()
+    report = {
+        **revision,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'sizes': [],
+    }
+
+    for n_cities in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f'erasmoon-bench-{n_cities}-') as workdir:
+            print(f"Benchmarking {n_cities} cities...", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.run', '--worker', str(n_cities),
+                 '--repeat', str(args.repeat), '--workdir', workdir],
+                cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                env={**os.environ, 'FLASK_ENV': 'production'},
+            )
+            if completed.returncode != 0:
+                sys.stderr.write(completed.stderr)
+                raise SystemExit(f"Benchmark for {n_cities} cities failed.")
+            with open(os.path.join(workdir, 'result.json')) as file:
+                size_report = json.load(file)
+            report['sizes'].append(size_report)
+            for name, timing in size_report['operations'].items():
+                print(f"  {name:<28} median {timing['median_ms']:>10.2f} ms", file=sys.stderr)
+
+    os.makedirs(args.output, exist_ok=True)
+    suffix = '-dirty' if revision['dirty'] else ''
+    path = os.path.join(args.output, f"{revision['commit']}{suffix}.json")
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
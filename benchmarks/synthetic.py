@@ -0,0 +1,217 @@
+"""
+Generates synthetic erasmoon databases and Eurostat input files for benchmarking.
+
+The data follows the models.py schema and keeps the proportions of the
+production dataset: a handful of universities per city, one language row per
+country and supported language, and a linear Eurostat perception file with a
+few years of observations per indicator.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import string
+from itertools import product
+from typing import Dict, List
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import search_index
+from models import (Base, City, Climate, CostOfLiving, Guide, Housing, Language,
+                    Metrics, TransportBudget, University)
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+UNIVERSITIES_PER_CITY = 4
+CITIES_PER_COUNTRY = 50
+URB_PERCEP_INDICATORS = ['PS3290V', 'PS3291V', 'PS3300V', 'PS3301V', 'PS3514V',
+                         'PS3515V', 'PS3519V', 'PS3520V', 'PS1012V', 'PS1013V']
+URB_PERCEP_YEARS = [2015, 2019, 2023]
+
+
+def city_codes(n_cities: int) -> List[str]:
+    """
+    Builds valid Eurostat city codes ("AT001C") for the requested number of cities.
+
+    Args:
+        n_cities (int): Number of cities.
+
+    Returns:
+        List[str]: Eurostat codes, CITIES_PER_COUNTRY per country prefix.
+    """
+    prefixes = [''.join(pair) for pair in product(string.ascii_uppercase, repeat=2)]
+    return [f"{prefixes[i // CITIES_PER_COUNTRY]}{i % CITIES_PER_COUNTRY + 1:03d}C" for i in range(n_cities)]
+
+
+def generate_database(database_url: str, n_cities: int, supported_languages: List[str], seed: int = 42) -> List[str]:
+    """
+    Creates a fresh database filled with synthetic cities, their related rows and the search index.
+
+    Args:
+        database_url (str): SQLAlchemy URL of the database to create.
+        n_cities (int): Number of cities to generate.
+        supported_languages (List[str]): Languages to generate proficiency rows for.
+        seed (int): Random seed, so runs are comparable across commits.
+
+    Returns:
+        List[str]: Eurostat codes of the generated cities.
+    """
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        search_index.create_search_schema(connection)
+    codes = city_codes(n_cities)
+
+    with Session(engine) as session:
+        for code in codes:
+            country = f"Country {code[:2]}"
+            city = City(
+                eurostat_code=code,
+                local_name=f"Ciudad {code}",
+                english_name=f"City {code}",
+                local_country=country,
+                english_country=country,
+                country_emoji='🏳️',
+                population=rng.randint(80_000, 4_000_000),
+                erasmus_population=rng.randint(50, 12_000),
+                lat=round(rng.uniform(35.0, 65.0), 6),
+                lon=round(rng.uniform(-10.0, 30.0), 6),
+            )
+            winter = rng.randint(-8, 12)
+            city.climate = Climate(**{
+                f'mean_{month}_{kind}': winter + abs(6 - i) * -2 + 14 + (8 if kind == 'max' else 0)
+                for i, month in enumerate(MONTHS) for kind in ('min', 'max')
+            })
+            city.cost_of_living = CostOfLiving(
+                monthly_budget=rng.uniform(500, 1500),
+                cost_of_living_index=rng.uniform(30, 90),
+                rent_index=rng.uniform(10, 70),
+                cost_of_living_plus_rent_index=rng.uniform(25, 85),
+                groceries_index=rng.uniform(25, 90),
+                restaurant_price_index=rng.uniform(20, 90),
+                local_purchasing_power_index=rng.uniform(30, 120),
+            )
+            city.housing = Housing(
+                rent_per_sqm=rng.uniform(6, 30),
+                area_per_person=rng.uniform(15, 35),
+                erasmus_factor=rng.uniform(0.8, 1.4),
+            )
+            city.metrics = Metrics(
+                safety_index=rng.uniform(40, 95),
+                university_count=UNIVERSITIES_PER_CITY,
+                public_transport_satisfaction=rng.uniform(40, 95),
+            )
+            city.transport_budget = TransportBudget(source='synthetic', monthly_ticket=rng.uniform(10, 80))
+            city.guide = Guide(text=' '.join(rng.choices(_GUIDE_WORDS, k=600)))
+            for i in range(UNIVERSITIES_PER_CITY):
+                total_students = rng.randint(1_000, 60_000)
+                city.universities.append(University(
+                    erasmus_code=f"{code[:2]} {code}{i:02d}",
+                    name=f"Universidad {i} de {code}",
+                    english_name=f"University {i} of {code}",
+                    country_code=code[:2],
+                    category='University',
+                    standardized_category=1,
+                    size_class=rng.randint(1, 6),
+                    url=f"https://university-{i}.example/{code.lower()}",
+                    lat=round(rng.uniform(35.0, 65.0), 6),
+                    lon=round(rng.uniform(-10.0, 30.0), 6),
+                    total_students=total_students,
+                    mobile_students=rng.randint(0, total_students // 10),
+                    education_students=rng.randint(0, total_students // 8),
+                    arts_humanities_students=rng.randint(0, total_students // 8),
+                    social_sciences_students=rng.randint(0, total_students // 8),
+                    business_law_students=rng.randint(0, total_students // 8),
+                    it_students=rng.randint(0, total_students // 8),
+                    aec_students=rng.randint(0, total_students // 8),
+                    agriculture_vet_students=rng.randint(0, total_students // 8),
+                    med_students=rng.randint(0, total_students // 8),
+                    services_students=rng.randint(0, total_students // 8),
+                    women_share=rng.random(),
+                    foreign_share=rng.random() / 4,
+                    mobile_share=rng.random() / 10,
+                ))
+            session.add(city)
+
+        for country in sorted({f"Country {code[:2]}" for code in codes}):
+            for language in supported_languages:
+                session.add(Language(language=language, country=country, percentage=rng.random()))
+
+        session.flush()
+        search_index.rebuild(session)
+        session.commit()
+
+    engine.dispose()
+    return codes
+
+
+def write_supported_cities(path: str, codes: List[str]) -> None:
+    """
+    Writes a supported cities file in the format of config/supported_cities.json.
+
+    Args:
+        path (str): Destination file.
+        codes (List[str]): Eurostat codes to list.
+    """
+    with open(path, 'w') as file:
+        json.dump([
+            {'eurostat_code': code, 'name': f"Ciudad {code}", 'standard_english_name': f"City {code}"}
+            for code in codes
+        ], file)
+
+
+def write_urb_percep_csv(data_dir: str, codes: List[str], seed: int = 42) -> str:
+    """
+    Writes a synthetic Eurostat urb_percep linear CSV under data_dir/eurostat.
+
+    Args:
+        data_dir (str): Data directory used by DataLoader.
+        codes (List[str]): Eurostat codes to generate observations for.
+        seed (int): Random seed.
+
+    Returns:
+        str: Path of the written file.
+    """
+    rng = random.Random(seed)
+    eurostat_dir = os.path.join(data_dir, 'eurostat')
+    os.makedirs(eurostat_dir, exist_ok=True)
+    rows = [
+        ('ESTAT:URB_PERCEP(1.0)', indicator, code, year, round(rng.uniform(10, 60), 1))
+        for code in codes for indicator in URB_PERCEP_INDICATORS for year in URB_PERCEP_YEARS
+    ]
+    path = os.path.join(eurostat_dir, 'urb_percep_linear.csv')
+    pd.DataFrame(rows, columns=['DATAFLOW', 'indic_ur', 'cities', 'TIME_PERIOD', 'OBS_VALUE']).to_csv(path, index=False)
+    return path
+
+
+def instance_environment(workdir: str) -> Dict[str, str]:
+    """
+    Returns environment variables that keep the app's on-disk state under workdir.
+
+    Without them a benchmarked or load-tested app writes its cache, journals and
+    static export into the repository's instance/ directory, where runs against
+    different databases would share them.
+
+    Args:
+        workdir (str): Directory of the run.
+
+    Returns:
+        Dict[str, str]: CACHE_DIR, WRITE_JOURNAL_PATH, MAIL_OUTBOX_PATH and STATIC_EXPORT_DIR.
+    """
+    return {
+        'CACHE_DIR': os.path.join(workdir, 'cache'),
+        'WRITE_JOURNAL_PATH': os.path.join(workdir, 'write_journal.jsonl'),
+        'MAIL_OUTBOX_PATH': os.path.join(workdir, 'mail_outbox.jsonl'),
+        'STATIC_EXPORT_DIR': os.path.join(workdir, 'static_export'),
+    }
+
+
+_GUIDE_WORDS = (
+    'the city old town river university students cheap dorms nightlife beach surfing museums '
+    'tram bike cafes mountains festival market rent shared flat erasmus party cathedral harbour '
+    'park library campus train airport weekend trips food wine language exchange'
+).split()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import logging
+import math
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, insert
+
+from models import City, Climate, ClimateSummary
+
+logger = logging.getLogger(__name__)
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+WEATHER_CATEGORIES = ('cold', 'mild', 'warm')
+WINTER_SEMESTER = ('oct', 'nov', 'dec', 'jan', 'feb')
+SUMMER_SEMESTER = ('mar', 'apr', 'may', 'jun', 'jul')
+
+# temperatures holds 24 signed bytes: min and max of each month, January first
+PACKED_FORMAT = '24b'
+MISSING = -128
+
+# Scale of the temperature bars and their Spectral colour map
+TEMP_RANGE = (-11, 36)
+COLOR_STOPS = [
+    (94, 79, 162), (50, 136, 189), (102, 194, 165), (171, 221, 164), (230, 245, 152),
+    (255, 255, 191), (254, 224, 139), (253, 174, 97), (244, 109, 67), (213, 62, 79), (158, 1, 66),
+]
+GRADIENT_STEPS = 10
+
+
+def pack(temperatures: List[Optional[int]]) -> bytes:
+    """
+    Packs 24 monthly temperatures, clamped to -127..127 °C, with None stored as MISSING.
+    """
+    return struct.pack(PACKED_FORMAT, *[
+        MISSING if value is None else max(-127, min(127, int(round(value)))) for value in temperatures
+    ])
+
+
+def unpack(packed: bytes) -> List[Optional[int]]:
+    """
+    Reverses pack.
+    """
+    return [None if value == MISSING else value for value in struct.unpack(PACKED_FORMAT, packed)]
+
+
+def weather_category(winter_low: Optional[float]) -> str:
+    """
+    Classifies a city by its February minimum as used by the weather filter: 'cold', 'mild' or 'warm'.
+
+    Cities without a February minimum are 'mild', as the client-side filter treated them before.
+    """
+    if winter_low is None:
+        return 'mild'
+    if winter_low < 0:
+        return 'cold'
+    if winter_low > 5:
+        return 'warm'
+    return 'mild'
+
+
+def semester_mean(temperatures: List[Optional[int]], months: Tuple[str, ...]) -> Optional[float]:
+    """
+    Averages the monthly means ((min + max) / 2) of the months that have both values.
+    """
+    means = []
+    for month in months:
+        low, high = temperatures[2 * MONTHS.index(month)], temperatures[2 * MONTHS.index(month) + 1]
+        if low is not None and high is not None:
+            means.append((low + high) / 2)
+    return round(sum(means) / len(means), 1) if means else None
+
+
+def summarize(climate: Any) -> Dict[str, Any]:
+    """
+    Computes the ClimateSummary columns of a Climate row.
+
+    Args:
+        climate (Any): Climate model instance or row with mean_<month>_min/max attributes.
+
+    Returns:
+        Dict[str, Any]: Column values of the summary.
+    """
+    temperatures = [getattr(climate, f'mean_{month}_{kind}') for month in MONTHS for kind in ('min', 'max')]
+    return {
+        'eurostat_code': climate.eurostat_code,
+        'temperatures': pack(temperatures),
+        'winter_mean': semester_mean(temperatures, WINTER_SEMESTER),
+        'summer_mean': semester_mean(temperatures, SUMMER_SEMESTER),
+        'weather_category': weather_category(climate.mean_feb_min),
+    }
+
+
+def rebuild(session: Any) -> int:
+    """
+    Replaces the climate_summaries table with summaries of the climate table.
+
+    Args:
+        session (Session): Open transaction.
+
+    Returns:
+        int: Number of cities summarized.
+    """
+    rows = [summarize(climate) for climate in session.query(Climate)]
+    session.query(ClimateSummary).delete()
+    if rows:
+        session.execute(insert(ClimateSummary), rows)
+    logger.info("Rebuilt climate summaries for %s cities.", len(rows))
+    return len(rows)
+
+
+def fetch_cities(session: Any, category: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Returns the cities of a weather category, most Erasmus students first.
+
+    Args:
+        session (Session): Open session.
+        category (str): One of WEATHER_CATEGORIES.
+        limit (int): Maximum number of results.
+
+    Returns:
+        List[Dict[str, Any]]: Cities with their winter and summer semester means.
+    """
+    rows = session.query(
+        ClimateSummary.eurostat_code, City.english_name, City.english_country, City.country_emoji,
+        ClimateSummary.winter_mean, ClimateSummary.summer_mean,
+    ).join(City, City.eurostat_code == ClimateSummary.eurostat_code).filter(
+        ClimateSummary.weather_category == category
+    ).order_by(desc(City.erasmus_population)).limit(limit)
+    return [row._asdict() for row in rows]
+
+
+def temp_bar(low: Optional[int], high: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Lays out a temperature bar on the TEMP_RANGE scale.
+
+    Args:
+        low (Optional[int]): Low end in °C.
+        high (Optional[int]): High end in °C.
+
+    Returns:
+        Optional[Dict[str, Any]]: low, high, left and width (percent of the scale) and the CSS
+            gradient of the bar, or None if either end is missing.
+    """
+    if low is None or high is None:
+        return None
+    scale = TEMP_RANGE[1] - TEMP_RANGE[0]
+    stops = ', '.join(
+        f"rgb({','.join(map(str, _color(low + (high - low) * step / GRADIENT_STEPS)))}) "
+        f"{step * 100 // GRADIENT_STEPS}%"
+        for step in range(GRADIENT_STEPS + 1)
+    )
+    return {
+        'low': low,
+        'high': high,
+        'left': round((low - TEMP_RANGE[0]) / scale * 100, 2),
+        'width': round((high - low) / scale * 100, 2),
+        'gradient': f"linear-gradient(to right, {stops})",
+    }
+
+
+def to_payload(summary: Any) -> Dict[str, Any]:
+    """
+    Turns a ClimateSummary row into the dict stored in the city detail payload.
+    """
+    temperatures = unpack(summary.temperatures)
+    return {
+        'temperatures': temperatures,
+        'winter_mean': summary.winter_mean,
+        'summer_mean': summary.summer_mean,
+        'weather_category': summary.weather_category,
+        'months': [
+            {'month': month, 'bar': temp_bar(temperatures[2 * index], temperatures[2 * index + 1])}
+            for index, month in enumerate(MONTHS)
+        ],
+    }
+
+
+def to_overview_payload(summary: Any) -> Dict[str, Any]:
+    """
+    Returns the weather category and the February low to July high bar shown on a city card.
+    """
+    temperatures = unpack(summary.temperatures)
+    return {
+        'weather_category': summary.weather_category,
+        'temp_bar': temp_bar(temperatures[2 * MONTHS.index('feb')], temperatures[2 * MONTHS.index('jul') + 1]),
+    }
+
+
+def _color(temp: float) -> Tuple[int, int, int]:
+    position = max(0.0, min((temp - TEMP_RANGE[0]) / (TEMP_RANGE[1] - TEMP_RANGE[0]), 1.0)) * (len(COLOR_STOPS) - 1)
+    lower, upper = math.floor(position), math.ceil(position)
+    fraction = position - lower
+    return tuple(
+        math.floor(low + fraction * (high - low) + 0.5) for low, high in zip(COLOR_STOPS[lower], COLOR_STOPS[upper])
+    )
@@ -2,21 +2,46 @@ from __future__ import annotations
 
 import os
 import json
-import pandas as pd
+import hashlib
+import uuid
 import logging
-from sqlalchemy.orm import joinedload
+from cachelib import BaseCache
 from sqlalchemy import desc
-from models import City, Metrics, Language
+from models import City, CityReadModel, DataVersion, Language, User
 from database import SessionLocal
+from view_shapes import CITY_DETAIL_SHAPE, CITY_OVERVIEW_SHAPE
+import climate_summaries
+import metrics_history
+import search_index
+import university_aggregates
+from data_version import VersionedValue
+from ranking import RankingEngine, DEFAULT_WEIGHTS, SUB_SCORES, normalize_weights
+from recommendations import RecommendationEngine
+from shared_cache import SharedCache
+from spatial_index import SpatialIndex
 from contextlib import contextmanager
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 import re
 from sqlalchemy import func
-from datetime import date
+from datetime import date, datetime
+from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+MAX_COMPARED_CITIES = 6
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Serializes the non-JSON types found in enriched city payloads.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 @dataclass
 class Config:
     DATA_DIR: str
@@ -56,10 +81,10 @@ class DataLoader:
             with open(self.supported_languages_file, 'r') as file:
                 return json.load(file)
         except FileNotFoundError:
-            logging.error(f"Supported languages file not found: {self.supported_languages_file}")
+            logger.error("Supported languages file not found: %s", self.supported_languages_file)
             return []
         except json.JSONDecodeError as e:
-            logging.error(f"Error decoding JSON from {self.supported_languages_file}: {e}")
+            logger.error("Error decoding JSON from %s: %s", self.supported_languages_file, e)
             return []
 
     def load_supported_cities(self) -> List[str]:
@@ -74,145 +99,31 @@ class DataLoader:
                 cities = json.load(file)
                 return [city['eurostat_code'] for city in cities]
         except FileNotFoundError:
-            logging.error(f"Supported cities file not found: {self.supported_cities_file}")
+            logger.error("Supported cities file not found: %s", self.supported_cities_file)
             return []
         except json.JSONDecodeError as e:
-            logging.error(f"Error decoding JSON from {self.supported_cities_file}: {e}")
+            logger.error("Error decoding JSON from %s: %s", self.supported_cities_file, e)
             return []
 
-    def import_eurostat_urb_percep(self, topic: str = None) -> pd.DataFrame:
-        """
-        Imports Eurostat data for a given topic or all topics if no topic is specified.
-
-        Args:
-            topic (str): The topic to import.
-
-        Returns:
-            pd.DataFrame: The Eurostat data with one row per city.
-        """
-        def fallbacks(group):
-            for pair in indicator_pairs:
-                pair_data = group[group['indic_ur'].isin(pair)]
-                if len(pair_data) == 2:
-                    return pair_data['OBS_VALUE'].sum()
-            return None
-        
-        file_path = os.path.join(self.data_dir, 'eurostat', 'urb_percep_linear.csv')
-        
-        # Initialize an empty DataFrame
-        result_df = pd.DataFrame({'eurostat_code': self.supported_cities})
-        
-        if topic == 'safety' or topic is None:
-            safety_indicators = ['PS3290V', 'PS3291V', 'PS3300V', 'PS3301V', 'PS3514V', 'PS3515V', 'PS3519V', 'PS3520V']
-            safety_df = self._load_eurostat_linear_csv(file_path, safety_indicators)
-
-            if not safety_df.empty:
-                # Define indicator pairs in order of preference
-                indicator_pairs = [('PS3514V', 'PS3515V'), ('PS3290V', 'PS3291V'), 
-                                   ('PS3519V', 'PS3520V'), ('PS3300V', 'PS3301V')]
-
-                # Apply fallbacks to each group
-                safety_data = safety_df.groupby('cities').apply(fallbacks).reset_index()
-                
-                safety_data.columns = ['eurostat_code', 'safety_index']
-                safety_data['safety_index'] = safety_data['safety_index'].round(1)
-
-                # Merge with result_df
-                result_df = result_df.merge(safety_data, on='eurostat_code', how='left')
-            else:
-                # If no data was found, add an empty 'safety_index' column
-                result_df['safety_index'] = None
-                logging.warning("No safety data found for any city.")
-    
-        if topic == 'public_transport' or topic is None:
-            public_transport_indicators = ['PS1012V', 'PS1013V']
-            public_transport_df = self._load_eurostat_linear_csv(file_path, public_transport_indicators)
-
-            if not public_transport_df.empty:
-                # Sum the values for both indicators for each city
-                public_transport_data = public_transport_df.groupby('cities')['OBS_VALUE'].sum().reset_index()
-                public_transport_data = public_transport_data.rename(columns={'cities': 'eurostat_code', 'OBS_VALUE': 'public_transport_satisfaction'})
-                public_transport_data['public_transport_satisfaction'] = public_transport_data['public_transport_satisfaction'].round(1)
-
-                # Merge with result_df
-                result_df = result_df.merge(public_transport_data, on='eurostat_code', how='left')
-            else:
-                # If no data was found, add an empty 'public_transport_satisfaction' column
-                result_df['public_transport_satisfaction'] = None
-                logging.warning("No public transport data found for any city.")
-
-        # Sort the result DataFrame by eurostat_code
-        result_df = result_df.sort_values('eurostat_code').reset_index(drop=True)
-        
-        # Remove rows where only eurostat_code is present (all other columns are null)
-        result_df = result_df.dropna(subset=result_df.columns.difference(['eurostat_code']), how='all')
-        
-        return result_df
-
-    def _load_eurostat_linear_csv(self, file_path: str, indicators: List[str] = None) -> pd.DataFrame:
-        """
-        Loads Eurostat linear data from a CSV file.
-        """
-        try:
-            df = pd.read_csv(file_path)
-            # Ensure the DataFrame has the expected columns
-            expected_columns = ['DATAFLOW', 'indic_ur', 'cities', 'TIME_PERIOD', 'OBS_VALUE']
-            df = df[expected_columns]
-            
-            # Filter the DataFrame for the specified indicators
-            if indicators:
-                df = df[df['indic_ur'].isin(indicators)]
-
-            # Create a set of supported cities and countries for faster lookup
-            supported_cities_set = set(self.supported_cities)
-            supported_countries_set = {city[:2] for city in self.supported_cities}
-            
-            # Use numpy's vectorized operations for filtering
-            mask = df['cities'].isin(supported_cities_set) | (df['cities'].isin(supported_countries_set))
-            df = df[mask]
-            
-            # Convert the TIME_PERIOD column to datetime
-            df['TIME_PERIOD'] = pd.to_datetime(df['TIME_PERIOD'], format='%Y')
-            
-            # Convert the OBS_VALUE column to numeric, coercing errors to NaN
-            df['OBS_VALUE'] = pd.to_numeric(df['OBS_VALUE'], errors='coerce')
-            
-            # Drop rows with missing values in OBS_VALUE
-            df = df.dropna(subset=['OBS_VALUE'])
-
-            # Group by cities and indic_ur, then sort within each group by TIME_PERIOD
-            # to get the newest value for each indicator for each city
-            df = df.sort_values(['cities', 'indic_ur', 'TIME_PERIOD'], ascending=[True, True, False])
-            # Keep only the first (newest) row for each city-indicator combination
-            df = df.groupby(['cities', 'indic_ur']).first().reset_index()
-            
-            return df
-
-        except FileNotFoundError as e:
-            logging.error(f"File not found: {e.filename}")
-            return pd.DataFrame()
-        except pd.errors.ParserError as e:
-            logging.error(f"Error parsing CSV file {file_path}: {e}")
-            return pd.DataFrame()
-        except pd.errors.EmptyDataError:
-            logging.error(f"Eurostat linear file is empty {file_path}")
-            return pd.DataFrame()
-        except Exception as e:
-            logging.error(f"Error loading Eurostat linear file {file_path}: {e}")
-            return pd.DataFrame()
-
 class DataManager:
     """
     Coordinates data loading, processing, and database interactions.
     """
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, cache_backend: Optional[BaseCache] = None):
         """
         Initializes the DataManager with configuration settings.
 
             Args:
             config (Config): Configuration object.
+            cache_backend (Optional[BaseCache]): Store shared between worker processes; nothing is
+                cached across requests if None.
         """
         self.database_manager = DatabaseManager(session_factory=SessionLocal)
+        self.cache = SharedCache(
+            cache_backend,
+            version=self.database_manager.fetch_read_model_fingerprint,
+            namespace=hashlib.sha256(config.DATABASE_URL.encode()).hexdigest()[:16]
+        )
         self.data_loader = DataLoader(
             data_dir=config.DATA_DIR,
             supported_languages_file=config.SUPPORTED_LANGUAGES_FILE,
@@ -225,6 +136,27 @@ class DataManager:
             supported_languages=self.supported_languages
         )
 
+        self.spatial_index = VersionedValue(
+            'spatial index',
+            build=self.database_manager.load_spatial_index,
+            version=self.database_manager.fetch_read_model_fingerprint
+        )
+        self.recommendation_engine = VersionedValue(
+            'recommendation engine',
+            build=lambda: self.database_manager.load_recommendation_engine(self.supported_languages),
+            version=self.database_manager.fetch_read_model_fingerprint
+        )
+        self.strong_fields = VersionedValue(
+            'strong fields',
+            build=self.database_manager.fetch_strong_fields,
+            version=self.database_manager.fetch_read_model_fingerprint
+        )
+        self.ranking_engine = VersionedValue(
+            'ranking engine',
+            build=lambda: RankingEngine(self.get_cities_overview() or [], self.supported_languages),
+            version=self.database_manager.fetch_read_model_fingerprint
+        )
+
     def get_cities_overview(self) -> Optional[List[Dict[str, Any]]]:
         """
         Retrieves enriched general data for all cities for index.html.
@@ -232,9 +164,9 @@ class DataManager:
         Returns:
             Optional[List[Dict[str, Any]]]: List of enriched cities or None if not found.
         """
-        return self.database_manager.fetch_cities_overview(
+        return self.cache.get_or_build('cities_overview', lambda: self.database_manager.fetch_cities_overview(
             data_processor=self.data_processor
-        )
+        ))
     
     def get_city_full_details(self, eurostat_code: str) -> Optional[Dict[str, Any]]:
         """
@@ -248,27 +180,288 @@ class DataManager:
         """
         sanitized_eurostat_code = self.sanitize_eurostat_code(eurostat_code)
         if sanitized_eurostat_code is None:
-            logging.warning(f"Invalid eurostat_code provided: {eurostat_code}")
+            logger.warning("Invalid eurostat_code provided: %s", eurostat_code)
             return None
 
-        return self.database_manager.fetch_city_full_details(
-            eurostat_code=sanitized_eurostat_code,
-            data_processor=self.data_processor
+        return self.cache.get_or_build(
+            f'city_details:{sanitized_eurostat_code}',
+            lambda: self.database_manager.fetch_city_full_details(
+                eurostat_code=sanitized_eurostat_code,
+                data_processor=self.data_processor
+            )
         )
 
-    def update_eurostat_urb_percep(self, topic: str = None) -> pd.DataFrame:
+    def compare_cities(self, eurostat_codes: List[str]) -> Dict[str, Any]:
         """
-        Updates the Eurostat data for a given topic or all topics if no topic is specified.
+        Retrieves detailed data for several cities side by side for compare.html.
 
         Args:
-            topic (str): The topic to update.
-    
+            eurostat_codes (List[str]): Eurostat codes of the cities, in display order.
+                Duplicates are dropped and at most MAX_COMPARED_CITIES are kept.
+
+        Returns:
+            Dict[str, Any]: 'cities' with the detailed data of the found cities in the requested
+                order, and 'missing' with the codes that are invalid or unknown.
+        """
+        sanitized = [(code, self.sanitize_eurostat_code(code)) for code in eurostat_codes]
+        valid = list(dict.fromkeys(code for _, code in sanitized if code is not None))[:MAX_COMPARED_CITIES]
+        # Warm cities come from the same cache entries as the detail page; the rest are loaded in one batch
+        details = self.cache.get_many_or_build(
+            {code: f'city_details:{code}' for code in valid},
+            lambda missing: self.database_manager.fetch_cities_full_details(
+                eurostat_codes=missing,
+                data_processor=self.data_processor
+            )
+        )
+        return {
+            'cities': [details[code] for code in valid if code in details],
+            'missing': [code for code, valid_code in sanitized if valid_code is None]
+                       + [code for code in valid if code not in details],
+        }
+
+    def refresh_derived_data(self) -> str:
+        """
+        Rebuilds the university aggregates, climate summaries and the read model after source data changed.
+
+        The data version is bumped once, after all three rebuilds, so other processes never
+        cache the new aggregates together with the old read model; caches are then invalidated once.
+
+        Returns:
+            str: The new data version (read model fingerprint).
+        """
+        self.database_manager.rebuild_university_aggregates(bump=False)
+        self.database_manager.rebuild_climate_summaries(bump=False)
+        self.database_manager.rebuild_city_read_model(data_processor=self.data_processor, bump=False)
+        self.database_manager.bump_data_version()
+        self.invalidate()
+        return self.database_manager.fetch_read_model_fingerprint()
+
+    def refresh_university_aggregates(self) -> int:
+        """
+        Recomputes the per-city university rollups read by the detail page and field-of-study filters.
+
+        Run it before refresh_city_read_model, which copies the rollups into the detail payloads.
+
+        Returns:
+            int: Number of cities with universities.
+        """
+        count = self.database_manager.rebuild_university_aggregates()
+        self.cache.invalidate()
+        return count
+
+    def refresh_climate_summaries(self) -> int:
+        """
+        Recomputes the packed temperatures, semester means and weather categories of every city.
+
+        Run it before refresh_city_read_model, which copies the summaries into the city payloads.
+
+        Returns:
+            int: Number of cities summarized.
+        """
+        count = self.database_manager.rebuild_climate_summaries()
+        self.cache.invalidate()
+        return count
+
+    def refresh_city_read_model(self) -> int:
+        """
+        Regenerates the materialized city payloads served to the index and detail pages.
+
+        Returns:
+            int: Number of cities written to the read model.
+        """
+        count = self.database_manager.rebuild_city_read_model(data_processor=self.data_processor)
+        self.cache.invalidate()
+        return count
+
+    def search_cities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Finds cities whose names, universities or guide match a free-text query.
+
+        Args:
+            query (str): Free-text query.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Ranked results with highlighted snippets.
+        """
+        return self.database_manager.search_cities(query, limit)
+
+    def cities_within(self, lat: float, lon: float, radius_km: float, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Finds the cities within a distance of a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            radius_km (float): Search radius in kilometres.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Cities with their distance_km, nearest first.
+        """
+        return self.spatial_index.get().cities_within(lat, lon, radius_km, limit)
+
+    def universities_near(self, lat: float, lon: float, limit: int = 10,
+                          radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Finds the universities closest to a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            limit (int): Maximum number of results.
+            radius_km (Optional[float]): Optional search radius in kilometres.
+
+        Returns:
+            List[Dict[str, Any]]: Universities with their distance_km, nearest first.
+        """
+        return self.spatial_index.get().universities_near(lat, lon, limit, radius_km)
+
+    def nearest_cities(self, eurostat_code: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Finds the alternative cities closest to a city.
+
+        Args:
+            eurostat_code (str): Eurostat code of the city.
+            limit (int): Maximum number of results.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Nearest other cities, or None if the city is unknown.
+        """
+        sanitized_eurostat_code = self.sanitize_eurostat_code(eurostat_code)
+        if sanitized_eurostat_code is None:
+            logger.warning("Invalid eurostat_code provided: %s", eurostat_code)
+            return None
+        return self.spatial_index.get().nearest_cities(sanitized_eurostat_code, limit)
+
+    def similar_cities(self, eurostat_code: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Finds the cities most similar to a city in budget, climate, safety, transport and language.
+
+        Args:
+            eurostat_code (str): Eurostat code of the city.
+            limit (int): Maximum number of results.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Most similar cities first, or None if the city is unknown.
+        """
+        sanitized_eurostat_code = self.sanitize_eurostat_code(eurostat_code)
+        if sanitized_eurostat_code is None:
+            logger.warning("Invalid eurostat_code provided: %s", eurostat_code)
+            return None
+        return self.recommendation_engine.get().similar(sanitized_eurostat_code, limit)
+
+    def recommend_cities(self, preferences: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Finds the cities that best match a set of preferences.
+
+        Args:
+            preferences (Dict[str, Any]): Feature names (e.g. monthly_budget, mean_jul_max,
+                safety_index) or 'language'/'language_min' mapped to preferred values.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Best matches first.
+
+        Raises:
+            ValueError: If a preference is unknown or not a number.
+        """
+        engine = self.recommendation_engine.get()
+        return engine.matching(engine.normalize_preferences(preferences), limit)
+
+    def cities_strong_in(self, field: str, limit: int = 20) -> Optional[List[Dict[str, Any]]]:
+        """
+        Finds the cities with the most students in a field of study.
+
+        Args:
+            field (str): Field key, e.g. 'med', 'it' or 'arts_humanities'.
+            limit (int): Maximum number of results.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Cities by rank in the field, or None if the field is unknown.
+
+        Raises:
+            AggregatesNotBuilt: If the university aggregates were never built.
+        """
+        if field not in university_aggregates.FIELDS_OF_STUDY:
+            logger.warning("Invalid field of study provided: %s", field)
+            return None
+        return self.cache.get_or_build(
+            f'field_ranking:{field}:{limit}', lambda: self.database_manager.fetch_field_ranking(field, limit)
+        )
+
+    def cities_with_weather(self, category: str, limit: int = 20) -> Optional[List[Dict[str, Any]]]:
+        """
+        Finds the cities of a weather category.
+
+        Args:
+            category (str): 'cold', 'mild' or 'warm', by February minimum temperature.
+            limit (int): Maximum number of results.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Cities with their semester means, most Erasmus students
+                first, or None if the category is unknown.
+        """
+        if category not in climate_summaries.WEATHER_CATEGORIES:
+            logger.warning("Invalid weather category provided: %s", category)
+            return None
+        return self.cache.get_or_build(
+            f'weather_cities:{category}:{limit}',
+            lambda: self.database_manager.fetch_weather_cities(category, limit),
+        )
+
+    def metric_trends(self, eurostat_code: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the safety and public transport history of a city from the metric history tables.
+
+        Args:
+            eurostat_code (str): Eurostat code of the city.
+
+        Returns:
+            Optional[Dict[str, Any]]: 'trends' per Metrics column and 'indicators' per survey
+                indicator, as [{'period', 'value'}] oldest first, or None if the code is invalid.
+        """
+        sanitized_eurostat_code = self.sanitize_eurostat_code(eurostat_code)
+        if sanitized_eurostat_code is None:
+            logger.warning("Invalid eurostat_code provided: %s", eurostat_code)
+            return None
+        return self.cache.get_or_build(
+            f'metric_trends:{sanitized_eurostat_code}',
+            lambda: metrics_history.to_trends(self.database_manager.fetch_metric_history(sanitized_eurostat_code)),
+        )
+
+    def rank_cities(self, language: str, weights: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Ranks the cities by moonScore with custom sub-score weights.
+
+        With the default weights this reproduces the moonScore shown on the landing page.
+
+        Args:
+            language (str): Supported language used for the language sub-score.
+            weights (Optional[Dict[str, Any]]): Sub-score names (popularity, affordability, safety,
+                public_transport, language) mapped to non-negative weights; the default weights if None.
+            limit (Optional[int]): Maximum number of results; all cities if None.
+
         Returns:
-            pd.DataFrame: The updated Eurostat data.
+            List[Dict[str, Any]]: Cities with moon_score and sub-scores, best first.
+
+        Raises:
+            ValueError: If the language is not supported or the weights are invalid.
         """
-        urb_percep_df = self.data_loader.import_eurostat_urb_percep(topic)
-        self.database_manager.update_metrics_db(urb_percep_df)
+        engine = self.ranking_engine.get()
+        if not engine.supports(language):
+            raise ValueError(f"Unsupported language: {language}")
+        return engine.ranked(language, normalize_weights(weights or DEFAULT_WEIGHTS), limit)
 
+    def invalidate(self) -> None:
+        """
+        Drops every cached value derived from the data: the shared city payload cache and the
+        in-process spatial index, recommendation engine, field index and ranking engine.
+        """
+        for value in (self.spatial_index, self.recommendation_engine, self.strong_fields, self.ranking_engine):
+            value.invalidate()
+        self.cache.invalidate()
 
     @staticmethod
     def sanitize_eurostat_code(eurostat_code: str) -> Optional[str]:
@@ -295,7 +488,7 @@ class DataManager:
         Closes any resources held by DataManager.
         """
         self.database_manager.close()
-        logging.info("DataManager resources have been released.")
+        logger.info("DataManager resources have been released.")
 
 
 class DatabaseManager:
@@ -326,9 +519,9 @@ class DatabaseManager:
             session.commit()
         except Exception as e:
             session.rollback()
-            logger.error(f"Database connection error: {str(e)}")
-            logger.error(f"Current working directory: {os.getcwd()}")
-            logger.error(f"Files in current directory: {os.listdir('.')}")
+            logger.error("Database connection error: %s", e)
+            logger.error("Current working directory: %s", os.getcwd())
+            logger.error("Files in current directory: %s", os.listdir('.'))
             raise
         finally:
             session.close()
@@ -345,14 +538,17 @@ class DatabaseManager:
         """
         try:
             with self.get_session() as session:
+                materialized = session.query(CityReadModel.overview).order_by(CityReadModel.position).all()
+                if materialized:
+                    return [json.loads(overview) for (overview,) in materialized]
+
+                logger.warning("City read model is empty, enriching overview data live.")
                 cities = session.query(City).options(
-                    joinedload(City.climate),
-                    joinedload(City.cost_of_living),
-                    joinedload(City.metrics),
+                    *CITY_OVERVIEW_SHAPE.query_options()
                 ).order_by(desc(City.erasmus_population)).all()
 
                 if not cities:
-                    logging.warning("No cities found in the database.")
+                    logger.warning("No cities found in the database.")
                     return []
 
                 enriched_overviews = []
@@ -360,14 +556,14 @@ class DatabaseManager:
                     try:
                         enriched = data_processor.enrich_overview(city)
                         enriched_overviews.append(enriched)
-                        logging.debug(f"Enriched data for city: {city.eurostat_code}")
+                        logger.debug("Enriched data for city: %s", city.eurostat_code)
                     except Exception as e:
-                        logging.error(f"Error enriching city {city.eurostat_code}: {e}")
+                        logger.error("Error enriching city %s: %s", city.eurostat_code, e)
 
-                logging.info(f"Successfully enriched overview data for {len(enriched_overviews)} cities.")
+                logger.info("Successfully enriched overview data for %s cities.", len(enriched_overviews))
                 return enriched_overviews
         except Exception as e:
-            logging.error(f"Error retrieving enriched cities for index: {e}")
+            logger.error("Error retrieving enriched cities for index: %s", e)
             return None
 
     def fetch_city_full_details(self, eurostat_code: str, data_processor: DataProcessor) -> Optional[Dict[str, Any]]:
@@ -383,75 +579,328 @@ class DatabaseManager:
         """
         try:
             with self.get_session() as session:
-                logging.info(f"Attempting to fetch city with eurostat_code: {eurostat_code}")
+                materialized = session.get(CityReadModel, eurostat_code)
+                if materialized is not None:
+                    return json.loads(materialized.detail)
+
+                logger.debug("Attempting to fetch city with eurostat_code: %s", eurostat_code)
                 city = session.query(City).options(
-                    joinedload(City.climate),
-                    joinedload(City.cost_of_living),
-                    joinedload(City.guide),
-                    joinedload(City.housing),
-                    joinedload(City.metrics),
-                    joinedload(City.universities)
+                    *CITY_DETAIL_SHAPE.query_options()
                 ).filter(City.eurostat_code == eurostat_code).one_or_none()
 
                 if city is None:
-                    logging.warning(f"City with eurostat_code {eurostat_code} not found in the database.")
+                    logger.warning("City with eurostat_code %s not found in the database.", eurostat_code)
                     return None
 
-                logging.info(f"City found: {city.english_name} ({city.eurostat_code})")
+                logger.debug("City found: %s (%s)", city.english_name, city.eurostat_code)
 
                 # Enrich the city with detailed data
                 try:
                     enriched_city_details = data_processor.enrich_full_details(city)
-                    logging.info(f"Successfully enriched data for city: {city.english_name}")
+                    logger.debug("Successfully enriched data for city: %s", city.english_name)
                     return enriched_city_details
                 except Exception as enrich_error:
-                    logging.error(f"Error enriching city data for {city.english_name}: {enrich_error}")
+                    logger.error("Error enriching city data for %s: %s", city.english_name, enrich_error)
                     return None
 
         except Exception as e:
-            logging.error(f"Error retrieving city detail for {eurostat_code}: {e}")
+            logger.error("Error retrieving city detail for %s: %s", eurostat_code, e)
             return None
     
-    def update_metrics_db(self, df: pd.DataFrame):
+    def fetch_cities_full_details(self, eurostat_codes: List[str],
+                                  data_processor: DataProcessor) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieves detailed data for several cities in a constant number of queries.
+
+        Materialized payloads are read in one IN query. Cities missing from the
+        read model are loaded in one more IN query, with universities fetched by
+        a single selectin query, and enriched like fetch_city_full_details does.
+
+        Args:
+            eurostat_codes (List[str]): Eurostat codes of the cities.
+            data_processor (DataProcessor): Instance for data enrichment.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Detailed city data keyed by eurostat_code; unknown cities are left out.
+        """
+        details = {}
+        try:
+            with self.get_session() as session:
+                materialized = session.query(CityReadModel.eurostat_code, CityReadModel.detail).filter(
+                    CityReadModel.eurostat_code.in_(eurostat_codes)
+                )
+                details = {code: json.loads(detail) for code, detail in materialized}
+
+                missing = [code for code in eurostat_codes if code not in details]
+                if not missing:
+                    return details
+
+                logger.info("Enriching %s cities missing from the read model", len(missing))
+                cities = session.query(City).options(
+                    *CITY_DETAIL_SHAPE.query_options(selectin=('universities',))
+                ).filter(City.eurostat_code.in_(missing)).all()
+                for city in cities:
+                    try:
+                        details[city.eurostat_code] = data_processor.enrich_full_details(city)
+                    except Exception as enrich_error:
+                        logger.error("Error enriching city data for %s: %s", city.english_name, enrich_error)
+                return details
+
+        except Exception as e:
+            logger.error("Error retrieving city details for %s: %s", ', '.join(eurostat_codes), e)
+            return details
+
+    def rebuild_university_aggregates(self, bump: bool = True) -> int:
         """
-        Updates the Metrics table with new data from a DataFrame.
-        Only updates the fields that are present in the DataFrame.
+        Replaces the city_university_stats table with fresh rollups of the universities table.
 
         Args:
-            df (pd.DataFrame): The DataFrame containing the Eurostat data to update.
+            bump (bool): Bump the data version in the same transaction.
+
+        Returns:
+            int: Number of cities with universities.
         """
         with self.get_session() as session:
-            for _, row in df.iterrows():
-                eurostat_code = row['eurostat_code']
-                existing_record = session.query(Metrics).filter_by(eurostat_code=eurostat_code).first()
-                
-                if existing_record:
-                    # Update existing record
-                    for column, value in row.items():
-                        if column != 'eurostat_code' and hasattr(existing_record, column):
-                            setattr(existing_record, column, value)
-                    existing_record.last_updated = date.today()  # Update the last_updated timestamp
-                else:
-                    # Create new record with only the data present in the DataFrame
-                    new_record_data = {column: value for column, value in row.items() if column != 'eurostat_code'}
-                    new_record_data['eurostat_code'] = eurostat_code
-                    new_record = Metrics(**new_record_data)
-                    session.add(new_record)
-            
-            try:
-                session.commit()
-            except Exception as e:
-                session.rollback()
-                logging.error(f"Error committing changes to Metrics table: {e}")
-                raise
-    
-        
+            count = university_aggregates.rebuild(session)
+            if bump:
+                self._bump_data_version(session)
+            return count
+
+    def rebuild_climate_summaries(self, bump: bool = True) -> int:
+        """
+        Replaces the climate_summaries table with summaries of the climate table.
+
+        Args:
+            bump (bool): Bump the data version in the same transaction.
+
+        Returns:
+            int: Number of cities summarized.
+        """
+        with self.get_session() as session:
+            count = climate_summaries.rebuild(session)
+            if bump:
+                self._bump_data_version(session)
+            return count
+
+    def fetch_weather_cities(self, category: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Reads the cities of a weather category from the climate_summaries index.
+
+        Args:
+            category (str): Weather category.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Cities with their semester means.
+        """
+        with self.get_session() as session:
+            return climate_summaries.fetch_cities(session, category, limit)
+
+    def fetch_field_ranking(self, field: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Reads the top cities of a field of study from the city_field_stats index.
+
+        Args:
+            field (str): Field key.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Cities by rank in the field.
+        """
+        with self.get_session() as session:
+            return university_aggregates.fetch_field_ranking(session, field, limit)
+
+    def fetch_strong_fields(self) -> Dict[str, List[str]]:
+        """
+        Reads the fields of study each city ranks highly in.
+
+        Returns:
+            Dict[str, List[str]]: Field keys keyed by eurostat_code.
+        """
+        with self.get_session() as session:
+            return university_aggregates.fetch_strong_fields(session)
+
+    def fetch_metric_history(self, eurostat_code: str) -> Dict[str, Dict[int, float]]:
+        """
+        Reads the latest revision of every survey observation of a city.
+
+        Args:
+            eurostat_code (str): Eurostat code of the city.
+
+        Returns:
+            Dict[str, Dict[int, float]]: Values by year, keyed by indicator code.
+        """
+        with self.get_session() as session:
+            return metrics_history.fetch_history(session, eurostat_code)
+
+    def rebuild_city_read_model(self, data_processor: 'DataProcessor', bump: bool = True) -> int:
+        """
+        Replaces the city_read_model table with freshly enriched overview and detail payloads.
+
+        The whole table is rewritten in one transaction, so readers see either the
+        old or the new payloads, never a mix.
+
+        Args:
+            data_processor (DataProcessor): Instance for data enrichment.
+            bump (bool): Bump the data version in the same transaction.
+
+        Returns:
+            int: Number of cities written.
+        """
+        data_processor.language_data = self.fetch_language_data()
+        with self.get_session() as session:
+            cities = session.query(City).options(
+                *CITY_DETAIL_SHAPE.query_options()
+            ).order_by(desc(City.erasmus_population)).all()
+
+            rows = []
+            for position, city in enumerate(cities):
+                try:
+                    overview = data_processor.enrich_overview(city)
+                    detail = data_processor.enrich_full_details(city)
+                except Exception as e:
+                    logger.error("Leaving %s out of the read model: %s", city.eurostat_code, e)
+                    continue
+                rows.append(CityReadModel(
+                    eurostat_code=city.eurostat_code,
+                    position=position,
+                    overview=json.dumps(overview, default=_json_default),
+                    detail=json.dumps(detail, default=_json_default),
+                ))
+
+            session.query(CityReadModel).delete()
+            session.add_all(rows)
+            if bump:
+                self._bump_data_version(session)
+
+        logger.info("Rebuilt city read model with %s cities.", len(rows))
+        return len(rows)
+
+    def search_cities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Runs a ranked full-text search against the city search index.
+
+        Args:
+            query (str): Free-text query.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Ranked results with highlighted snippets.
+        """
+        with self.get_session() as session:
+            return search_index.search(session, query, limit)
+
+    def rebuild_search_index(self, only_if_empty: bool = False) -> Optional[int]:
+        """
+        Re-indexes every city for full-text search, creating the search table if it is missing.
+
+        Args:
+            only_if_empty (bool): Skip the rebuild if the index already has data.
+
+        Returns:
+            Optional[int]: Number of cities indexed, or None if skipped.
+        """
+        with self.get_session() as session:
+            search_index.create_search_schema(session.connection())
+            if only_if_empty and not search_index.is_empty(session):
+                return None
+            return search_index.rebuild(session)
+
+    def load_spatial_index(self) -> SpatialIndex:
+        """
+        Loads the city and university coordinates into a SpatialIndex.
+
+        Returns:
+            SpatialIndex: Index over every located city and university.
+        """
+        with self.get_session() as session:
+            return SpatialIndex.load(session)
+
+    def load_recommendation_engine(self, supported_languages: List[str]) -> RecommendationEngine:
+        """
+        Builds a RecommendationEngine from the current city data.
+
+        Args:
+            supported_languages (List[str]): Languages that get a feature column.
+
+        Returns:
+            RecommendationEngine: The engine.
+        """
+        language_data = self.fetch_language_data()
+        with self.get_session() as session:
+            return RecommendationEngine.load(session, language_data, supported_languages)
+
+    def fetch_ranking_weights(self, auth0_id: str) -> Optional[Dict[str, float]]:
+        """
+        Fetches the moonScore ranking weights a user saved.
+
+        Args:
+            auth0_id (str): Auth0 user id.
+
+        Returns:
+            Optional[Dict[str, float]]: Sub-score weights, or None if the user has not saved any.
+        """
+        columns = [getattr(User, f'weight_{name}') for name in SUB_SCORES]
+        with self.get_session() as session:
+            row = session.query(*columns).filter(User.auth0_id == auth0_id).first()
+        if row is None or all(weight is None for weight in row):
+            return None
+        return {name: weight or 0.0 for name, weight in zip(SUB_SCORES, row)}
+
+    def fetch_read_model_fingerprint(self) -> str:
+        """
+        Returns a cheap fingerprint of the city read model that changes whenever it is rebuilt.
+
+        Returns:
+            str: The instance id and counter of the data_version row.
+        """
+        return self.fetch_read_model_version()[0]
+
+    def fetch_read_model_version(self) -> Tuple[str, Optional[datetime]]:
+        """
+        Returns the read model fingerprint together with the time it was last rebuilt.
+
+        Returns:
+            Tuple[str, Optional[datetime]]: Fingerprint as in fetch_read_model_fingerprint and
+                the time of the last rebuild, or None if there was none.
+        """
+        with self.get_session() as session:
+            row = session.query(DataVersion.instance_id, DataVersion.version, DataVersion.last_updated).first()
+        if row is None:
+            return '0', None
+        return f"{row.instance_id}:{row.version}", row.last_updated
+
+    def bump_data_version(self) -> None:
+        """
+        Moves the data_version counter on by one in a transaction of its own.
+        """
+        with self.get_session() as session:
+            self._bump_data_version(session)
+
+    @staticmethod
+    def _bump_data_version(session) -> None:
+        """
+        Moves the data_version counter on by one.
+
+        Unlike a timestamp, the counter tells apart rebuilds made within the same second. The row
+        is created with a random instance id, which tells apart databases whose counters happen to match.
+
+        Args:
+            session (Session): The transaction that rebuilds derived data.
+        """
+        data_version = session.query(DataVersion).first()
+        if data_version is None:
+            session.add(DataVersion(id=1, version=1, instance_id=uuid.uuid4().hex))
+        else:
+            data_version.version += 1
+            data_version.instance_id = data_version.instance_id or uuid.uuid4().hex
+
     def close(self):
         """
         Closes the DatabaseManager and cleans up resources.
         """
         # If any persistent connections or resources are held, close them here
-        logging.info("DatabaseManager has been closed.")
+        logger.info("DatabaseManager has been closed.")
 
     def fetch_language_data(self) -> Dict[str, Dict[str, float]]:
         """
@@ -506,6 +955,7 @@ class DataProcessor:
                 'local_country': city.local_country,
                 'english_country': city.english_country,
                 'country_emoji': city.country_emoji,
+                'image_slug': city.image_slug,
                 'population': city.population,
                 'erasmus_population': city.erasmus_population,
                 'monthly_budget': self._round_to_euro(getattr(city.cost_of_living, 'monthly_budget', None)),
@@ -515,28 +965,32 @@ class DataProcessor:
                 'safety_index': getattr(city.metrics, 'safety_index', None),
                 'university_count': getattr(city.metrics, 'university_count', None),
                 'public_transport_satisfaction': getattr(city.metrics, 'public_transport_satisfaction', None),
+                'weather_category': climate_summaries.weather_category(None),
+                'temp_bar': None,
             }
+            if city.climate_summary is not None:
+                enriched_city.update(climate_summaries.to_overview_payload(city.climate_summary))
 
             # Add language proficiency data with error handling
             try:
                 enriched_city['language_percentages'] = self._compute_language_proficiency(city)
             except TypeError as te:
-                logging.error(f"TypeError in _compute_language_proficiency for city {city.english_name}: {te}")
+                logger.error("TypeError in _compute_language_proficiency for city %s: %s", city.english_name, te)
                 enriched_city['language_percentages'] = {}
             except Exception as e:
-                logging.error(f"Unexpected error in _compute_language_proficiency for city {city.english_name}: {e}")
+                logger.error("Unexpected error in _compute_language_proficiency for city %s: %s", city.english_name, e)
                 enriched_city['language_percentages'] = {}
 
             return enriched_city
 
         except AttributeError as ae:
-            logging.error(f"AttributeError in enrich_overview for city {city.english_name}: {ae}")
+            logger.error("AttributeError in enrich_overview for city %s: %s", city.english_name, ae)
             raise
         except TypeError as te:
-            logging.error(f"TypeError in enrich_overview for city {city.english_name}: {te}")
+            logger.error("TypeError in enrich_overview for city %s: %s", city.english_name, te)
             raise
         except Exception as e:
-            logging.error(f"Unexpected error in enrich_overview for city {city.english_name}: {e}")
+            logger.error("Unexpected error in enrich_overview for city %s: %s", city.english_name, e)
             raise
 
     def enrich_full_details(self, city: Any) -> Dict[str, Any]:
@@ -550,20 +1004,17 @@ class DataProcessor:
             Dict[str, Any]: Dictionary containing enriched city data for detail.
         """
         try:
-            logging.info(f"Starting to enrich full details for city: {city.english_name}")
+            logger.debug("Starting to enrich full details for city: %s", city.english_name)
             
             # First, get the general data
             enriched_city = self.enrich_overview(city)
-            logging.debug("Successfully enriched overview data")
+            logger.debug("Successfully enriched overview data")
 
-            # Add climate data
-            climate_data = {}
-            for month in ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']:
-                climate_data[f'mean_{month}_min'] = getattr(city.climate, f'mean_{month}_min', None)
-                climate_data[f'mean_{month}_max'] = getattr(city.climate, f'mean_{month}_max', None)
-            
-            enriched_city.update(climate_data)
-            logging.debug("Successfully added climate data")
+            # Add the climate summary computed when the climate data was loaded
+            enriched_city['climate'] = (
+                climate_summaries.to_payload(city.climate_summary) if city.climate_summary is not None else None
+            )
+            logger.debug("Successfully added climate data")
 
             # Add detailed fields
             try:
@@ -574,16 +1025,16 @@ class DataProcessor:
                     monthly_budget=getattr(city.cost_of_living, 'monthly_budget', None),
                     rent_index=getattr(city.cost_of_living, 'rent_index', None)
                 )
-                logging.debug(f"Computed rent budget: {rent_budget}")
+                logger.debug("Computed rent budget: %s", rent_budget)
             except Exception as e:
-                logging.error(f"Error computing rent budget: {e}")
+                logger.error("Error computing rent budget: %s", e)
                 rent_budget = None
 
             try:
                 groceries_budget = self._compute_groceries_budget(getattr(city.cost_of_living, 'groceries_index', None))
-                logging.debug(f"Computed groceries budget: {groceries_budget}")
+                logger.debug("Computed groceries budget: %s", groceries_budget)
             except Exception as e:
-                logging.error(f"Error computing groceries budget: {e}")
+                logger.error("Error computing groceries budget: %s", e)
                 groceries_budget = None
 
             enriched_city.update({
@@ -596,32 +1047,31 @@ class DataProcessor:
                 'housing': {
                     'rent_per_sqm': getattr(city.housing, 'rent_per_sqm', None),
                 },
+                'university_stats': (
+                    university_aggregates.to_payload(city.university_stats)
+                    if city.university_stats is not None else None
+                ),
             })
-            logging.debug("Successfully added detailed fields")
+            logger.debug("Successfully added detailed fields")
 
             # Process universities
             try:
                 enriched_city['universities'] = self._process_universities(city.universities)
-                logging.debug("Successfully processed universities")
+                logger.debug("Successfully processed universities")
             except Exception as e:
-                logging.error(f"Error processing universities: {e}")
+                logger.error("Error processing universities: %s", e)
                 enriched_city['universities'] = []
 
             return enriched_city
 
         except AttributeError as ae:
-            logging.error(f"AttributeError in enrich_full_details for city {city.english_name}: {ae}")
+            logger.error("AttributeError in enrich_full_details for city %s: %s", city.english_name, ae)
             raise
         except TypeError as te:
-            logging.error(f"TypeError in enrich_full_details for city {city.english_name}: {te}")
-            # Log all attributes
-            for attr in dir(city):
-                if not attr.startswith('_'):
-                    value = getattr(city, attr)
-                    logging.error(f"Type of {attr}: {type(value)}, Value: {value}")
+            logger.error("TypeError in enrich_full_details for city %s: %s", city.english_name, te)
             raise
         except Exception as e:
-            logging.error(f"Unexpected error in enrich_full_details for city {city.english_name}: {e}")
+            logger.error("Unexpected error in enrich_full_details for city %s: %s", city.english_name, e)
             raise
 
     def _compute_language_proficiency(self, city: Any) -> Dict[str, Optional[float]]:
@@ -643,11 +1093,11 @@ class DataProcessor:
                     if skill is not None and language in self.supported_languages:
                         language_percentages[language] = skill * 100  # skill is a float between 0 and 1
             else:
-                logging.warning(f"Language data for country {city.english_country} not found.")
+                logger.warning("Language data for country %s not found.", city.english_country)
         except KeyError as ke:
-            logging.error(f"KeyError in _compute_language_proficiency for city {city.english_name}: {ke}")
+            logger.error("KeyError in _compute_language_proficiency for city %s: %s", city.english_name, ke)
         except Exception as e:
-            logging.error(f"Unexpected error in _compute_language_proficiency for city {city.english_name}: {e}")
+            logger.error("Unexpected error in _compute_language_proficiency for city %s: %s", city.english_name, e)
 
         return language_percentages
 
@@ -670,7 +1120,7 @@ class DataProcessor:
         elif monthly_budget:
             return int(round(monthly_budget * 0.6))
         else:
-            logging.warning("No parameters provided to compute rent budget.")
+            logger.warning("No parameters provided to compute rent budget.")
             return 0
 
     def _compute_groceries_budget(self, groceries_index):
@@ -722,7 +1172,7 @@ class DataProcessor:
                     'total_students': getattr(uni, 'total_students', None),
                 })
             except Exception as e:
-                logging.error(f"Error processing university {uni.name}: {e}")
+                logger.error("Error processing university %s: %s", uni.name, e)
                 continue
         
         return sorted(processed_unis, key=lambda x: x['size_class'], reverse=True)
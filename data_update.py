@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import insert, update
+
+import search_index
+from ingestion import SOURCES, SourceContext, SourceResult, run_source
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TableDiff:
+    """
+    Changes an update makes to one table.
+
+    Attributes:
+        table (str): Table name.
+        key (str): Primary key column.
+        inserts (List[Dict[str, Any]]): New rows.
+        updates (Dict[Any, Dict[str, Tuple[Any, Any]]]): Changed columns as (old, new), keyed by primary key.
+    """
+    table: str
+    key: str
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: Dict[Any, Dict[str, Tuple[Any, Any]]] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.updates)
+
+
+@dataclass
+class UpdateReport:
+    """
+    Outcome of a data update.
+
+    Attributes:
+        diffs (Dict[str, TableDiff]): Changes per table.
+        sources (List[SourceResult]): Per-stage timings and row counts of every source topic,
+            without their frames.
+        timings (Dict[str, float]): Seconds per step of the whole update, in execution order.
+        data_version (Optional[str]): Read model fingerprint after the update; None on a dry run
+            or when nothing changed.
+    """
+    diffs: Dict[str, TableDiff]
+    sources: List[SourceResult]
+    timings: Dict[str, float]
+    data_version: Optional[str] = None
+
+
+def select_tasks(sources: Optional[List[str]] = None, topics: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    Expands the selected sources and topics into (source, topic) pipeline runs.
+
+    Args:
+        sources (Optional[List[str]]): Source names; all sources if empty.
+        topics (Optional[List[str]]): Topics to keep; every topic of the selected sources if empty.
+
+    Returns:
+        List[Tuple[str, str]]: Pipeline runs.
+
+    Raises:
+        ValueError: If a source is unknown or a topic belongs to none of the selected sources.
+    """
+    unknown = [name for name in sources or [] if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+    selected = [SOURCES[name] for name in sources] if sources else list(SOURCES.values())
+    available = {topic for source in selected for topic in source.topics}
+    unknown = [topic for topic in topics or [] if topic not in available]
+    if unknown:
+        raise ValueError(f"Unknown topics: {', '.join(unknown)}")
+    return [(source.name, topic) for source in selected for topic in source.topics
+            if not topics or topic in topics]
+
+
+def run_update(data_manager: Any, sources: Optional[List[str]] = None, topics: Optional[List[str]] = None,
+               dry_run: bool = False, workers: Optional[int] = None) -> UpdateReport:
+    """
+    Runs the ingestion pipelines of the selected sources and loads what changed.
+
+    The fetch to transform stages of independent source topics run in
+    parallel worker processes (see ingestion.py). Loading happens here, one
+    transaction per target table; sources with their own load stage write
+    their frame themselves. After writing, the university aggregates,
+    climate summaries and read model are rebuilt once and the caches invalidated once,
+    however many tables changed.
+
+    Args:
+        data_manager (DataManager): Provides the supported cities, data directory and database.
+        sources (Optional[List[str]]): Source names; all sources if empty.
+        topics (Optional[List[str]]): Topics; all topics of the selected sources if empty.
+        dry_run (bool): Only compute the diff.
+        workers (Optional[int]): Worker processes; one per source topic if None.
+
+    Returns:
+        UpdateReport: The diffs, stage timings and new data version.
+    """
+    tasks = select_tasks(sources, topics)
+    timings: Dict[str, float] = {}
+    context = SourceContext(
+        data_dir=data_manager.data_loader.data_dir,
+        supported_cities=tuple(data_manager.data_loader.supported_cities),
+    )
+
+    workers = workers or len(tasks)
+    start = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_source, *zip(*tasks), [context] * len(tasks)))
+    else:
+        results = [run_source(source_name, topic, context) for source_name, topic in tasks]
+    timings['pipelines (wall)'] = time.perf_counter() - start
+
+    frames_by_table: Dict[str, List[pd.DataFrame]] = {}
+    sources_by_table: Dict[str, Any] = {}
+    for result in results:
+        if result.frame is not None:
+            source = SOURCES[result.source]
+            sources_by_table[source.model.__tablename__] = source
+            frames_by_table.setdefault(source.model.__tablename__, []).append(result.frame)
+
+    diffs: Dict[str, TableDiff] = {}
+    for table, frames in frames_by_table.items():
+        source = sources_by_table[table]
+        start = time.perf_counter()
+        with data_manager.database_manager.get_session() as session:
+            if source.load is not None:
+                diff = TableDiff(table=table, key=', '.join(source.model.__table__.primary_key.columns.keys()),
+                                 inserts=source.load(session, pd.concat(frames, ignore_index=True), dry_run))
+            else:
+                diff = diff_table(session, source.model, _merge(frames, source.model))
+                if not dry_run:
+                    apply_diff(session, source.model, diff)
+                    # Bulk statements bypass the flush that keeps the search index in step
+                    if source.model in search_index.INDEXED_MODELS and search_index.exists(session):
+                        search_index.refresh(session, changed_cities(session, source.model, diff))
+        diffs[table] = diff
+        timings[f'{"diff" if dry_run else "load"} {table}'] = time.perf_counter() - start
+
+    report = UpdateReport(
+        diffs=diffs,
+        sources=[SourceResult(result.source, result.topic, None, result.stages, result.skipped)
+                 for result in results],
+        timings=timings,
+    )
+    if dry_run or not any(diff.changed for diff in diffs.values()):
+        return report
+
+    start = time.perf_counter()
+    report.data_version = data_manager.refresh_derived_data()
+    timings['rebuild derived data'] = time.perf_counter() - start
+    return report
+
+
+def diff_table(session: Any, model: Any, frame: pd.DataFrame) -> TableDiff:
+    """
+    Compares loaded rows with a table, column by column.
+
+    Only columns present in both the frame and the model are compared, so a
+    source that loaded some topics leaves the other columns untouched.
+
+    Args:
+        session (Session): Open session.
+        model (Any): Model with a single-column primary key.
+        frame (pd.DataFrame): Loaded rows, including the primary key column.
+
+    Returns:
+        TableDiff: Rows to insert and changed columns of existing rows.
+    """
+    key = _primary_key(model)
+    columns = [column for column in frame.columns if column != key and hasattr(model, column)]
+    existing = {
+        row[0]: row
+        for row in session.query(getattr(model, key), *[getattr(model, column) for column in columns])
+    }
+    diff = TableDiff(table=model.__tablename__, key=key)
+    for record in frame.to_dict('records'):
+        values = {column: _to_python(record[column]) for column in columns}
+        current = existing.get(record[key])
+        if current is None:
+            diff.inserts.append({key: record[key], **values})
+            continue
+        changes = {
+            column: (old, values[column]) for column, old in zip(columns, current[1:])
+            if not _same(old, values[column])
+        }
+        if changes:
+            diff.updates[record[key]] = changes
+    return diff
+
+
+def apply_diff(session: Any, model: Any, diff: TableDiff) -> None:
+    """
+    Writes a diff with one bulk INSERT and one bulk UPDATE by primary key.
+
+    Args:
+        session (Session): Open transaction.
+        model (Any): Model with a single-column primary key.
+        diff (TableDiff): Changes from diff_table.
+    """
+    now = datetime.utcnow()
+    if diff.inserts:
+        session.execute(insert(model), [{**row, 'last_updated': now} for row in diff.inserts])
+    if diff.updates:
+        session.execute(update(model), [
+            {diff.key: key, 'last_updated': now, **{column: new for column, (_, new) in changes.items()}}
+            for key, changes in diff.updates.items()
+        ])
+    logger.info("Updated %s: %s inserted, %s changed", diff.table, len(diff.inserts), len(diff.updates))
+
+
+def changed_cities(session: Any, model: Any, diff: TableDiff) -> List[str]:
+    """
+    Returns the cities whose rows an applied diff inserted or changed.
+
+    Args:
+        session (Session): The transaction the diff was applied in.
+        model (Any): Model with a single-column primary key and an eurostat_code column.
+        diff (TableDiff): Changes from diff_table.
+
+    Returns:
+        List[str]: Eurostat codes, including the former city of rows that moved.
+    """
+    key = _primary_key(model)
+    if key == 'eurostat_code':
+        return [row[key] for row in diff.inserts] + list(diff.updates)
+    codes = [row['eurostat_code'] for row in diff.inserts if row.get('eurostat_code')]
+    codes += [changes['eurostat_code'][0] for changes in diff.updates.values()
+              if 'eurostat_code' in changes and changes['eurostat_code'][0]]
+    if diff.updates:
+        codes += [code for (code,) in session.query(model.eurostat_code).filter(
+            getattr(model, key).in_(list(diff.updates))
+        ) if code]
+    return codes
+
+
+def _primary_key(model: Any) -> str:
+    return model.__table__.primary_key.columns.keys()[0]
+
+
+def _merge(frames: List[pd.DataFrame], model: Any) -> pd.DataFrame:
+    key = _primary_key(model)
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = merged.merge(frame, on=key, how='outer')
+    return merged
+
+
+def _to_python(value: Any) -> Any:
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _same(old: Any, new: Any) -> bool:
+    if old is None or new is None:
+        return old is new
+    if isinstance(old, float) or isinstance(new, float):
+        return math.isclose(old, new, rel_tol=1e-9, abs_tol=1e-9)
+    return old == new
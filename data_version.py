@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class VersionedValue(Generic[T]):
+    """
+    A value derived from the database, rebuilt only when the data version changes.
+
+    The version is a cheap fingerprint of the data (see
+    DatabaseManager.fetch_read_model_fingerprint). It is re-read at most once per
+    check_interval, so a warm value costs a clock read. Concurrent callers
+    share a single rebuild.
+    """
+
+    def __init__(self, name: str, build: Callable[[], T], version: Callable[[], str],
+                 check_interval: float = 30.0):
+        """
+        Initializes the value without building it.
+
+        Args:
+            name (str): Name used in log messages.
+            build (Callable[[], T]): Builds the value from the database.
+            version (Callable[[], str]): Returns the current data version.
+            check_interval (float): Seconds between data version checks.
+        """
+        self.name = name
+        self.build = build
+        self.version = version
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._built = False
+        self._built_version: Optional[str] = None
+        self._fresh_until = float('-inf')
+
+    def get(self) -> T:
+        """
+        Returns the value, rebuilding it first if the data version moved on.
+        """
+        if time.monotonic() < self._fresh_until:
+            return self._value
+        with self._lock:
+            if time.monotonic() < self._fresh_until:
+                return self._value
+            current = self.version()
+            if not self._built or current != self._built_version:
+                start = time.perf_counter()
+                self._value = self.build()
+                self._built = True
+                self._built_version = current
+                logger.info("Built %s for data version %s in %.1f ms",
+                            self.name, current, (time.perf_counter() - start) * 1000)
+            self._fresh_until = time.monotonic() + self.check_interval
+            return self._value
+
+    def invalidate(self) -> None:
+        """
+        Forces a data version check on the next get().
+        """
+        self._fresh_until = float('-inf')
+
+
+class DataVersionWatcher:
+    """
+    Notices data changes, including ones replicated in by LiteFS, and tells the caches.
+
+    check() is cheap enough to call on every request: it does nothing until
+    check_interval has passed, then reads the LiteFS replication position
+    (a small file next to the database) if there is one. Only when the
+    position moved, since every write moves it, does it read the data
+    version, and listeners are called only if that changed too. Without
+    LiteFS the data version is read every check_interval.
+    """
+
+    def __init__(self, version: Callable[[], str], position: Optional[Callable[[], Optional[str]]] = None,
+                 check_interval: float = 1.0):
+        """
+        Initializes the watcher; the first check records the current version without notifying.
+
+        Args:
+            version (Callable[[], str]): Returns the current data version.
+            position (Optional[Callable[[], Optional[str]]]): Returns the replication position, a cheap
+                proxy that changes with every write; see litefs_position.
+            check_interval (float): Seconds between checks.
+        """
+        self.version = version
+        self.position = position
+        self.check_interval = check_interval
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._position: Optional[str] = None
+        self._version: Optional[str] = None
+        self._next_check = float('-inf')
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers a function to call after the data version changed.
+        """
+        self._listeners.append(listener)
+
+    def check(self) -> bool:
+        """
+        Checks for a data change and notifies the listeners if there was one.
+
+        Returns:
+            bool: Whether the data version changed.
+        """
+        if time.monotonic() < self._next_check:
+            return False
+        # Another thread is already checking; this request need not wait for it
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            if self.position is not None:
+                position = self.position()
+                if position is not None and position == self._position:
+                    return False
+                self._position = position
+            current = self.version()
+            previous, self._version = self._version, current
+        finally:
+            self._lock.release()
+
+        if previous is None or current == previous:
+            return False
+        logger.info("Data version changed from %s to %s", previous, current)
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception:
+                logger.exception("Data version listener %r failed", listener)
+        return True
+
+
+def litefs_position(database_url: str) -> Optional[Callable[[], Optional[str]]]:
+    """
+    Returns a reader for the LiteFS position file of a SQLite database, if LiteFS mounts it.
+
+    LiteFS exposes `.<db>-pos` next to each database, holding the current
+    transaction ID and checksum.
+
+    Args:
+        database_url (str): SQLAlchemy URL of the database.
+
+    Returns:
+        Optional[Callable[[], Optional[str]]]: Reads the position; None if there is no position file.
+    """
+    if not database_url.startswith('sqlite:///'):
+        return None
+    database_path = database_url[len('sqlite:///'):]
+    position_path = os.path.join(os.path.dirname(database_path), f'.{os.path.basename(database_path)}-pos')
+    if not os.path.exists(position_path):
+        return None
+
+    def read_position() -> Optional[str]:
+        try:
+            with open(position_path) as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    logger.info("Watching LiteFS position in %s", position_path)
+    return read_position
@@ -2,6 +2,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models import Base
+from search_index import create_search_schema, register_sync
 
 # Use the environment variable, with a fallback for local development
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///instance/cities.db')
@@ -9,5 +10,10 @@ DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///instance/cities.db')
 engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Re-index cities for full-text search whenever the ORM writes to them
+register_sync(SessionLocal)
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_search_schema(connection)
\ No newline at end of file
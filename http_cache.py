@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, Response, make_response, request, session
+
+from data_version import VersionedValue
+
+logger = logging.getLogger(__name__)
+
+NO_STORE = 'no-store'
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    How responses of one route may be cached.
+
+    Attributes:
+        cache_control (str): Cache-Control for anonymous visitors.
+        logged_in_cache_control (Optional[str]): Cache-Control when a user is logged in; defaults to cache_control.
+        vary (str): Request headers the response depends on.
+        conditional (bool): Whether the response is fully determined by the data version, the URL
+            and the logged-in user, so ETag/Last-Modified validators can answer with 304.
+    """
+    cache_control: str
+    logged_in_cache_control: Optional[str] = None
+    vary: str = 'Accept-Encoding'
+    conditional: bool = True
+
+
+PAGE = CachePolicy('public, max-age=60, stale-while-revalidate=600', 'private, no-cache', vary='Accept-Encoding, Cookie')
+PRIVATE_PAGE = CachePolicy('private, no-cache', vary='Accept-Encoding, Cookie')
+PUBLIC_DATA = CachePolicy('public, max-age=300, stale-while-revalidate=3600')
+PRIVATE_DATA = CachePolicy('private, max-age=60', vary='Accept-Encoding, Cookie')
+
+# Cache policy per endpoint; endpoints not listed are never stored
+POLICIES: Dict[str, CachePolicy] = {
+    'index': PAGE,
+    'city_detail': PRIVATE_PAGE,
+    'compare': PRIVATE_PAGE,
+    'compare_data': PRIVATE_DATA,
+    'search': PUBLIC_DATA,
+    'nearby_cities': PUBLIC_DATA,
+    'nearby_universities': PUBLIC_DATA,
+    'nearest_alternative_cities': PUBLIC_DATA,
+    'similar_cities': PUBLIC_DATA,
+    'metric_trends': PUBLIC_DATA,
+    'recommendations': PUBLIC_DATA,
+    'fields_of_study': PUBLIC_DATA,
+    'field_cities': PUBLIC_DATA,
+    'weather_cities': PUBLIC_DATA,
+    # Logged-in users get their saved weights, which change without a data version bump
+    'ranking': CachePolicy('public, max-age=300', 'private, no-cache', vary='Accept-Encoding, Cookie',
+                           conditional=False),
+}
+
+
+class HttpCache:
+    """
+    Applies POLICIES to responses and answers conditional GETs before the view runs.
+
+    Validators come from the data version: Last-Modified is the newest
+    city_read_model update and the ETag hashes the read model fingerprint,
+    the deployed build, the URL and the logged-in user. A request whose
+    validators still match gets a 304 from a before_request hook, so neither
+    the database nor the template engine is touched.
+    """
+
+    def __init__(self, database_manager: Any, build_id: Optional[str] = None, check_interval: float = 5.0):
+        """
+        Args:
+            database_manager (DatabaseManager): Provides the read model version.
+            build_id (Optional[str]): Identifies the deployed code, so a deploy changes every ETag.
+                Defaults to FLY_IMAGE_REF, or the process start time.
+            check_interval (float): Seconds between data version checks.
+        """
+        self.build_id = build_id or os.environ.get('FLY_IMAGE_REF') or str(time.time())
+        self.version = VersionedValue(
+            'HTTP cache validators',
+            build=database_manager.fetch_read_model_version,
+            version=database_manager.fetch_read_model_fingerprint,
+            check_interval=check_interval,
+        )
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Registers the conditional GET and response header hooks.
+
+        Call this before registering other before_request hooks that may answer
+        the request, so unchanged pages are answered with 304 first.
+        """
+        app.before_request(self.answer_conditional_get)
+        app.after_request(self.apply_policy)
+
+    def invalidate(self) -> None:
+        """
+        Forces a data version check on the next request, so validators change right away.
+        """
+        self.version.invalidate()
+
+    def answer_conditional_get(self) -> Optional[Response]:
+        policy = self._policy()
+        if policy is None or not policy.conditional or request.method not in ('GET', 'HEAD'):
+            return None
+        etag, last_modified = self._validators()
+        if request.if_none_match:
+            matches = request.if_none_match.contains_weak(etag)
+        elif request.if_modified_since and last_modified:
+            matches = request.if_modified_since >= last_modified
+        else:
+            return None
+        if not matches:
+            return None
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    def apply_policy(self, response: Response) -> Response:
+        if request.endpoint == 'static':
+            return response
+        policy = self._policy()
+        if policy is None or request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+            response.headers['Cache-Control'] = NO_STORE
+            return response
+
+        cache_control = policy.cache_control
+        if self._logged_in() or session.modified:
+            cache_control = policy.logged_in_cache_control or cache_control
+        response.headers['Cache-Control'] = cache_control
+        for header in policy.vary.split(', '):
+            response.vary.add(header)
+
+        if policy.conditional:
+            etag, last_modified = self._validators()
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+        return response
+
+    def _policy(self) -> Optional[CachePolicy]:
+        return POLICIES.get(request.endpoint)
+
+    def _validators(self) -> Tuple[str, Optional[datetime]]:
+        fingerprint, last_modified = self.version.get()
+        user_id = session.get('user', {}).get('user_id') if self._logged_in() else ''
+        key = '\n'.join((self.build_id, fingerprint, request.full_path, user_id or ''))
+        etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+        if last_modified is not None:
+            # HTTP dates have second precision; read model timestamps are stored in UTC
+            last_modified = last_modified.replace(microsecond=0, tzinfo=last_modified.tzinfo or timezone.utc)
+        return etag, last_modified
+
+    @staticmethod
+    def _logged_in() -> bool:
+        return 'user' in session
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIRECTORY = 'images'
+DEFAULT_WIDTH = 640
+_IMAGE_FILE = re.compile(r'^(?P<slug>.+)_(?P<width>\d+)\.jpg$')
+
+
+class ImageManifest:
+    """
+    The city images available under static/images, keyed by image slug.
+
+    Files are named <image_slug>_<width>.jpg, with image_slug precomputed on
+    City. The directory is scanned once at startup; templates then build
+    image URLs and srcsets from the manifest without touching the filesystem.
+    """
+
+    def __init__(self, widths: Dict[str, List[int]]):
+        """
+        Args:
+            widths (Dict[str, List[int]]): Available widths per slug, ascending.
+        """
+        self.widths = widths
+
+    @classmethod
+    def scan(cls, static_folder: str) -> 'ImageManifest':
+        """
+        Builds the manifest from the image files in a static folder.
+
+        Args:
+            static_folder (str): The app's static folder.
+
+        Returns:
+            ImageManifest: The manifest; empty if the image directory does not exist.
+        """
+        widths: Dict[str, List[int]] = {}
+        directory = os.path.join(static_folder, IMAGE_DIRECTORY)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            logger.warning("Image directory %s not found", directory)
+            names = []
+        for name in names:
+            match = _IMAGE_FILE.match(name)
+            if match:
+                widths.setdefault(match.group('slug'), []).append(int(match.group('width')))
+        for slug_widths in widths.values():
+            slug_widths.sort()
+        logger.info("Loaded image manifest with %s images", len(widths))
+        return cls(widths)
+
+    def filename(self, slug: str, width: int = DEFAULT_WIDTH) -> str:
+        """
+        Returns the static filename of the smallest image at least `width` wide, or the widest one.
+
+        Slugs missing from the manifest still get the conventional DEFAULT_WIDTH filename.
+
+        Args:
+            slug (str): Image slug.
+            width (int): Wanted width in pixels.
+
+        Returns:
+            str: Path relative to the static folder.
+        """
+        widths = self.widths.get(slug)
+        if not widths:
+            return f'{IMAGE_DIRECTORY}/{slug}_{DEFAULT_WIDTH}.jpg'
+        chosen = next((available for available in widths if available >= width), widths[-1])
+        return f'{IMAGE_DIRECTORY}/{slug}_{chosen}.jpg'
+
+    def sources(self, slug: str) -> List[Tuple[str, int]]:
+        """
+        Returns (filename, width) pairs for every available width of a slug, narrowest first.
+        """
+        return [(f'{IMAGE_DIRECTORY}/{slug}_{width}.jpg', width) for width in self.widths.get(slug, [])]
+
+    def missing(self, slugs: Iterable[str]) -> List[str]:
+        """
+        Returns the slugs without an image of DEFAULT_WIDTH, which every page falls back to.
+        """
+        return sorted({slug for slug in slugs if DEFAULT_WIDTH not in self.widths.get(slug, [])})
+
+    def unused(self, slugs: Iterable[str]) -> List[str]:
+        """
+        Returns the slugs that have images but are not in `slugs`.
+        """
+        return sorted(set(self.widths) - set(slugs))
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import BigInteger, Date, Float, Integer, Numeric, inspect
+
+from metrics_history import TOPIC_COLUMNS, append_observations, new_observations, topic_value
+from models import Climate, CostOfLiving, Housing, MetricObservation, Metrics, TransportBudget, University
+
+logger = logging.getLogger(__name__)
+
+EUROSTAT_LINEAR_COLUMNS = ['DATAFLOW', 'indic_ur', 'cities', 'TIME_PERIOD', 'OBS_VALUE']
+
+
+class SourceUnavailable(Exception):
+    """
+    Raised by a fetch stage when the source's input is not there; the source is skipped.
+    """
+
+
+@dataclass(frozen=True)
+class SourceContext:
+    """
+    Plain settings a source needs, small enough to send to worker processes.
+
+    Attributes:
+        data_dir (str): Directory holding the source files.
+        supported_cities (Tuple[str, ...]): Eurostat codes of the supported cities.
+    """
+    data_dir: str
+    supported_cities: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    An ingestion pipeline: fetch -> parse -> validate -> transform, then load.
+
+    The first four stages run in a worker process, which looks the source up
+    by name in SOURCES; validate drops what is not needed, so only the small
+    transformed frame is sent back. The load stage runs in the parent, see
+    data_update: by default the frame is diffed against the table by primary
+    key, a source with its own load (e.g. an append-only history) writes it
+    itself.
+
+    Attributes:
+        name (str): Name used on the command line.
+        model (Any): Model of the target table, with a single-column primary key unless the source has a load.
+        topics (Tuple[str, ...]): Independently loadable parts of the source.
+        fetch (Callable[[SourceContext, str], Any]): Locates the raw input of a topic.
+        parse (Callable[[Any], pd.DataFrame]): Reads the raw input.
+        validate (Callable[[pd.DataFrame, SourceContext], pd.DataFrame]): Drops unusable and unsupported rows.
+        transform (Callable[[pd.DataFrame, str], pd.DataFrame]): Produces one row per key with model columns.
+        load (Optional[Callable[[Session, pd.DataFrame, bool], List[Dict[str, Any]]]]): Writes the
+            transformed frame, unless dry_run is set, and returns the rows it adds.
+    """
+    name: str
+    model: Any
+    topics: Tuple[str, ...]
+    fetch: Callable[[SourceContext, str], Any]
+    parse: Callable[[Any], pd.DataFrame]
+    validate: Callable[[pd.DataFrame, SourceContext], pd.DataFrame]
+    transform: Callable[[pd.DataFrame, str], pd.DataFrame]
+    load: Optional[Callable[[Any, pd.DataFrame, bool], List[Dict[str, Any]]]] = None
+
+
+@dataclass
+class StageTiming:
+    """
+    Duration and output size of one pipeline stage.
+    """
+    stage: str
+    seconds: float
+    rows: Optional[int] = None
+
+
+@dataclass
+class SourceResult:
+    """
+    Output of the worker-side stages of one source topic.
+
+    Attributes:
+        source (str): Source name.
+        topic (str): Topic name.
+        frame (Optional[pd.DataFrame]): Transformed rows; None if the source was skipped.
+        stages (List[StageTiming]): Timings of the stages that ran.
+        skipped (Optional[str]): Why the source was skipped.
+    """
+    source: str
+    topic: str
+    frame: Optional[pd.DataFrame]
+    stages: List[StageTiming] = field(default_factory=list)
+    skipped: Optional[str] = None
+
+
+def run_source(source_name: str, topic: str, context: SourceContext) -> SourceResult:
+    """
+    Runs the fetch, parse, validate and transform stages of a source topic.
+
+    Args:
+        source_name (str): Key of SOURCES.
+        topic (str): One of the source's topics.
+        context (SourceContext): Settings shared by all sources.
+
+    Returns:
+        SourceResult: The transformed frame with per-stage timings and row counts.
+    """
+    source = SOURCES[source_name]
+    result = SourceResult(source=source_name, topic=topic, frame=None)
+
+    start = time.perf_counter()
+    try:
+        value = source.fetch(context, topic)
+    except SourceUnavailable as e:
+        logger.warning("Skipping %s/%s: %s", source_name, topic, e)
+        result.skipped = str(e)
+        return result
+    result.stages.append(StageTiming('fetch', time.perf_counter() - start))
+
+    for stage, run in (('parse', source.parse),
+                       ('validate', lambda frame: source.validate(frame, context)),
+                       ('transform', lambda frame: source.transform(frame, topic))):
+        start = time.perf_counter()
+        value = run(value)
+        result.stages.append(StageTiming(stage, time.perf_counter() - start, len(value)))
+
+    result.frame = value
+    return result
+
+
+def data_file(context: SourceContext, *parts: str) -> str:
+    """
+    Returns the path of a file under the data directory.
+
+    Raises:
+        SourceUnavailable: If the file does not exist.
+    """
+    path = os.path.join(context.data_dir, *parts)
+    if not os.path.exists(path):
+        raise SourceUnavailable(f"{path} not found")
+    return path
+
+
+# Eurostat perception survey (urb_percep), one row per city, indicator and year
+
+def fetch_urb_percep(context: SourceContext, topic: str) -> str:
+    return data_file(context, 'eurostat', 'urb_percep_linear.csv')
+
+
+def parse_eurostat_linear(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, usecols=EUROSTAT_LINEAR_COLUMNS)
+
+
+def validate_eurostat_observations(df: pd.DataFrame, context: SourceContext) -> pd.DataFrame:
+    """
+    Keeps the numeric observations of supported cities, with the year as an integer.
+    """
+    df = df[df['cities'].isin(set(context.supported_cities))].copy()
+    df['TIME_PERIOD'] = pd.to_numeric(df['TIME_PERIOD'], errors='coerce')
+    df['OBS_VALUE'] = pd.to_numeric(df['OBS_VALUE'], errors='coerce')
+    df = df.dropna(subset=['TIME_PERIOD', 'OBS_VALUE'])
+    df['TIME_PERIOD'] = df['TIME_PERIOD'].astype(int)
+    return df
+
+
+def validate_eurostat_linear(df: pd.DataFrame, context: SourceContext) -> pd.DataFrame:
+    """
+    Keeps the newest numeric observation per supported city and indicator.
+    """
+    df = validate_eurostat_observations(df, context)
+    df = df.sort_values(['cities', 'indic_ur', 'TIME_PERIOD'], ascending=[True, True, False])
+    return df.groupby(['cities', 'indic_ur']).first().reset_index()
+
+
+def transform_urb_percep(df: pd.DataFrame, topic: str) -> pd.DataFrame:
+    """
+    Derives safety_index or public_transport_satisfaction per city from the survey indicators.
+    """
+    column = TOPIC_COLUMNS[topic]
+    rows = [
+        (eurostat_code, topic_value(topic, dict(zip(group['indic_ur'], group['OBS_VALUE']))))
+        for eurostat_code, group in df.groupby('cities')
+    ]
+    result = pd.DataFrame(rows, columns=['eurostat_code', column]).astype({'eurostat_code': str, column: float})
+    return result.dropna(subset=[column]).sort_values('eurostat_code').reset_index(drop=True)
+
+
+def transform_observations(df: pd.DataFrame, topic: str) -> pd.DataFrame:
+    """
+    Renames survey observations to eurostat_code, indicator, period and value.
+    """
+    df = df.rename(columns={'cities': 'eurostat_code', 'indic_ur': 'indicator',
+                            'TIME_PERIOD': 'period', 'OBS_VALUE': 'value'})
+    df = df[['eurostat_code', 'indicator', 'period', 'value']].drop_duplicates(
+        subset=['eurostat_code', 'indicator', 'period'], keep='last')
+    return df.sort_values(['eurostat_code', 'indicator', 'period']).reset_index(drop=True)
+
+
+def load_observations(session: Any, frame: pd.DataFrame, dry_run: bool) -> List[Dict[str, Any]]:
+    """
+    Appends the observations that are new or changed since the last load.
+    """
+    additions = new_observations(session, frame)
+    if not dry_run:
+        append_observations(session, additions, 'eurostat_urb_percep')
+    return additions
+
+
+# Table-shaped CSVs: one row per key, columns named like the target model
+
+def table_csv(*parts: str) -> Callable[[SourceContext, str], str]:
+    def fetch(context: SourceContext, topic: str) -> str:
+        return data_file(context, *parts)
+    return fetch
+
+
+def parse_csv(path: str) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+def table_validator(model: Any) -> Callable[[pd.DataFrame, SourceContext], pd.DataFrame]:
+    """
+    Returns a validator keeping the model's columns, coerced to their column types,
+    for supported cities only, dropping rows without any value.
+    """
+    columns = {column.name: column for column in inspect(model).columns if column.name != 'last_updated'}
+    key = inspect(model).primary_key[0].name
+
+    def validate(df: pd.DataFrame, context: SourceContext) -> pd.DataFrame:
+        if key not in df.columns or 'eurostat_code' not in df.columns:
+            raise ValueError(f"{model.__tablename__} input needs '{key}' and 'eurostat_code' columns")
+        df = df[[name for name in df.columns if name in columns]]
+        df = df[df['eurostat_code'].isin(set(context.supported_cities))].copy()
+
+        for name in df.columns:
+            column_type = columns[name].type
+            if isinstance(column_type, (Integer, BigInteger)):
+                df[name] = pd.to_numeric(df[name], errors='coerce').round().astype('Int64')
+            elif isinstance(column_type, (Float, Numeric)):
+                df[name] = pd.to_numeric(df[name], errors='coerce')
+            elif isinstance(column_type, Date):
+                df[name] = pd.to_datetime(df[name], errors='coerce').dt.date
+
+        values = [name for name in df.columns if name not in (key, 'eurostat_code')]
+        df = df.dropna(subset=[name for name in df.columns if not columns[name].nullable])
+        if values:
+            df = df.dropna(subset=values, how='all')
+        return df.drop_duplicates(subset=[key], keep='last')
+
+    return validate
+
+
+def identity_transform(df: pd.DataFrame, topic: str) -> pd.DataFrame:
+    return df.sort_values(df.columns[0]).reset_index(drop=True)
+
+
+SOURCES: Dict[str, Source] = {
+    'eurostat_urb_percep': Source(
+        name='eurostat_urb_percep', model=Metrics, topics=('safety', 'public_transport'),
+        fetch=fetch_urb_percep, parse=parse_eurostat_linear,
+        validate=validate_eurostat_linear, transform=transform_urb_percep,
+    ),
+    'urb_percep_history': Source(
+        name='urb_percep_history', model=MetricObservation, topics=('observations',),
+        fetch=fetch_urb_percep, parse=parse_eurostat_linear,
+        validate=validate_eurostat_observations, transform=transform_observations,
+        load=load_observations,
+    ),
+    'climate_normals': Source(
+        name='climate_normals', model=Climate, topics=('normals',),
+        fetch=table_csv('climate', 'climate_normals.csv'), parse=parse_csv,
+        validate=table_validator(Climate), transform=identity_transform,
+    ),
+    'cost_of_living': Source(
+        name='cost_of_living', model=CostOfLiving, topics=('indices',),
+        fetch=table_csv('numbeo', 'cost_of_living.csv'), parse=parse_csv,
+        validate=table_validator(CostOfLiving), transform=identity_transform,
+    ),
+    'housing': Source(
+        name='housing', model=Housing, topics=('rent',),
+        fetch=table_csv('housing', 'housing.csv'), parse=parse_csv,
+        validate=table_validator(Housing), transform=identity_transform,
+    ),
+    'transport_tickets': Source(
+        name='transport_tickets', model=TransportBudget, topics=('monthly_ticket',),
+        fetch=table_csv('transport', 'transport_budget.csv'), parse=parse_csv,
+        validate=table_validator(TransportBudget), transform=identity_transform,
+    ),
+    'university_register': Source(
+        name='university_register', model=University, topics=('register',),
+        fetch=table_csv('universities', 'universities.csv'), parse=parse_csv,
+        validate=table_validator(University), transform=identity_transform,
+    ),
+}
@@ -0,0 +1,136 @@
+"""
+Local check of replica write forwarding.
+
+Starts a stand-in primary and two replica instances of the app on one
+database. The replicas run with a non-primary FLY_REGION and WRITE_FORWARD_URL
+pointing at the primary. Feedback is posted to the replicas, and the script
+reports how fast the replicas answered and how long it took until every
+submission was stored by the primary.
+
+Usage:
+    python -m loadtest.forwarding --submissions 200
+    python -m loadtest.forwarding --database-url sqlite:////path/to/cities.db
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import List
+
+import requests
+from sqlalchemy import create_engine, text
+
+from loadtest.run import GUNICORN_OPTIONS, REPO_ROOT, start_process, wait_until_ready
+
+PRIMARY_REGION = 'mad'
+REPLICA_REGION = 'waw'
+TOKEN = 'forwarding-check'
+
+
+def post_feedback(url: str, content: str) -> float:
+    """
+    Posts one feedback submission and returns its latency in milliseconds.
+    """
+    start = time.perf_counter()
+    response = requests.post(url + '/submit_feedback', json={'feedback': content}, timeout=30)
+    latency_ms = (time.perf_counter() - start) * 1000
+    if response.status_code != 200 or 'fly-replay' in response.headers:
+        raise SystemExit(f"Replica did not accept the write itself: {response.status_code} {response.headers}")
+    return latency_ms
+
+
+def count_feedback(database_url: str, marker: str) -> int:
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        count = connection.execute(
+            text("SELECT COUNT(*) FROM feedback WHERE content LIKE :marker"), {'marker': f'{marker}%'}
+        ).scalar()
+    engine.dispose()
+    return count
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)] if latencies else 0.0
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=200, help='Feedback posts, spread over both replicas.')
+    parser.add_argument('--database-url', help='Database to serve; defaults to a synthetic one.')
+    parser.add_argument('--cities', type=int, default=20, help='Size of the synthetic database.')
+    parser.add_argument('--port', type=int, default=8091, help='Primary port; replicas use the next two.')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for writes to reach the primary.')
+    args = parser.parse_args(argv)
+
+    with ExitStack() as stack:
+        workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix='erasmoon-forwarding-'))
+        database_url = args.database_url
+        if database_url is None:
+            from benchmarks.synthetic import generate_database
+            with open(os.path.join(REPO_ROOT, 'config', 'supported_languages.json')) as file:
+                languages = json.load(file)
+            database_url = f"sqlite:///{os.path.join(workdir, 'cities.db')}"
+            generate_database(database_url, args.cities, languages)
+
+        primary_url = f"http://127.0.0.1:{args.port}"
+        base_env = {
+            **os.environ,
+            'FLASK_ENV': 'production',
+            'DATABASE_URL': database_url,
+            'SECRET_KEY': os.environ.get('SECRET_KEY', 'forwarding'),
+            'PRIMARY_REGION': PRIMARY_REGION,
+            'WRITE_FORWARD_TOKEN': TOKEN,
+        }
+        instances = [(primary_url, {'FLY_REGION': PRIMARY_REGION})]
+        for index in (1, 2):
+            instances.append((f"http://127.0.0.1:{args.port + index}", {
+                'FLY_REGION': REPLICA_REGION,
+                'WRITE_FORWARD_URL': f"{primary_url}/internal/writes",
+            }))
+        for index, (url, env) in enumerate(instances):
+            start_process(stack, [sys.executable, '-m', 'gunicorn', 'app:app', *GUNICORN_OPTIONS,
+                                  f"--bind={url[len('http://'):]}"], {
+                **base_env, **env,
+                'WRITE_JOURNAL_PATH': os.path.join(workdir, f'journal-{index}.jsonl'),
+                'MAIL_OUTBOX_PATH': os.path.join(workdir, f'mail-{index}.jsonl'),
+                'CACHE_DIR': os.path.join(workdir, f'cache-{index}'),
+                'STATIC_EXPORT_DIR': os.path.join(workdir, f'static-{index}'),
+            })
+        for url, _ in instances:
+            wait_until_ready(url + '/')
+
+        marker = f"forwarding {uuid.uuid4().hex[:8]}"
+        replicas = [url for url, _ in instances[1:]]
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            latencies = sorted(pool.map(
+                lambda i: post_feedback(replicas[i % len(replicas)], f"{marker} {i}"), range(args.submissions)
+            ))
+        accepted = time.monotonic() - started
+
+        deadline = time.monotonic() + args.timeout
+        stored = 0
+        while time.monotonic() < deadline:
+            stored = count_feedback(database_url, marker)
+            if stored >= args.submissions:
+                break
+            time.sleep(0.2)
+        landed = time.monotonic() - started
+
+    print(f"replica POST /submit_feedback: {len(latencies)} requests, p50 {percentile(latencies, 50):.1f} ms, "
+          f"p95 {percentile(latencies, 95):.1f} ms, all accepted in {accepted:.2f}s")
+    print(f"stored by the primary: {stored}/{args.submissions} after {landed:.2f}s")
+    if stored < args.submissions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
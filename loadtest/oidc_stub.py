@@ -0,0 +1,139 @@
+"""
+Local OpenID Connect stand-in for Auth0, used by the load-test harness.
+
+It implements just enough of the Auth0 surface the app touches: discovery,
+JWKS, an authorize endpoint that approves every request immediately, the
+token endpoint (with a signed RS256 id_token), userinfo and logout. Every
+authorization creates a new synthetic user, so each virtual user in a load
+run gets its own account.
+
+Run it with:
+    python -m loadtest.oidc_stub --port 9000
+
+and start the app with AUTH0_BASE_URL=http://127.0.0.1:9000 and
+AUTHLIB_INSECURE_TRANSPORT=1.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import secrets
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlencode
+
+from authlib.jose import JsonWebKey, jwt
+from flask import Flask, jsonify, redirect, request
+
+TOKEN_LIFETIME = 3600
+
+
+def create_stub_app(client_id: str = 'loadtest-client') -> Flask:
+    """
+    Creates the OIDC stand-in application.
+
+    Args:
+        client_id (str): Client ID the app is configured with; used as the id_token audience.
+
+    Returns:
+        Flask: The stand-in application.
+    """
+    stub = Flask(__name__)
+    key = JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': 'loadtest'})
+    user_ids = itertools.count(1)
+    codes: Dict[str, Dict[str, Any]] = {}
+    tokens: Dict[str, Dict[str, Any]] = {}
+    lock = threading.Lock()
+
+    def issuer() -> str:
+        return request.host_url
+
+    @stub.route('/.well-known/openid-configuration')
+    def discovery():
+        return jsonify({
+            'issuer': issuer(),
+            'authorization_endpoint': f"{issuer()}authorize",
+            'token_endpoint': f"{issuer()}oauth/token",
+            'userinfo_endpoint': f"{issuer()}userinfo",
+            'jwks_uri': f"{issuer()}.well-known/jwks.json",
+            'end_session_endpoint': f"{issuer()}v2/logout",
+            'response_types_supported': ['code'],
+            'subject_types_supported': ['public'],
+            'id_token_signing_alg_values_supported': ['RS256'],
+        })
+
+    @stub.route('/.well-known/jwks.json')
+    def jwks():
+        return jsonify({'keys': [key.as_dict(is_private=False)]})
+
+    @stub.route('/authorize')
+    def authorize():
+        user_number = next(user_ids)
+        userinfo = {
+            'sub': f"loadtest|{user_number}",
+            'email': f"loadtest-{user_number}@example.com",
+            'name': f"Load Test {user_number}",
+            'picture': '',
+            'email_verified': True,
+        }
+        code = secrets.token_urlsafe(24)
+        with lock:
+            codes[code] = {'userinfo': userinfo, 'nonce': request.args.get('nonce')}
+        query = {'code': code, 'state': request.args.get('state', '')}
+        return redirect(f"{request.args['redirect_uri']}?{urlencode(query)}")
+
+    @stub.route('/oauth/token', methods=['POST'])
+    def token():
+        with lock:
+            grant = codes.pop(request.form.get('code', ''), None)
+        if grant is None:
+            return jsonify({'error': 'invalid_grant'}), 400
+
+        now = int(time.time())
+        access_token = secrets.token_urlsafe(32)
+        claims = {
+            **grant['userinfo'],
+            'iss': issuer(),
+            'aud': client_id,
+            'iat': now,
+            'exp': now + TOKEN_LIFETIME,
+        }
+        if grant['nonce']:
+            claims['nonce'] = grant['nonce']
+        with lock:
+            tokens[access_token] = grant['userinfo']
+        return jsonify({
+            'access_token': access_token,
+            'token_type': 'Bearer',
+            'expires_in': TOKEN_LIFETIME,
+            'id_token': jwt.encode({'alg': 'RS256', 'kid': 'loadtest'}, claims, key).decode(),
+        })
+
+    @stub.route('/userinfo')
+    def userinfo():
+        access_token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        with lock:
+            user = tokens.get(access_token)
+        if user is None:
+            return jsonify({'error': 'invalid_token'}), 401
+        return jsonify(user)
+
+    @stub.route('/v2/logout')
+    def logout():
+        return redirect(request.args.get('returnTo', '/'))
+
+    return stub
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local Auth0 stand-in for load tests.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--client-id', default='loadtest-client')
+    args = parser.parse_args()
+    create_stub_app(args.client_id).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
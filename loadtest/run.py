@@ -0,0 +1,236 @@
+"""
+Scripted load test for the web app, including the login-protected detail pages.
+
+Starts the local OIDC stand-in and gunicorn with the production worker
+settings, logs every virtual user in through /login and /callback, then loops
+over the production traffic profile:
+
+    landing -> language switch -> several detail pages -> feedback POST
+
+and reports p50/p95/p99 latency and throughput per route.
+
+Usage:
+    python -m loadtest.run --users 8 --duration 60
+    python -m loadtest.run --database-url sqlite:////path/to/cities.db
+    python -m loadtest.run --target http://127.0.0.1:8081   # app already running with the stand-in
+
+Without --database-url, a synthetic 160-city database is generated with
+benchmarks.synthetic.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUNICORN_OPTIONS = ['--workers=2', '--threads=2']
+DETAIL_PAGES_PER_LOOP = 4
+CLIENT_ID = 'loadtest-client'
+
+
+class LatencyStats:
+    """
+    Thread-safe latency and error collection per route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            self._latencies[route].append(latency_ms)
+            if not ok:
+                self._errors[route] += 1
+
+    def summary(self, elapsed_s: float) -> Dict[str, Dict[str, float]]:
+        """
+        Summarizes the recorded requests.
+
+        Args:
+            elapsed_s (float): Wall-clock duration of the run.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Count, errors, throughput and latency percentiles per route.
+        """
+        with self._lock:
+            routes = {route: sorted(latencies) for route, latencies in self._latencies.items()}
+            errors = dict(self._errors)
+        everything = sorted(latency for latencies in routes.values() for latency in latencies)
+        summary = {route: self._describe(latencies, errors.get(route, 0), elapsed_s)
+                   for route, latencies in routes.items()}
+        summary['all'] = self._describe(everything, sum(errors.values()), elapsed_s)
+        return summary
+
+    @staticmethod
+    def _describe(latencies: List[float], errors: int, elapsed_s: float) -> Dict[str, float]:
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)]
+
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed_s, 2) if elapsed_s else 0.0,
+            'p50_ms': round(percentile(50), 2),
+            'p95_ms': round(percentile(95), 2),
+            'p99_ms': round(percentile(99), 2),
+        }
+
+
+def virtual_user(base_url: str, codes: List[str], languages: List[str], deadline: float,
+                 stats: LatencyStats, seed: int) -> None:
+    """
+    Logs in through the OIDC stand-in and replays the traffic profile until the deadline.
+
+    Args:
+        base_url (str): Root URL of the app.
+        codes (List[str]): Eurostat codes available for detail pages.
+        languages (List[str]): Languages to switch between on the landing page.
+        deadline (float): time.monotonic() value at which to stop.
+        stats (LatencyStats): Shared statistics collector.
+        seed (int): Random seed for this user's choices.
+    """
+    rng = random.Random(seed)
+    session = requests.Session()
+
+    def timed(route: str, method: str, path: str, follow: bool = False, **kwargs) -> Optional[requests.Response]:
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, allow_redirects=follow, timeout=30, **kwargs)
+        except requests.RequestException:
+            stats.record(route, (time.perf_counter() - start) * 1000, ok=False)
+            return None
+        # Without redirect following, a 3xx means the user was bounced (e.g. back to /login)
+        stats.record(route, (time.perf_counter() - start) * 1000, ok=response.status_code < (400 if follow else 300))
+        return response
+
+    login = timed('/login -> /callback', 'GET', '/login', follow=True)
+    if login is None or 'sessionStorage' not in login.text:
+        return
+
+    while time.monotonic() < deadline:
+        timed('/', 'GET', '/')
+        timed('/?language=', 'GET', f"/?language={rng.choice(languages)}")
+        for code in rng.sample(codes, min(DETAIL_PAGES_PER_LOOP, len(codes))):
+            timed('/city/<code>', 'GET', f"/city/{code}")
+        timed('/submit_feedback', 'POST', '/submit_feedback',
+              json={'feedback': f"load test feedback {rng.random():.6f}"})
+
+
+def wait_until_ready(url: str, timeout_s: float = 30) -> None:
+    """
+    Polls a URL until it answers or the timeout expires.
+    """
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=2, allow_redirects=False)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+def start_process(stack: ExitStack, args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    process = subprocess.Popen(args, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stack.callback(process.wait)
+    stack.callback(process.terminate)
+    return process
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of steady-state load.')
+    parser.add_argument('--target', help='URL of an already running app; skips starting gunicorn and the stand-in.')
+    parser.add_argument('--database-url', help='Database to serve; defaults to a synthetic one.')
+    parser.add_argument('--cities', type=int, default=160, help='Size of the synthetic database.')
+    parser.add_argument('--app-port', type=int, default=8081)
+    parser.add_argument('--stub-port', type=int, default=9000)
+    parser.add_argument('--output', help='Write the summary as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(REPO_ROOT, 'config', 'supported_languages.json')) as file:
+        languages = json.load(file)
+
+    with ExitStack() as stack:
+        base_url = args.target.rstrip('/') if args.target else f"http://127.0.0.1:{args.app_port}"
+
+        if not args.target:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix='erasmoon-loadtest-'))
+            database_url = args.database_url
+            if database_url is None:
+                from benchmarks.synthetic import generate_database
+                database_url = f"sqlite:///{os.path.join(workdir, 'cities.db')}"
+                print(f"Generating a synthetic database with {args.cities} cities...", file=sys.stderr)
+                generate_database(database_url, args.cities, languages)
+
+            from benchmarks.synthetic import instance_environment
+
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            env = {
+                **os.environ,
+                **instance_environment(workdir),
+                'FLASK_ENV': 'production',
+                'DATABASE_URL': database_url,
+                'SECRET_KEY': os.environ.get('SECRET_KEY', 'loadtest'),
+                'AUTH0_BASE_URL': stub_url,
+                'AUTH0_CLIENT_ID': CLIENT_ID,
+                'AUTH0_CLIENT_SECRET': 'loadtest-secret',
+                'AUTHLIB_INSECURE_TRANSPORT': '1',
+            }
+            start_process(stack, [sys.executable, '-m', 'loadtest.oidc_stub',
+                                  '--port', str(args.stub_port), '--client-id', CLIENT_ID], env)
+            wait_until_ready(f"{stub_url}/.well-known/openid-configuration")
+            start_process(stack, [sys.executable, '-m', 'gunicorn', 'app:app', *GUNICORN_OPTIONS,
+                                  f"--bind=127.0.0.1:{args.app_port}"], env)
+            wait_until_ready(base_url + '/')
+
+        landing = requests.get(base_url + '/', timeout=30)
+        codes = sorted(set(re.findall(r'data-eurostat-code="([^"]+)"', landing.text)))
+        if not codes:
+            raise SystemExit('No cities found on the landing page.')
+
+        print(f"Running {args.users} users for {args.duration:.0f}s against {base_url}...", file=sys.stderr)
+        stats = LatencyStats()
+        deadline = time.monotonic() + args.duration
+        started = time.monotonic()
+        users = [
+            threading.Thread(target=virtual_user, args=(base_url, codes, languages, deadline, stats, seed))
+            for seed in range(args.users)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        summary = stats.summary(time.monotonic() - started)
+
+    print(f"{'route':<22} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, row in summary.items():
+        print(f"{route:<22} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'users': args.users, 'duration_s': args.duration, 'routes': summary}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
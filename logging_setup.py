@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Standard fields are ts, level, logger and message; exception tracebacks
+    go to exc_info and values passed with `extra=` are added as fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through only a fraction of the DEBUG records of selected loggers.
+
+    Rates are keyed by logger name and apply to child loggers too, e.g.
+    {'data_manager': 0.01} keeps about one in a hundred DEBUG records from
+    data_manager. Records at INFO and above always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first, so the most specific rate wins
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(f'{name}.'):
+                return random.random() < rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records instead of blocking when the queue is full.
+
+    Unlike the stock QueueHandler it does not format the message on the
+    calling thread; the listener thread does it when the record is written.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+def configure_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None,
+                      sample_rates: Optional[Dict[str, float]] = None, fmt: Optional[str] = None,
+                      queue_size: int = 10000) -> QueueListener:
+    """
+    Routes all logging through a bounded queue to a stdout handler on a background thread.
+
+    Request threads only enqueue records, so they never wait on stdout. Each
+    argument defaults to an environment variable:
+
+    - LOG_LEVEL: root level, e.g. INFO.
+    - LOG_LEVELS: per-module levels, e.g. "data_manager=WARNING,sqlalchemy.engine=INFO".
+    - LOG_SAMPLE: DEBUG sampling rates, e.g. "data_manager=0.01".
+    - LOG_FORMAT: "json" (default) or "text".
+
+    Args:
+        level (Optional[str]): Root log level.
+        module_levels (Optional[Dict[str, str]]): Levels keyed by logger name.
+        sample_rates (Optional[Dict[str, float]]): Fraction of DEBUG records kept, keyed by logger name.
+        fmt (Optional[str]): Output format, 'json' or 'text'.
+        queue_size (int): Records buffered before new ones are dropped.
+
+    Returns:
+        QueueListener: The running listener; it is stopped and flushed at exit.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    module_levels = module_levels if module_levels is not None else _parse_pairs(os.environ.get('LOG_LEVELS', ''))
+    sample_rates = sample_rates if sample_rates is not None else {
+        name: float(rate) for name, rate in _parse_pairs(os.environ.get('LOG_SAMPLE', '')).items()
+    }
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'json')
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        JsonFormatter() if fmt == 'json'
+        else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    )
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    pairs = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            pairs[name.strip()] = setting.strip()
+    return pairs
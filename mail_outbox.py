@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import logging
+import smtplib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+from flask_mail import BadHeaderError, Mail, Message
+
+from write_queue import WriteJournal
+
+logger = logging.getLogger(__name__)
+
+# Errors about the message itself: retry it with backoff, then dead-letter it
+REJECTION_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+# Anything else (smtplib errors are OSErrors) says nothing about the message: keep it queued and reconnect
+CONNECTION_ERRORS = (OSError,)
+
+
+class MailOutbox:
+    """
+    Journal-backed outbox that sends mail through Flask-Mail on a background thread.
+
+    Request code only journals the message. The sender thread keeps a single SMTP
+    connection open across batches, throttles to a configured rate and retries
+    failures with exponential backoff. Messages the server keeps rejecting are
+    moved to a dead-letter journal next to the outbox.
+
+    For local testing, run a debugging SMTP server, e.g.
+        python -m aiosmtpd -n -l localhost:1025
+    and start the app with MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false.
+    """
+
+    def __init__(self, app: Flask, mail: Mail, journal: WriteJournal, batch_size: int = 20,
+                 rate_per_second: float = 1.0, max_attempts: int = 5, backoff_base: float = 2.0,
+                 idle_timeout: float = 30.0, poll_interval: float = 1.0):
+        """
+        Initializes the outbox.
+
+        Args:
+            app (Flask): Application providing the Flask-Mail configuration.
+            mail (Mail): Configured Flask-Mail extension.
+            journal (WriteJournal): Journal holding queued messages.
+            batch_size (int): Messages sent per batch over one connection.
+            rate_per_second (float): Maximum sustained send rate.
+            max_attempts (int): Attempts before a rejected message is dead-lettered.
+            backoff_base (float): Base delay in seconds for exponential backoff.
+            idle_timeout (float): Seconds an unused SMTP connection is kept open.
+            poll_interval (float): Seconds between checks for new messages.
+        """
+        self.app = app
+        self.mail = mail
+        self.journal = journal
+        self.dead_letters = WriteJournal(f"{journal.path}.failed")
+        self.batch_size = batch_size
+        self.rate_per_second = rate_per_second
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self._connection = None
+        self._last_used = 0.0
+        self._tokens = 1.0
+        self._tokens_updated = time.monotonic()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, subject: str, recipients: List[str], body: str) -> None:
+        """
+        Journals a plain-text message for delivery.
+
+        Args:
+            subject (str): Message subject.
+            recipients (List[str]): Recipient addresses.
+            body (str): Plain-text body.
+        """
+        self.journal.append({'subject': subject, 'recipients': recipients, 'body': body})
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """
+        Starts the background sender thread.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stops the sender thread and closes the SMTP connection.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            failures = 0
+            while not self._stopping.is_set():
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                try:
+                    while not self._stopping.is_set() and self.send_pending():
+                        pass
+                    failures = 0
+                except CONNECTION_ERRORS as e:
+                    failures += 1
+                    delay = self._backoff(failures)
+                    logger.warning("Mail server unavailable (%s), retrying in %.0fs", e, delay)
+                    self._stopping.wait(delay)
+                except Exception as e:
+                    logger.error("Mail outbox failed: %s", e)
+                    self._stopping.wait(self.poll_interval)
+                if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                    self._disconnect()
+            self._disconnect()
+
+    def send_pending(self) -> int:
+        """
+        Sends one batch of queued messages over the pooled connection.
+
+        Must run inside an application context. Connection errors propagate and
+        leave the undelivered rest of the batch queued.
+
+        Returns:
+            int: Number of messages consumed from the outbox.
+        """
+        with self.journal.exclusive_consumer() as acquired:
+            if not acquired:
+                return 0
+            pending = self.journal.read_pending_with_offsets(self.batch_size)
+            if not pending:
+                return 0
+            delivered_offset = None
+            try:
+                for record, offset in pending:
+                    self._deliver(record)
+                    delivered_offset = offset
+            finally:
+                # Never resend what already went out, even if the connection dropped mid-batch
+                if delivered_offset is not None:
+                    self.journal.commit(delivered_offset)
+        logger.info("Sent %s queued emails", len(pending))
+        return len(pending)
+
+    def _deliver(self, record: Dict[str, Any]) -> None:
+        try:
+            message = Message(subject=record['subject'], recipients=record['recipients'], body=record['body'])
+        except (KeyError, TypeError) as e:
+            logger.error("Dropping malformed queued email: %s", e)
+            self.dead_letters.append({**record, 'error': str(e)})
+            return
+
+        for attempt in range(1, self.max_attempts + 1):
+            self._throttle()
+            try:
+                self._connect().send(message)
+                self._last_used = time.monotonic()
+                return
+            except (BadHeaderError, AssertionError) as e:
+                logger.error("Dropping invalid email to %s: %r", record['recipients'], e)
+                self.dead_letters.append({**record, 'error': repr(e)})
+                return
+            except REJECTION_ERRORS as e:
+                if attempt == self.max_attempts:
+                    logger.error("Giving up on email to %s after %s attempts: %s", record['recipients'], attempt, e)
+                    self.dead_letters.append({**record, 'error': str(e)})
+                    return
+                self._stopping.wait(self._backoff(attempt))
+            except CONNECTION_ERRORS:
+                self._disconnect()
+                raise
+
+    def _connect(self):
+        if self._connection is None:
+            connection = self.mail.connect()
+            connection.__enter__()
+            self._connection = connection
+        return self._connection
+
+    def _disconnect(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.__exit__(None, None, None)
+        except Exception as e:
+            logger.debug("Error closing SMTP connection: %s", e)
+        self._connection = None
+
+    def _throttle(self) -> None:
+        # Token bucket holding at most one message, refilled at rate_per_second
+        while True:
+            now = time.monotonic()
+            self._tokens = min(1.0, self._tokens + (now - self._tokens_updated) * self.rate_per_second)
+            self._tokens_updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            time.sleep((1.0 - self._tokens) / self.rate_per_second)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_base ** attempt, 300.0)
+
+
+def waitlist_confirmation(email: str) -> Dict[str, Any]:
+    """
+    Builds the confirmation sent to a new waitlist signup.
+    """
+    return {
+        'subject': "You're on the erasmoon waitlist 🌙",
+        'recipients': [email],
+        'body': (
+            "Hi!\n\n"
+            "Thanks for joining the erasmoon waitlist. We'll let you know as soon as there is something new "
+            "to help you pick your Erasmus destination.\n\n"
+            "Michał from erasmoon"
+        ),
+    }
+
+
+def feedback_notification(recipient: str, feedback: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Builds one notification covering a batch of feedback submissions.
+    """
+    entries = '\n\n'.join(f"[{item['timestamp']}]\n{item['content']}" for item in feedback)
+    return {
+        'subject': f"erasmoon: {len(feedback)} new feedback submission{'s' if len(feedback) != 1 else ''}",
+        'recipients': [recipient],
+        'body': entries,
+    }
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import insert
+
+from models import MetricIndicator, MetricObservation
+
+logger = logging.getLogger(__name__)
+
+# Eurostat urb_percep indicators behind the Metrics columns; for safety, pairs are tried in order of preference
+SAFETY_INDICATOR_PAIRS = [('PS3514V', 'PS3515V'), ('PS3290V', 'PS3291V'),
+                          ('PS3519V', 'PS3520V'), ('PS3300V', 'PS3301V')]
+PUBLIC_TRANSPORT_INDICATORS = ['PS1012V', 'PS1013V']
+
+TOPIC_COLUMNS = {
+    'safety': 'safety_index',
+    'public_transport': 'public_transport_satisfaction',
+}
+
+
+def topic_value(topic: str, values: Dict[str, float]) -> Optional[float]:
+    """
+    Derives a Metrics value from the indicator values of one city and period.
+
+    Args:
+        topic (str): 'safety' or 'public_transport'.
+        values (Dict[str, float]): Indicator values keyed by indicator code.
+
+    Returns:
+        Optional[float]: The value rounded to one decimal, or None if the indicators are missing.
+    """
+    if topic == 'safety':
+        for pair in SAFETY_INDICATOR_PAIRS:
+            if all(indicator in values for indicator in pair):
+                return round(sum(values[indicator] for indicator in pair), 1)
+        return None
+    present = [values[indicator] for indicator in PUBLIC_TRANSPORT_INDICATORS if indicator in values]
+    return round(sum(present), 1) if present else None
+
+
+def new_observations(session: Any, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Returns the observations of a frame that are not stored yet or whose value changed.
+
+    A changed value becomes the next revision of its (city, indicator, period).
+
+    Args:
+        session (Session): Open session.
+        frame (pd.DataFrame): Observations with eurostat_code, indicator, period and value columns.
+
+    Returns:
+        List[Dict[str, Any]]: Rows to append, with the indicator code rather than its id.
+    """
+    indicator_ids = dict(session.query(MetricIndicator.code, MetricIndicator.id))
+    known_ids = [indicator_ids[code] for code in frame['indicator'].unique() if code in indicator_ids]
+    codes_by_id = {indicator_id: code for code, indicator_id in indicator_ids.items()}
+
+    latest: Dict[Tuple[str, str, int], Tuple[int, float]] = {}
+    if known_ids:
+        rows = session.query(
+            MetricObservation.eurostat_code, MetricObservation.indicator_id, MetricObservation.period,
+            MetricObservation.revision, MetricObservation.value,
+        ).filter(MetricObservation.indicator_id.in_(known_ids)).order_by(MetricObservation.revision)
+        for eurostat_code, indicator_id, period, revision, value in rows:
+            latest[(eurostat_code, codes_by_id[indicator_id], period)] = (revision, value)
+
+    additions = []
+    for eurostat_code, indicator, period, value in frame[['eurostat_code', 'indicator', 'period', 'value']].itertuples(
+            index=False):
+        stored = latest.get((eurostat_code, indicator, int(period)))
+        if stored is not None and abs(stored[1] - value) < 1e-9:
+            continue
+        additions.append({
+            'eurostat_code': eurostat_code,
+            'indicator': indicator,
+            'period': int(period),
+            'revision': 0 if stored is None else stored[0] + 1,
+            'value': float(value),
+        })
+    return additions
+
+
+def append_observations(session: Any, additions: List[Dict[str, Any]], source: str) -> None:
+    """
+    Appends observations, registering indicator codes that have no id yet.
+
+    Args:
+        session (Session): Open transaction.
+        additions (List[Dict[str, Any]]): Rows from new_observations.
+        source (str): Source name stored with new indicators.
+    """
+    if not additions:
+        return
+    indicator_ids = dict(session.query(MetricIndicator.code, MetricIndicator.id))
+    missing = sorted({row['indicator'] for row in additions} - set(indicator_ids))
+    if missing:
+        session.execute(insert(MetricIndicator), [{'source': source, 'code': code} for code in missing])
+        indicator_ids = dict(session.query(MetricIndicator.code, MetricIndicator.id))
+
+    today = date.today()
+    session.execute(insert(MetricObservation), [
+        {'eurostat_code': row['eurostat_code'], 'indicator_id': indicator_ids[row['indicator']],
+         'period': row['period'], 'revision': row['revision'], 'value': row['value'], 'recorded_on': today}
+        for row in additions
+    ])
+    logger.info("Appended %s metric observations", len(additions))
+
+
+def fetch_history(session: Any, eurostat_code: str) -> Dict[str, Dict[int, float]]:
+    """
+    Returns the latest revision of every stored observation of a city.
+
+    Reads one contiguous primary key range of metric_observations.
+
+    Args:
+        session (Session): Open session.
+        eurostat_code (str): Eurostat code of the city.
+
+    Returns:
+        Dict[str, Dict[int, float]]: Values by period, keyed by indicator code.
+    """
+    rows = session.query(
+        MetricIndicator.code, MetricObservation.period, MetricObservation.value
+    ).join(MetricIndicator, MetricIndicator.id == MetricObservation.indicator_id).filter(
+        MetricObservation.eurostat_code == eurostat_code
+    ).order_by(MetricObservation.indicator_id, MetricObservation.period, MetricObservation.revision)
+
+    history: Dict[str, Dict[int, float]] = {}
+    for code, period, value in rows:
+        history.setdefault(code, {})[period] = value  # later revisions overwrite earlier ones
+    return history
+
+
+def to_trends(history: Dict[str, Dict[int, float]]) -> Dict[str, Any]:
+    """
+    Turns a city's indicator history into the trend payload of the Metrics columns.
+
+    Args:
+        history (Dict[str, Dict[int, float]]): Output of fetch_history.
+
+    Returns:
+        Dict[str, Any]: 'trends' with [{'period', 'value'}] per Metrics column, oldest first,
+            and 'indicators' with the same for every raw indicator.
+    """
+    periods = sorted({period for values in history.values() for period in values})
+    trends = {}
+    for topic, column in TOPIC_COLUMNS.items():
+        points = []
+        for period in periods:
+            value = topic_value(topic, {code: values[period] for code, values in history.items() if period in values})
+            if value is not None:
+                points.append({'period': period, 'value': value})
+        trends[column] = points
+    return {
+        'trends': trends,
+        'indicators': {
+            code: [{'period': period, 'value': value} for period, value in sorted(values.items())]
+            for code, values in sorted(history.items())
+        },
+    }
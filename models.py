@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, BigInteger, Numeric, Index, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Date, ForeignKey, BigInteger, Numeric, Index, Text, DateTime, Boolean, LargeBinary, event
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 
+from helpers import sanitize_filename
+
 
 Base = declarative_base()
 
@@ -18,6 +20,7 @@ class City(Base):
     erasmus_population = Column(Integer, nullable=True)
     lat = Column(Numeric(9, 6), nullable=True)
     lon = Column(Numeric(9, 6), nullable=True)
+    image_slug = Column(String(255), nullable=True)  # static/images/<image_slug>_<width>.jpg, kept in step with english_name
     last_updated = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
     
     climate = relationship("Climate", back_populates="city", uselist=False, cascade="all, delete-orphan")
@@ -27,10 +30,16 @@ class City(Base):
     universities = relationship("University", back_populates="city", cascade="all, delete-orphan")
     guide = relationship("Guide", back_populates="city", uselist=False, cascade="all, delete-orphan")
     transport_budget = relationship("TransportBudget", back_populates="city", uselist=False, cascade="all, delete-orphan")
+    university_stats = relationship("CityUniversityStats", back_populates="city", uselist=False, cascade="all, delete-orphan")
+    climate_summary = relationship("ClimateSummary", back_populates="city", uselist=False, cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<City(name='{self.local_name}', country='{self.local_country}')>"
 
+@event.listens_for(City.english_name, 'set')
+def _update_image_slug(city, english_name, old_english_name, initiator):
+    city.image_slug = sanitize_filename(english_name) if english_name else None
+
 class Climate(Base):
     __tablename__ = 'climate'
 
@@ -176,6 +185,100 @@ class University(Base):
     def __repr__(self):
         return f"<University(name='{self.name}', eurostat_code='{self.eurostat_code}')>"
 
+class CityUniversityStats(Base):
+    __tablename__ = 'city_university_stats'
+
+    # Rollups of the universities table, rebuilt by university_aggregates.rebuild()
+    eurostat_code = Column(String(50), ForeignKey('cities.eurostat_code'), primary_key=True)
+    university_count = Column(Integer, nullable=False, index=True)
+    total_students = Column(BigInteger, nullable=True, index=True)
+    mobile_students = Column(BigInteger, nullable=True)
+    generic_students = Column(BigInteger, nullable=True)
+    education_students = Column(BigInteger, nullable=True)
+    arts_humanities_students = Column(BigInteger, nullable=True)
+    social_sciences_students = Column(BigInteger, nullable=True)
+    business_law_students = Column(BigInteger, nullable=True)
+    it_students = Column(BigInteger, nullable=True)
+    aec_students = Column(BigInteger, nullable=True)
+    agriculture_vet_students = Column(BigInteger, nullable=True)
+    med_students = Column(BigInteger, nullable=True)
+    services_students = Column(BigInteger, nullable=True)
+    foreign_share = Column(Float, nullable=True)  # weighted by total_students
+    mobile_share = Column(Float, nullable=True)
+    top_universities = Column(Text, nullable=False)  # JSON list, largest size_class first
+    last_updated = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
+
+    city = relationship("City", back_populates="university_stats")
+
+    def __repr__(self):
+        return f"<CityUniversityStats(eurostat_code='{self.eurostat_code}', university_count={self.university_count})>"
+
+class CityFieldStats(Base):
+    __tablename__ = 'city_field_stats'
+
+    # Per-field city ranking, rebuilt from city_university_stats by university_aggregates.rebuild()
+    field = Column(String(50), primary_key=True)
+    eurostat_code = Column(String(50), ForeignKey('cities.eurostat_code'), primary_key=True)
+    students = Column(BigInteger, nullable=False)
+    field_share = Column(Float, nullable=True)  # share of the city's students in this field
+    mobile_share = Column(Float, nullable=True)  # share of mobile students in the city
+    rank = Column(Integer, nullable=False)  # 1 = most students in this field
+
+    __table_args__ = (
+        Index('idx_city_field_stats_field_rank', 'field', 'rank'),
+    )
+
+    def __repr__(self):
+        return f"<CityFieldStats(field='{self.field}', eurostat_code='{self.eurostat_code}', rank={self.rank})>"
+
+class ClimateSummary(Base):
+    __tablename__ = 'climate_summaries'
+
+    # Derived from the climate table by climate_summaries.rebuild()
+    eurostat_code = Column(String(50), ForeignKey('cities.eurostat_code'), primary_key=True)
+    temperatures = Column(LargeBinary(24), nullable=False)  # 24 signed bytes: min, max per month from January
+    winter_mean = Column(Float, nullable=True)  # mean of the monthly means, October to February
+    summer_mean = Column(Float, nullable=True)  # March to July
+    weather_category = Column(String(10), nullable=True, index=True)  # 'cold', 'mild' or 'warm'
+    last_updated = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
+
+    city = relationship("City", back_populates="climate_summary")
+
+    def __repr__(self):
+        return f"<ClimateSummary(eurostat_code='{self.eurostat_code}', weather_category='{self.weather_category}')>"
+
+class MetricIndicator(Base):
+    __tablename__ = 'metric_indicators'
+
+    # Integer codes for the indicators in metric_observations
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(50), nullable=False)
+    code = Column(String(50), nullable=False, unique=True)  # e.g. Eurostat indic_ur 'PS3514V'
+
+    def __repr__(self):
+        return f"<MetricIndicator(id={self.id}, code='{self.code}')>"
+
+class MetricObservation(Base):
+    __tablename__ = 'metric_observations'
+
+    # Append-only history: a revised value is stored as the next revision, never overwritten
+    eurostat_code = Column(String(50), ForeignKey('cities.eurostat_code'), primary_key=True)
+    indicator_id = Column(SmallInteger, ForeignKey('metric_indicators.id'), primary_key=True)
+    period = Column(SmallInteger, primary_key=True)  # reference year
+    revision = Column(SmallInteger, primary_key=True, default=0)
+    value = Column(Float, nullable=False)
+    recorded_on = Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index('idx_metric_observations_indicator_period', 'indicator_id', 'period'),
+        # Rows are stored in primary key order, so a city's history is one contiguous range
+        {'sqlite_with_rowid': False},
+    )
+
+    def __repr__(self):
+        return (f"<MetricObservation(eurostat_code='{self.eurostat_code}', indicator_id={self.indicator_id}, "
+                f"period={self.period}, revision={self.revision})>")
+
 class Feedback(Base):
     __tablename__ = 'feedback'
 
@@ -211,6 +314,38 @@ class User(Base):
     premium_expiry = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     last_login = Column(DateTime, nullable=True)
+    # moonScore ranking weights; NULL means the default weights
+    weight_popularity = Column(Float, nullable=True)
+    weight_affordability = Column(Float, nullable=True)
+    weight_safety = Column(Float, nullable=True)
+    weight_public_transport = Column(Float, nullable=True)
+    weight_language = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f'<User {self.email}>'
+
+
+class CityReadModel(Base):
+    __tablename__ = 'city_read_model'
+
+    eurostat_code = Column(String(50), primary_key=True)
+    position = Column(Integer, nullable=False, index=True)  # overview order (erasmus_population desc)
+    overview = Column(Text, nullable=False)  # JSON payload for index.html
+    detail = Column(Text, nullable=False)  # JSON payload for city_detail.html
+    last_updated = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CityReadModel(eurostat_code='{self.eurostat_code}', position={self.position})>"
+
+
+class DataVersion(Base):
+    __tablename__ = 'data_version'
+
+    # A single row, bumped once per rebuild of derived data
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    instance_id = Column(String(32), nullable=True)  # random, set when the row is created
+    last_updated = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
-        return f'<User {self.email}>'
\ No newline at end of file
+        return f"<DataVersion(version={self.version})>"
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# moonScore sub-scores, in matrix column order; the language column is picked per request
+SUB_SCORES = ['popularity', 'affordability', 'safety', 'public_transport', 'language']
+DEFAULT_WEIGHTS = {name: 0.2 for name in SUB_SCORES}
+
+# Fallbacks used by computeAndRenderRatings in static/scripts.js for missing data
+DEFAULT_SAFETY_INDEX = 65
+DEFAULT_PUBLIC_TRANSPORT_SATISFACTION = 60
+
+CACHE_SIZE = 256
+
+
+class RankingEngine:
+    """
+    moonScore rankings with per-user sub-score weights.
+
+    The sub-scores mirror computeAndRenderRatings in static/scripts.js, each on
+    a 0-5 scale. They are computed once per data version into a cities x
+    (4 + languages) matrix, so a ranking for any weight vector is a single
+    matrix-vector product plus a sort. Rankings are memoized per language and
+    weight vector, which makes custom weights as cheap as the default after
+    the first request.
+    """
+
+    def __init__(self, cities: Sequence[Dict[str, Any]], supported_languages: List[str]):
+        """
+        Computes the sub-score matrix.
+
+        Args:
+            cities (Sequence[Dict[str, Any]]): Overview payloads, as returned by get_cities_overview.
+            supported_languages (List[str]): Languages with a language sub-score column.
+        """
+        self.cities = [
+            {key: city.get(key) for key in ('eurostat_code', 'english_name', 'english_country', 'country_emoji')}
+            for city in cities
+        ]
+        self.languages = {language: 4 + column for column, language in enumerate(supported_languages)}
+
+        popularity = _numbers([city.get('erasmus_population') for city in cities])
+        known = popularity[~np.isnan(popularity)]
+        mean = known.mean() if len(known) else 0.0
+        std = (known.std() if len(known) else 0.0) or 1.0
+        z_scores = np.nan_to_num((popularity - mean) / std)
+
+        cost = _numbers([city.get('cost_of_living_plus_rent') for city in cities])
+        safety = _numbers([city.get('safety_index') for city in cities])
+        transport = _numbers([city.get('public_transport_satisfaction') for city in cities])
+        language_shares = np.array([
+            [(city.get('language_percentages') or {}).get(language) or 0.0 for language in supported_languages]
+            for city in cities
+        ], dtype=np.float64).reshape(len(cities), len(supported_languages))
+
+        self.matrix = np.column_stack((
+            np.clip((z_scores + 3) / 6 * 5, 0, 5),
+            np.nan_to_num((100 - cost) / 75 * 5),
+            _or_default(safety, DEFAULT_SAFETY_INDEX) / 90 * 5,
+            _or_default(transport, DEFAULT_PUBLIC_TRANSPORT_SATISFACTION) / 90 * 5,
+            language_shares / 20,
+        )) if cities else np.zeros((0, 4 + len(supported_languages)))
+
+        self.ranked = lru_cache(maxsize=CACHE_SIZE)(self._ranked)
+
+    def _ranked(self, language: str, weights: Tuple[float, ...], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Ranks the cities by weighted moonScore.
+
+        Memoized as ranked(); pass weights from normalize_weights and do not mutate the results.
+
+        Args:
+            language (str): Supported language for the language sub-score.
+            weights (Tuple[float, ...]): Weights in SUB_SCORES order, summing to 1.
+            limit (Optional[int]): Maximum number of results; all cities if None.
+
+        Returns:
+            List[Dict[str, Any]]: Cities with moon_score and sub-scores, best first.
+        """
+        vector = np.zeros(self.matrix.shape[1])
+        vector[:4] = weights[:4]
+        vector[self.languages[language]] = weights[4]
+        scores = self.matrix @ vector
+
+        # Cities arrive in Erasmus population order, so the stable sort breaks ties towards popular ones
+        order = np.argsort(-scores, kind='stable')[:limit]
+        columns = [0, 1, 2, 3, self.languages[language]]
+        return [
+            {
+                **self.cities[row],
+                'moon_score': round(float(scores[row]), 2),
+                'scores': {name: round(float(self.matrix[row, column]), 2) for name, column in zip(SUB_SCORES, columns)},
+            }
+            for row in order.tolist()
+        ]
+
+    def supports(self, language: str) -> bool:
+        return language in self.languages
+
+
+def normalize_weights(weights: Dict[str, Any]) -> Tuple[float, ...]:
+    """
+    Validates sub-score weights and scales them to sum to 1.
+
+    Missing sub-scores get weight 0. The result is rounded so that nearly
+    identical weight vectors share a cache entry.
+
+    Args:
+        weights (Dict[str, Any]): Sub-score names mapped to non-negative numbers.
+
+    Returns:
+        Tuple[float, ...]: Weights in SUB_SCORES order.
+
+    Raises:
+        ValueError: If a name is unknown, a weight is not a non-negative number, or all weights are 0.
+    """
+    unknown = set(weights) - set(SUB_SCORES)
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+    values = []
+    for name in SUB_SCORES:
+        try:
+            value = float(weights.get(name, 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"Weight {name} must be a number")
+        if not np.isfinite(value) or value < 0:
+            raise ValueError(f"Weight {name} must be a non-negative number")
+        values.append(value)
+    total = sum(values)
+    if total == 0:
+        raise ValueError("At least one weight must be positive")
+    return tuple(round(value / total, 3) for value in values)
+
+
+def _numbers(values: List[Any]) -> np.ndarray:
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+def _or_default(values: np.ndarray, default: float) -> np.ndarray:
+    # Mirrors `parseFloat(x) || default`, which also replaces zeros
+    return np.where(np.isnan(values) | (values == 0), default, values)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import desc
+
+from models import City, Climate, CostOfLiving, Metrics
+
+logger = logging.getLogger(__name__)
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+CLIMATE_FEATURES = [f'mean_{month}_{bound}' for month in MONTHS for bound in ('min', 'max')]
+
+# Feature groups. Each group carries the same total weight in the similarity
+# distance, however many columns it has, so 24 climate columns don't drown out safety.
+BUDGET_FEATURES = ['monthly_budget', 'cost_of_living_plus_rent']
+SAFETY_FEATURES = ['safety_index']
+TRANSPORT_FEATURES = ['public_transport_satisfaction']
+
+# How a preference on a feature is read: at most (-1), at least (+1) or close to (0)
+AT_MOST, CLOSE_TO, AT_LEAST = -1, 0, 1
+PREFERENCE_DIRECTIONS = {
+    'monthly_budget': AT_MOST,
+    'cost_of_living_plus_rent': AT_MOST,
+    'safety_index': AT_LEAST,
+    'public_transport_satisfaction': AT_LEAST,
+    **{feature: CLOSE_TO for feature in CLIMATE_FEATURES},
+}
+
+CACHE_SIZE = 1024
+
+
+class RecommendationEngine:
+    """
+    Similar-city and preference-matching recommendations over a normalized feature matrix.
+
+    The matrix holds one row per city: budget, the 24 monthly climate means,
+    safety, public transport satisfaction and the share of speakers of each
+    supported language. Columns are z-scored, missing values are imputed with
+    the column mean and every feature group is scaled to the same total weight.
+    An engine is built once per data version; its answers are memoized, so the
+    cache is dropped together with the engine when the data changes.
+    """
+
+    def __init__(self, cities: Sequence[Dict[str, Any]], raw: np.ndarray, features: List[str],
+                 groups: List[List[str]]):
+        """
+        Initializes the engine from raw feature values.
+
+        Args:
+            cities (Sequence[Dict[str, Any]]): City summaries, in the row order of raw.
+            raw (np.ndarray): Cities x features matrix, NaN where a value is missing.
+            features (List[str]): Column names of raw.
+            groups (List[List[str]]): Feature groups that get equal weight.
+        """
+        self.cities = list(cities)
+        self.features = features
+        self.feature_index = {feature: column for column, feature in enumerate(features)}
+        self.row_index = {city['eurostat_code']: row for row, city in enumerate(self.cities)}
+
+        self.mean = np.nanmean(raw, axis=0) if len(raw) else np.zeros(len(features))
+        self.mean = np.nan_to_num(self.mean)
+        self.std = np.nanstd(raw, axis=0) if len(raw) else np.ones(len(features))
+        self.std = np.where(np.nan_to_num(self.std) > 0, self.std, 1.0)
+        self.matrix = np.nan_to_num((raw - self.mean) / self.std)
+
+        self.weights = np.ones(len(features))
+        for group in groups:
+            columns = [self.feature_index[feature] for feature in group]
+            self.weights[columns] = 1.0 / np.sqrt(len(columns))
+        self.matrix = self.matrix * self.weights
+
+        self.similar = lru_cache(maxsize=CACHE_SIZE)(self._similar)
+        self.matching = lru_cache(maxsize=CACHE_SIZE)(self._matching)
+
+    @classmethod
+    def load(cls, session: Any, language_data: Dict[str, Dict[str, float]],
+             supported_languages: List[str]) -> 'RecommendationEngine':
+        """
+        Builds the engine from the cities, climate, cost of living, metrics and language tables.
+
+        Args:
+            session (Session): Open session.
+            language_data (Dict[str, Dict[str, float]]): Share of speakers per country and language, 0-1.
+            supported_languages (List[str]): Languages that get a feature column.
+
+        Returns:
+            RecommendationEngine: The engine.
+        """
+        rows = session.query(
+            City.eurostat_code, City.english_name, City.english_country, City.country_emoji,
+            CostOfLiving.monthly_budget, CostOfLiving.cost_of_living_plus_rent_index,
+            *[getattr(Climate, feature) for feature in CLIMATE_FEATURES],
+            Metrics.safety_index, Metrics.public_transport_satisfaction,
+        ).outerjoin(CostOfLiving, CostOfLiving.eurostat_code == City.eurostat_code
+        ).outerjoin(Climate, Climate.eurostat_code == City.eurostat_code
+        ).outerjoin(Metrics, Metrics.eurostat_code == City.eurostat_code
+        ).order_by(desc(City.erasmus_population)).all()
+
+        language_features = [language_feature(language) for language in supported_languages]
+        features = [*BUDGET_FEATURES, *CLIMATE_FEATURES, *SAFETY_FEATURES, *TRANSPORT_FEATURES, *language_features]
+        cities = []
+        raw = np.full((len(rows), len(features)), np.nan)
+        for row_number, (code, name, country, emoji, *values) in enumerate(rows):
+            cities.append({'eurostat_code': code, 'english_name': name,
+                           'english_country': country, 'country_emoji': emoji})
+            languages = language_data.get(country, {})
+            values += [None if languages.get(language) is None else languages[language] * 100
+                       for language in supported_languages]
+            raw[row_number] = [np.nan if value is None else float(value) for value in values]
+
+        groups = [BUDGET_FEATURES, CLIMATE_FEATURES, SAFETY_FEATURES, TRANSPORT_FEATURES, language_features]
+        return cls(cities, raw, features, groups)
+
+    def _similar(self, eurostat_code: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cities closest to a city across all feature groups.
+
+        Memoized as similar(); results are shared, do not mutate them.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Most similar cities first, or None if the city is unknown.
+        """
+        row = self.row_index.get(eurostat_code)
+        if row is None:
+            return None
+        distances = np.sqrt(np.square(self.matrix - self.matrix[row]).sum(axis=1))
+        distances[row] = np.inf
+        return self._top(distances, limit)
+
+    def _matching(self, preferences: Tuple[Tuple[str, float], ...], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Returns the cities closest to a set of preferences.
+
+        Only the features named in the preferences count. Budget preferences
+        are maxima, safety, transport and language preferences minima, and
+        climate preferences targets. Among equally good matches, more popular
+        Erasmus destinations come first.
+
+        Memoized as matching(); pass the preferences as a sorted tuple of pairs
+        (see normalize_preferences) and do not mutate the results.
+
+        Args:
+            preferences (Tuple[Tuple[str, float], ...]): Feature name and preferred value pairs.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Best matches first.
+        """
+        columns = [self.feature_index[feature] for feature, _ in preferences]
+        targets = (np.array([value for _, value in preferences]) - self.mean[columns]) / self.std[columns]
+        differences = self.matrix[:, columns] / self.weights[columns] - targets
+        directions = np.array([preference_direction(feature) for feature, _ in preferences])
+        differences = np.where(directions > 0, np.minimum(differences, 0.0), differences)
+        differences = np.where(directions < 0, np.maximum(differences, 0.0), differences)
+        return self._top(np.sqrt(np.square(differences * self.weights[columns]).sum(axis=1)), limit)
+
+    def normalize_preferences(self, preferences: Dict[str, Any]) -> Tuple[Tuple[str, float], ...]:
+        """
+        Validates raw preferences and turns them into the hashable form matching() takes.
+
+        Args:
+            preferences (Dict[str, Any]): Feature names or 'language' mapped to values.
+                'language' names a supported language, optionally with 'language_min' (default 50).
+
+        Returns:
+            Tuple[Tuple[str, float], ...]: Sorted (feature, value) pairs.
+
+        Raises:
+            ValueError: If a preference names an unknown feature or value, or language_min
+                comes without a language.
+        """
+        if 'language_min' in preferences and 'language' not in preferences:
+            raise ValueError("Preference language_min needs a language")
+        normalized = {}
+        for name, value in preferences.items():
+            if name == 'language_min':
+                continue
+            if name == 'language':
+                feature = language_feature(value)
+                if feature not in self.feature_index:
+                    raise ValueError(f"Unsupported language: {value}")
+                normalized[feature] = _to_number('language_min', preferences.get('language_min', 50))
+            elif name in PREFERENCE_DIRECTIONS:
+                normalized[name] = _to_number(name, value)
+            else:
+                raise ValueError(f"Unknown preference: {name}")
+        return tuple(sorted(normalized.items()))
+
+    def _top(self, distances: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+        # Rows are ordered by Erasmus population, so the stable sort breaks ties towards popular cities
+        candidates = np.argsort(distances, kind='stable')[:max(limit, 0)]
+        return [
+            {**self.cities[row], 'distance': round(float(distances[row]), 3),
+             'similarity': round(1.0 / (1.0 + float(distances[row])), 3)}
+            for row in candidates.tolist() if np.isfinite(distances[row])
+        ]
+
+
+def _to_number(name: str, value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Preference {name} must be a number")
+    if not np.isfinite(number):
+        raise ValueError(f"Preference {name} must be a number")
+    return number
+
+
+def language_feature(language: str) -> str:
+    return f'language_{language}'
+
+
+def preference_direction(feature: str) -> int:
+    return AT_LEAST if feature.startswith('language_') else PREFERENCE_DIRECTIONS[feature]
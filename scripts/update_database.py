@@ -1,16 +1,9 @@
-from data_manager import DataManager, Config
-import os
-from dotenv import load_dotenv
+"""
+Kept for existing deploy scripts; use `flask data update` directly.
 
-load_dotenv()
+Arguments are passed through, e.g. `python scripts/update_database.py --dry-run`.
+"""
+import subprocess
+import sys
 
-config = Config(
-    DATA_DIR=os.environ.get('DATA_DIR', 'data'),
-    SUPPORTED_CITIES_FILE=os.environ.get('SUPPORTED_CITIES_FILE', 'config/supported_cities.json'),
-    SUPPORTED_LANGUAGES_FILE=os.environ.get('SUPPORTED_LANGUAGES_FILE', 'config/supported_languages.json'),
-    LANGUAGE_SKILLS_FILE=os.environ.get('LANGUAGE_SKILLS_FILE', 'europeans_and_their_languages_2024_summed.csv'),
-    DATABASE_URL=os.environ.get('DATABASE_URL', 'sqlite:///instance/cities.db')
-)
-data_manager = DataManager(config)
-
-data_manager.update_eurostat_urb_percep()
\ No newline at end of file
+subprocess.run(['flask', '--app', 'app', 'data', 'update', *sys.argv[1:]], check=True)
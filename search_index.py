@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import html
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import City, Guide, University
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'city_search'
+
+# bm25 column weights, in table column order: eurostat_code (unindexed), name, universities, guide
+SQLITE_BM25_WEIGHTS = '0.0, 10.0, 3.0, 1.0'
+POSTGRES_TEXT_SEARCH_CONFIG = 'english'
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "eurostat_code UNINDEXED, name, universities, guide, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+]
+
+POSTGRES_SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+    "eurostat_code VARCHAR(50) PRIMARY KEY REFERENCES cities (eurostat_code) ON DELETE CASCADE, "
+    "name TEXT NOT NULL, universities TEXT NOT NULL, guide TEXT NOT NULL, document TSVECTOR NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+]
+
+# Models whose rows make up the documents; writes to them must re-index their cities
+INDEXED_MODELS = (City, Guide, University)
+
+
+class SearchIndexUnavailable(Exception):
+    """
+    Raised by search when the database has no search table, e.g. one created with create_all only.
+    """
+
+
+# Snippet highlight markers; control characters never occur in guide text, so they survive html-escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+def create_search_schema(connection: Any) -> None:
+    """
+    Creates the search table for the connection's dialect if it does not exist.
+
+    The table lives outside the ORM metadata: SQLite uses an FTS5 virtual table,
+    Postgres a regular table with a weighted tsvector column and a GIN index.
+
+    Args:
+        connection (Connection): Open SQLAlchemy connection.
+    """
+    statements = POSTGRES_SCHEMA if connection.dialect.name == 'postgresql' else SQLITE_SCHEMA
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def build_documents(session: Any, eurostat_codes: Optional[Iterable[str]] = None) -> List[Dict[str, str]]:
+    """
+    Builds the searchable text of each city from its names, universities and guide.
+
+    Args:
+        session (Session): Open session.
+        eurostat_codes (Optional[Iterable[str]]): Cities to build; all cities if None.
+
+    Returns:
+        List[Dict[str, str]]: One document per existing city.
+    """
+    cities = session.query(
+        City.eurostat_code, City.english_name, City.local_name, City.english_country, Guide.text
+    ).outerjoin(Guide, Guide.eurostat_code == City.eurostat_code)
+    universities = session.query(University.eurostat_code, University.name, University.english_name)
+    if eurostat_codes is not None:
+        eurostat_codes = list(eurostat_codes)
+        cities = cities.filter(City.eurostat_code.in_(eurostat_codes))
+        universities = universities.filter(University.eurostat_code.in_(eurostat_codes))
+
+    university_names: Dict[str, List[str]] = {}
+    for eurostat_code, name, english_name in universities:
+        university_names.setdefault(eurostat_code, []).extend(n for n in (name, english_name) if n)
+
+    return [
+        {
+            'eurostat_code': eurostat_code,
+            'name': ' '.join(n for n in (english_name, local_name, english_country) if n),
+            'universities': ' '.join(university_names.get(eurostat_code, [])),
+            'guide': _strip_html(guide_text),
+        }
+        for eurostat_code, english_name, local_name, english_country, guide_text in cities
+    ]
+
+
+def rebuild(session: Any) -> int:
+    """
+    Replaces the whole search index.
+
+    Args:
+        session (Session): Open transaction.
+
+    Returns:
+        int: Number of cities indexed.
+    """
+    documents = build_documents(session)
+    session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    _insert(session, documents)
+    logger.info("Rebuilt search index with %s cities", len(documents))
+    return len(documents)
+
+
+def refresh(session: Any, eurostat_codes: Iterable[str]) -> None:
+    """
+    Re-indexes the given cities, dropping the ones that no longer exist.
+
+    Args:
+        session (Session): Open transaction.
+        eurostat_codes (Iterable[str]): Cities whose data changed.
+    """
+    eurostat_codes = sorted(set(eurostat_codes))
+    if not eurostat_codes:
+        return
+    for eurostat_code in eurostat_codes:
+        session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE eurostat_code = :code"), {'code': eurostat_code})
+    _insert(session, build_documents(session, eurostat_codes))
+    logger.debug("Re-indexed %s cities for search", len(eurostat_codes))
+
+
+def exists(session: Any) -> bool:
+    """
+    Returns True if the database has the search table.
+    """
+    return inspect(session.connection()).has_table(SEARCH_TABLE)
+
+
+def is_empty(session: Any) -> bool:
+    """
+    Returns True if no city has been indexed yet.
+    """
+    return session.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} LIMIT 1")).first() is None
+
+
+def search(session: Any, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Runs a ranked full-text search over the city names, universities and guides.
+
+    Any word may match; cities matching more, rarer words rank higher, with
+    matches in the name weighted above universities and the guide.
+
+    Args:
+        session (Session): Open session.
+        query (str): Free-text query, e.g. "cheap student dorms".
+        limit (int): Maximum number of results.
+
+    Returns:
+        List[Dict[str, Any]]: Results with eurostat_code, english_name, country_emoji,
+            an HTML-safe snippet with <mark> highlights and a rank (higher is better).
+
+    Raises:
+        SearchIndexUnavailable: If the search table does not exist.
+    """
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return []
+    try:
+        results = _run_search(session, terms, limit)
+    except (OperationalError, ProgrammingError) as e:
+        if exists(session):
+            raise
+        raise SearchIndexUnavailable(f"{SEARCH_TABLE} does not exist; run `flask rebuild_search_index`") from e
+
+    return [
+        {
+            'eurostat_code': code,
+            'english_name': name,
+            'country_emoji': emoji,
+            'snippet': _highlight(snippet),
+            'rank': round(float(rank), 4),
+        }
+        for code, name, emoji, snippet, rank in results
+    ]
+
+
+def _run_search(session: Any, terms: List[str], limit: int) -> List[Any]:
+    if _is_postgres(session):
+        rows = session.execute(text(
+            f"SELECT s.eurostat_code, c.english_name, c.country_emoji, "
+            f"ts_headline(CAST(:config AS regconfig), s.guide || ' ' || s.universities, q, :options) AS snippet, "
+            f"ts_rank_cd(s.document, q) AS rank "
+            f"FROM {SEARCH_TABLE} s JOIN cities c ON c.eurostat_code = s.eurostat_code, "
+            f"to_tsquery(CAST(:config AS regconfig), :query) AS q "
+            f"WHERE s.document @@ q ORDER BY rank DESC LIMIT :limit"
+        ), {
+            'config': POSTGRES_TEXT_SEARCH_CONFIG,
+            'query': ' | '.join(terms),
+            'options': f"StartSel={_MARK_START}, StopSel={_MARK_END}, MinWords=10, MaxWords=30",
+            'limit': limit,
+        })
+        results = list(rows)
+    else:
+        rows = session.execute(text(
+            f"SELECT s.eurostat_code, c.english_name, c.country_emoji, "
+            f"snippet({SEARCH_TABLE}, -1, :start, :end, '…', 20) AS snippet, "
+            f"bm25({SEARCH_TABLE}, {SQLITE_BM25_WEIGHTS}) AS rank "
+            f"FROM {SEARCH_TABLE} s JOIN cities c ON c.eurostat_code = s.eurostat_code "
+            f"WHERE {SEARCH_TABLE} MATCH :query ORDER BY rank LIMIT :limit"
+        ), {
+            'start': _MARK_START,
+            'end': _MARK_END,
+            'query': ' OR '.join(f'"{term}"' for term in terms),
+            'limit': limit,
+        })
+        # bm25 is lower-is-better; flip it so both backends rank higher-is-better
+        results = [(code, name, emoji, snippet, -rank) for code, name, emoji, snippet, rank in rows]
+    return results
+
+
+def register_sync(session_factory: Any) -> None:
+    """
+    Keeps the search index in step with ORM writes to cities, guides and universities.
+
+    Changed cities are collected on flush and re-indexed in the same transaction.
+    Bulk Query.update()/delete() calls and Core insert()/update() statements
+    bypass the unit of work and are not tracked; their callers re-index with
+    refresh(), as data_update.run_update does, or run `flask rebuild_search_index`.
+
+    Args:
+        session_factory (sessionmaker): Session factory whose sessions should be tracked.
+    """
+    event.listen(session_factory, 'after_flush', _collect_changed_cities)
+    event.listen(session_factory, 'after_flush_postexec', _refresh_changed_cities)
+
+
+def _collect_changed_cities(session: Any, flush_context: Any) -> None:
+    changed: Set[str] = session.info.setdefault('search_index_changes', set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(instance, INDEXED_MODELS):
+            continue
+        if instance.eurostat_code:
+            changed.add(instance.eurostat_code)
+        # A university moved to another city also changes the city it left
+        changed.update(code for code in inspect(instance).attrs.eurostat_code.history.deleted if code)
+
+
+def _refresh_changed_cities(session: Any, flush_context: Any) -> None:
+    changed = session.info.pop('search_index_changes', None)
+    if changed:
+        refresh(session, changed)
+
+
+def _insert(session: Any, documents: List[Dict[str, str]]) -> None:
+    if not documents:
+        return
+    if _is_postgres(session):
+        session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (eurostat_code, name, universities, guide, document) "
+            f"VALUES (:eurostat_code, :name, :universities, :guide, "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :name), 'A') || "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :universities), 'B') || "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :guide), 'C'))"
+        ), [{**document, 'config': POSTGRES_TEXT_SEARCH_CONFIG} for document in documents])
+    else:
+        session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (eurostat_code, name, universities, guide) "
+            f"VALUES (:eurostat_code, :name, :universities, :guide)"
+        ), documents)
+
+
+def _is_postgres(session: Any) -> bool:
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+def _strip_html(value: Optional[str]) -> str:
+    if not value:
+        return ''
+    return ' '.join(html.unescape(re.sub(r'<[^>]+>', ' ', value)).split())
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from cachelib import BaseCache, NullCache
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K')
+T = TypeVar('T')
+
+
+class SharedCache:
+    """
+    Cache facade shared by all worker processes through a cachelib backend.
+
+    With a FileSystemCache (the default set up by Flask-Caching in app.py) a
+    value built by one gunicorn worker is read by the others instead of being
+    rebuilt. Keys are prefixed with the data version, which lives in the
+    database rather than in the backend, where it could be pruned along with
+    the entries. A rebuild in any process, e.g. the `flask refresh_read_model`
+    CLI, moves the version on and so retires the entries of every worker.
+    Keys are also prefixed with a namespace naming the database, so databases
+    that share a cache directory never read each other's entries.
+    """
+
+    def __init__(self, backend: Optional[BaseCache] = None, version: Callable[[], str] = lambda: '0',
+                 namespace: str = '', generation_check_interval: float = 1.0):
+        """
+        Args:
+            backend (Optional[BaseCache]): Store shared by the workers; a NullCache, which caches
+                nothing, if None.
+            version (Callable[[], str]): Returns the current data version.
+            namespace (str): Identifies the database the values are built from.
+            generation_check_interval (float): Seconds a worker trusts its last read of the data version.
+        """
+        self.backend = backend if backend is not None else NullCache()
+        self.version = version
+        self.namespace = namespace
+        self.generation_check_interval = generation_check_interval
+        self._lock = threading.Lock()
+        self._generation = ''
+        self._generation_fresh_until = float('-inf')
+
+    def get_or_build(self, key: str, build: Callable[[], Optional[T]], timeout: Optional[int] = None) -> Optional[T]:
+        """
+        Returns the cached value for a key, building and storing it on a miss.
+
+        None is never cached, so lookups of unknown keys always reach `build`.
+
+        Args:
+            key (str): Cache key, unique per value.
+            build (Callable[[], Optional[T]]): Builds the value from the database.
+            timeout (Optional[int]): Seconds to keep the value; the backend default if None.
+
+        Returns:
+            Optional[T]: The cached or freshly built value.
+        """
+        namespaced_key = f'{self.namespace}:{self.generation()}:{key}'
+        value = self.backend.get(namespaced_key)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = build()
+        if value is not None:
+            self.backend.set(namespaced_key, value, timeout=timeout)
+        logger.debug("Built %s for the shared cache in %.1f ms", key, (time.perf_counter() - start) * 1000)
+        return value
+
+    def get_many_or_build(self, keys: Dict[K, str], build: Callable[[List[K]], Dict[K, T]],
+                          timeout: Optional[int] = None) -> Dict[K, T]:
+        """
+        Batched get_or_build: reads all keys at once and builds only the misses, in one call.
+
+        Args:
+            keys (Dict[K, str]): Cache key per item.
+            build (Callable[[List[K]], Dict[K, T]]): Builds the values of the missing items;
+                items it leaves out are not cached.
+            timeout (Optional[int]): Seconds to keep the built values; the backend default if None.
+
+        Returns:
+            Dict[K, T]: Cached and freshly built values; items without a value are left out.
+        """
+        generation = self.generation()
+        namespaced_keys = {item: f'{self.namespace}:{generation}:{key}' for item, key in keys.items()}
+        cached = self.backend.get_many(*namespaced_keys.values()) if namespaced_keys else []
+        values = {item: value for item, value in zip(namespaced_keys, cached) if value is not None}
+        missing = [item for item in keys if item not in values]
+        if missing:
+            built = {item: value for item, value in build(missing).items() if value is not None}
+            if built:
+                self.backend.set_many({namespaced_keys[item]: value for item, value in built.items()}, timeout=timeout)
+            values.update(built)
+        return values
+
+    def generation(self) -> str:
+        """
+        Returns the data version the keys are prefixed with, re-read at most once per check interval.
+        """
+        if time.monotonic() < self._generation_fresh_until:
+            return self._generation
+        with self._lock:
+            if time.monotonic() >= self._generation_fresh_until:
+                self._generation = self.version()
+                self._generation_fresh_until = time.monotonic() + self.generation_check_interval
+            return self._generation
+
+    def invalidate(self) -> None:
+        """
+        Re-reads the data version on the next lookup, so entries of an older version are no longer found.
+
+        The entries themselves are left for the backend to expire.
+        """
+        self._generation_fresh_until = float('-inf')
+        logger.info("Invalidated shared cache at generation %s", self._generation)
@@ -199,6 +199,7 @@
             budget: 'all',
             weather: 'all',
             population: 'all',
+            studies: 'all',
           };
 
           // Initialize last touched card
@@ -315,7 +316,7 @@
           if (!filterTypeElement) return;
           const filterType = filterTypeElement.textContent.toLowerCase();
           const filterValue =
-            button.dataset[filterType] || button.dataset.population || button.dataset.budget || button.dataset.weather;
+            button.dataset[filterType] || button.dataset.population || button.dataset.budget || button.dataset.weather || button.dataset.studies;
   
           // Remove active class from all buttons in the same filter group
           button
@@ -330,6 +331,7 @@
           if (filterType === 'budget') this.activeFilters.budget = filterValue;
           else if (filterType === 'weather') this.activeFilters.weather = filterValue;
           else if (filterType === 'size') this.activeFilters.population = filterValue;
+          else if (filterType === 'studies') this.activeFilters.studies = filterValue;
   
           this.updateFilterButtonState();
           this.filterCities();
@@ -398,30 +400,6 @@
             });
         },
         
-        /**
-         * Updates the temperature range for a city card.
-         * @param {HTMLElement} card - The city card element.
-         */
-        updateTempRange: function (card) {
-            const temps = {
-                min: parseInt(card.dataset.meanFebMin),
-                max: parseInt(card.dataset.meanJulMax)
-            };
-            const tempRange = card.querySelector('.city-grid__temp-range'); // Ensure this matches your updated HTML
-            tempRange.innerHTML = ''; // Clear existing bars
-
-            if (
-                temps.min !== undefined &&
-                temps.max !== undefined &&
-                temps.min !== '' &&
-                temps.max !== '' &&
-                !isNaN(temps.min) &&
-                !isNaN(temps.max)
-            ) {
-                this.createTempBar(temps.min, temps.max, tempRange);
-            }
-        },
-
         /**
          * Updates the rating bar for a specific rating type.
          * @param {HTMLElement} card - The city card element.
@@ -568,8 +546,9 @@
                 const country = (card.dataset.englishCountry || '').toLowerCase();
                 const localCountry = (card.dataset.localCountry || '').toLowerCase();
                 const monthlyBudget = parseFloat(card.dataset.monthlyBudget) || Infinity;
-                const weatherCategory = this.getWeatherCategory(card);
+                const weatherCategory = card.dataset.weatherCategory;
                 const population = parseInt(card.dataset.population) || 0;
+                const strongFields = (card.dataset.fields || '').split(' ');
                 
                 // Filter based on search term
                 const matchesSearch = searchTerm === '' || 
@@ -585,17 +564,16 @@
                                     (this.activeFilters.budget === '1000' && monthlyBudget <= 1000);
                 const matchesWeather = this.activeFilters.weather === 'all' || weatherCategory === this.activeFilters.weather;
                 const matchesPopulation = this.activeFilters.population === 'all' || this.getPopulationCategory(population) === this.activeFilters.population;
+                const matchesStudies = this.activeFilters.studies === 'all' || strongFields.includes(this.activeFilters.studies);
 
                 const link = card.closest('.city-grid__link'); // Get the parent link element
 
-                if (matchesSearch && matchesBudget && matchesWeather && matchesPopulation) {
+                if (matchesSearch && matchesBudget && matchesWeather && matchesPopulation && matchesStudies) {
                     link.style.display = 'block';
                     visibleLinks.push(link);
                 } else {
                     link.style.display = 'none';
                 }
-
-                this.updateTempRange(card);
             });
             this.sortVisibleCities(visibleLinks, sortBy);
         },
@@ -669,6 +647,7 @@
             budget: 'all',
             weather: 'all',
             population: 'all',
+            studies: 'all',
           };
   
           const filterButtons = document.querySelectorAll('.filter-popup__button');
@@ -677,7 +656,8 @@
               if (
                 button.dataset.population === 'all' ||
                 button.dataset.budget === 'all' ||
-                button.dataset.weather === 'all'
+                button.dataset.weather === 'all' ||
+                button.dataset.studies === 'all'
               ) {
                 button.classList.add('filter-popup__button--active');
               } else {
@@ -699,7 +679,8 @@
           const isAnyFilterActive =
             this.activeFilters.budget !== 'all' ||
             this.activeFilters.weather !== 'all' ||
-            this.activeFilters.population !== 'all';
+            this.activeFilters.population !== 'all' ||
+            this.activeFilters.studies !== 'all';
   
           if (isAnyFilterActive) {
             this.toggleFiltersButton.classList.add('search-bar__toggle-button--active');
@@ -763,12 +744,8 @@
             return;
           }
           
-          // Initialize variables
-          this.weatherDetail = document.getElementById('weatherDetail');
-          
           const cityId = window.location.pathname.split('/').pop(); 
           this.loadAndRenderRatings(cityId);
-          this.renderMonthlyWeather();
   
           // Read more button
           const readMoreBtn = document.getElementById('readMoreBtn');
@@ -905,47 +882,6 @@
             }
         },
 
-        /**
-         * Updates the weather detail for the city.
-         */
-        renderMonthlyWeather: function () {
-            if (!this.weatherDetail) {
-                console.error('Weather detail element not found');
-                return;
-            }
-           
-            const months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
-
-            months.forEach((month) => {
-                const minKey = `mean${month}Min`;
-                const maxKey = `mean${month}Max`;
-        
-                const minValue = this.weatherDetail.dataset[minKey];
-                const maxValue = this.weatherDetail.dataset[maxKey];
-
-                console.log(`Month: ${month}, Raw min (${minKey}): ${minValue}, Raw max (${maxKey}): ${maxValue}`);
-
-                // Use parseFloat instead of parseInt and round to nearest integer
-                const min = minValue !== undefined ? Math.round(parseFloat(minValue)) : null;
-                const max = maxValue !== undefined ? Math.round(parseFloat(maxValue)) : null;
-
-                console.log(`Month: ${month}, Parsed min: ${min}, Parsed max: ${max}`);
-                            
-                const tempRangeElement = document.getElementById(month.toLowerCase());
-                if (tempRangeElement) {
-                    if (min !== null && max !== null && !isNaN(min) && !isNaN(max)) {
-                        console.log(`Creating temp bar for ${month}: min=${min}, max=${max}`);
-                        this.createTempBar(min, max, tempRangeElement);
-                    } else {
-                        console.log(`No valid data for ${month}: min=${min}, max=${max}`);
-                    }
-                } else {
-                    console.warn(`Element for month "${month}" not found.`);
-                }
-            });
-        },
-  
-  
         /**
          * Creates the budget pie chart.
          */
@@ -1037,89 +973,6 @@
         /** ---------------- Utility Functions ---------------- **/
         
 
-        /**
-         * Creates a temperature bar element with a gradient based on the temperature range.
-         * @param {number} low - The low temperature.
-         * @param {number} high - The high temperature.
-         * @param {HTMLElement} tempRange - The container element for the temperature range.
-         */
-        createTempBar: function (low, high, tempRange) {
-            const TEMP_RANGE = { MIN: -11, MAX: 36 };
-            const COLOR_STOPS = [
-                [94, 79, 162], [50, 136, 189], [102, 194, 165], [171, 221, 164], [230, 245, 152],
-                [255, 255, 191], [254, 224, 139], [253, 174, 97], [244, 109, 67], [213, 62, 79], [158, 1, 66]
-            ]; // Colors for Spectral colormap
-        
-            // Interpolates a color based on the temperature.
-            function interpolateColor(temp) {
-                const normalizedTemp = Math.max(0, Math.min((temp - TEMP_RANGE.MIN) / (TEMP_RANGE.MAX - TEMP_RANGE.MIN), 1));
-                const index = normalizedTemp * (COLOR_STOPS.length - 1);
-                const lowerIndex = Math.floor(index);
-                const upperIndex = Math.ceil(index);
-                const fraction = index - lowerIndex;
-        
-                if (lowerIndex === upperIndex) return COLOR_STOPS[lowerIndex];
-        
-                if (!COLOR_STOPS[lowerIndex] || !COLOR_STOPS[upperIndex]) {
-                    return COLOR_STOPS[0]; // Return the first color as a fallback
-                }
-        
-                return COLOR_STOPS[lowerIndex].map((c, i) =>
-                    Math.round(c + fraction * (COLOR_STOPS[upperIndex][i] - c))
-                );
-            }
-        
-            // Creates a gradient based on temperature range.
-            function createGradient(low, high) {
-                const steps = 10;
-                return `linear-gradient(to right, ${[...Array(steps + 1)]
-                    .map((_, i) => {
-                        const temp = low + (high - low) * (i / steps);
-                        const color = interpolateColor(temp);
-                        return `rgb(${color.join(',')}) ${(i / steps) * 100}%`;
-                    })
-                    .join(', ')})`;
-            }
-        
-            const bar = document.createElement('div');
-            bar.className = `temp-bar`;
-        
-            const totalRange = TEMP_RANGE.MAX - TEMP_RANGE.MIN;
-            const rangeWidth = ((high - low) / totalRange) * 100;
-            const offsetLeft = ((low - TEMP_RANGE.MIN) / totalRange) * 100;
-        
-            Object.assign(bar.style, {
-                width: `${rangeWidth}%`,
-                left: `${offsetLeft}%`,
-                background: createGradient(low, high),
-                position: 'absolute',
-            });
-        
-            ['low', 'high'].forEach(type => {
-                const label = document.createElement('span');
-                label.className = `temp-bar__label temp-bar__label--${type}`; // Updated to BEM
-                label.textContent = `${type === 'low' ? low : high}°`;
-                bar.appendChild(label);
-            });
-        
-            tempRange.innerHTML = ''; // Clear existing content
-            tempRange.appendChild(bar);
-        },
-  
-        
-        /**
-         * Determines the weather category for a city card,
-         * @param {HTMLElement} card - The city card element.
-         * @returns {string} - The weather category ('cold', 'mild', 'warm').
-         */
-        getWeatherCategory: function (card) {
-            const winterLow = parseFloat(card.dataset.meanFebMin);
-        
-            if (winterLow < 0) return 'cold';
-            if (winterLow > 5) return 'warm';
-            return 'mild';
-        },
-        
         /**
          * Determines the population category for a city card.
          * @param {number} population - The population of the city.
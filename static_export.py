@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+
+class StaticExport:
+    """
+    Pre-rendered, precompressed copies of the pages anonymous visitors see.
+
+    `flask export-static` renders each page once into `<directory>/<page>.html`
+    plus a gzip copy. Requests for those pages are answered straight from the
+    in-memory gzip copies, without touching SQLAlchemy or Jinja, for as long
+    as the export matches the city read model it was rendered from. Only the
+    compressed copies are kept in memory; the rare client that does not accept
+    gzip gets them decompressed on the fly.
+    """
+
+    def __init__(self, directory: str, database_manager: Any, check_interval: float = 30.0):
+        """
+        Initializes the export.
+
+        Args:
+            directory (str): Directory holding the exported pages.
+            database_manager (DatabaseManager): Provides the read-model fingerprint.
+            check_interval (float): Seconds between freshness checks against the database.
+        """
+        self.directory = directory
+        self.database_manager = database_manager
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._pages: Dict[str, bytes] = {}
+        self._fingerprint: Optional[str] = None
+        self._manifest_mtime: Optional[float] = None
+        self._fresh = False
+        self._checked_at: Optional[float] = None
+
+    def export(self, pages: Dict[str, Callable[[], str]]) -> Dict[str, Any]:
+        """
+        Renders the pages and writes them, with gzip copies, to the export directory.
+
+        Files are replaced atomically and the manifest is written last, so a
+        running app never serves a half-written export.
+
+        Args:
+            pages (Dict[str, Callable[[], str]]): Page names mapped to functions rendering their HTML.
+
+        Returns:
+            Dict[str, Any]: The written manifest.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fingerprint = self.database_manager.fetch_read_model_fingerprint()
+        for page, render in pages.items():
+            html = render().encode('utf-8')
+            self._write(f"{page}.html", html)
+            self._write(f"{page}.html.gz", gzip.compress(html, compresslevel=9, mtime=0))
+
+        manifest = {
+            'fingerprint': fingerprint,
+            'pages': sorted(pages),
+            'exported_at': datetime.utcnow().isoformat(),
+        }
+        self._write(MANIFEST_FILE, json.dumps(manifest, indent=2).encode('utf-8'))
+        logger.info("Exported %s static pages to %s", len(pages), self.directory)
+        return manifest
+
+    def response(self, page: str, accept_encoding: str = '', status: int = 200,
+                 require_fresh: bool = True) -> Optional[Response]:
+        """
+        Builds a response for an exported page.
+
+        Args:
+            page (str): Page name used at export time.
+            accept_encoding (str): The request's Accept-Encoding header.
+            status (int): Status code of the response.
+            require_fresh (bool): Only serve the page if it matches the current data.
+
+        Returns:
+            Optional[Response]: The response, or None if the page should be rendered dynamically.
+        """
+        self._reload_if_changed()
+        if require_fresh and not self._is_fresh():
+            return None
+        compressed = self._pages.get(page)
+        if compressed is None:
+            return None
+
+        if 'gzip' in accept_encoding.lower():
+            response = Response(compressed, status=status, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(gzip.decompress(compressed), status=status, mimetype='text/html')
+        response.headers['Vary'] = 'Accept-Encoding, Cookie'
+        return response
+
+    def invalidate(self) -> None:
+        """
+        Forces a freshness check against the database on the next request.
+        """
+        self._checked_at = None
+
+    def _reload_if_changed(self) -> None:
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            mtime = os.path.getmtime(manifest_path)
+        except OSError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return
+            pages = {}
+            fingerprint = None
+            if mtime is not None:
+                try:
+                    with open(manifest_path) as file:
+                        manifest = json.load(file)
+                    for page in manifest['pages']:
+                        pages[page] = self._read(f"{page}.html.gz")
+                    fingerprint = manifest['fingerprint']
+                    logger.info("Loaded %s exported pages from %s", len(pages), self.directory)
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error("Ignoring unreadable static export in %s: %s", self.directory, e)
+                    pages = {}
+            self._pages = pages
+            self._fingerprint = fingerprint
+            self._manifest_mtime = mtime
+            self._checked_at = None
+
+    def _is_fresh(self) -> bool:
+        if not self._pages:
+            return False
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._fresh
+        try:
+            current = self.database_manager.fetch_read_model_fingerprint()
+        except Exception as e:
+            logger.error("Could not check static export freshness: %s", e)
+            current = None
+        fresh = current is not None and current == self._fingerprint
+        if self._fresh and not fresh:
+            logger.warning("Static export is stale, rendering pages dynamically until it is re-exported")
+        self._fresh = fresh
+        self._checked_at = now
+        return fresh
+
+    def _read(self, name: str) -> bytes:
+        with open(os.path.join(self.directory, name), 'rb') as file:
+            return file.read()
+
+    def _write(self, name: str, content: bytes) -> None:
+        path = os.path.join(self.directory, name)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(content)
+        os.replace(temporary_path, path)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import Float, case, cast, func, insert, literal, select, update
+
+from models import City, CityFieldStats, CityUniversityStats, University
+
+logger = logging.getLogger(__name__)
+
+FIELD_OF_STUDY_COLUMNS = [
+    'generic_students', 'education_students', 'arts_humanities_students', 'social_sciences_students',
+    'business_law_students', 'it_students', 'aec_students', 'agriculture_vet_students',
+    'med_students', 'services_students',
+]
+SUMMED_COLUMNS = ['total_students', 'mobile_students', *FIELD_OF_STUDY_COLUMNS]
+
+# Field keys used by the field-of-study filter, mapped to their student column and label
+FIELDS_OF_STUDY = {
+    'generic': ('generic_students', 'General programmes'),
+    'education': ('education_students', 'Education'),
+    'arts_humanities': ('arts_humanities_students', 'Arts & humanities'),
+    'social_sciences': ('social_sciences_students', 'Social sciences'),
+    'business_law': ('business_law_students', 'Business & law'),
+    'it': ('it_students', 'IT'),
+    'aec': ('aec_students', 'Engineering & architecture'),
+    'agriculture_vet': ('agriculture_vet_students', 'Agriculture & veterinary'),
+    'med': ('med_students', 'Medicine & health'),
+    'services': ('services_students', 'Services'),
+}
+
+# A city counts as strong in a field if it ranks this high by students in the field
+STRONG_FIELD_RANK = 25
+
+TOP_UNIVERSITIES = 10
+TOP_UNIVERSITY_COLUMNS = ['erasmus_code', 'name', 'english_name', 'size_class', 'total_students']
+
+
+class AggregatesNotBuilt(Exception):
+    """
+    Raised when the field index is read before `flask refresh_university_aggregates` filled it.
+    """
+
+
+def rebuild(session: Any) -> int:
+    """
+    Replaces the per-city university rollups and the per-field city index.
+
+    Counts, student totals and shares are computed by a single GROUP BY
+    INSERT ... SELECT; the top universities per city by a ROW_NUMBER window
+    query. Shares are weighted by total_students over the universities that
+    report both numbers. The field index is then derived from the rollups,
+    one INSERT ... SELECT per field.
+
+    Args:
+        session (Session): Open transaction.
+
+    Returns:
+        int: Number of cities with universities.
+    """
+    foreign_weight = func.sum(case((University.foreign_share.isnot(None), University.total_students)))
+    mobile_weight = func.sum(case((University.mobile_students.isnot(None), University.total_students)))
+    aggregates = select(
+        University.eurostat_code,
+        func.count(University.erasmus_code),
+        *[func.sum(getattr(University, column)) for column in SUMMED_COLUMNS],
+        func.sum(University.foreign_share * University.total_students) / func.nullif(foreign_weight, 0),
+        cast(func.sum(University.mobile_students), Float) / func.nullif(mobile_weight, 0),
+        literal('[]'),
+    ).group_by(University.eurostat_code)
+
+    session.query(CityFieldStats).delete()
+    session.query(CityUniversityStats).delete()
+    session.execute(insert(CityUniversityStats).from_select(
+        ['eurostat_code', 'university_count', *SUMMED_COLUMNS, 'foreign_share', 'mobile_share', 'top_universities'],
+        aggregates
+    ))
+
+    top_universities = fetch_top_universities(session)
+    if top_universities:
+        session.execute(update(CityUniversityStats), [
+            {'eurostat_code': eurostat_code, 'top_universities': json.dumps(universities)}
+            for eurostat_code, universities in top_universities.items()
+        ])
+
+    for field, (column, _) in FIELDS_OF_STUDY.items():
+        students = getattr(CityUniversityStats, column)
+        session.execute(insert(CityFieldStats).from_select(
+            ['field', 'eurostat_code', 'students', 'field_share', 'mobile_share', 'rank'],
+            select(
+                literal(field),
+                CityUniversityStats.eurostat_code,
+                students,
+                cast(students, Float) / func.nullif(CityUniversityStats.total_students, 0),
+                CityUniversityStats.mobile_share,
+                func.row_number().over(order_by=(students.desc(), CityUniversityStats.eurostat_code)),
+            ).where(students > 0)
+        ))
+
+    logger.info("Rebuilt university aggregates for %s cities", len(top_universities))
+    return len(top_universities)
+
+
+def fetch_field_ranking(session: Any, field: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Returns the cities with the most students in a field of study, from the field index.
+
+    Args:
+        session (Session): Open session.
+        field (str): Key of FIELDS_OF_STUDY.
+        limit (int): Maximum number of results.
+
+    Returns:
+        List[Dict[str, Any]]: Cities with students, field_share, mobile_share and rank, best first.
+
+    Raises:
+        AggregatesNotBuilt: If city_field_stats is empty.
+    """
+    rows = session.query(
+        CityFieldStats.eurostat_code, City.english_name, City.english_country, City.country_emoji,
+        CityFieldStats.students, CityFieldStats.field_share, CityFieldStats.mobile_share, CityFieldStats.rank,
+    ).join(City, City.eurostat_code == CityFieldStats.eurostat_code).filter(
+        CityFieldStats.field == field, CityFieldStats.rank <= limit
+    ).order_by(CityFieldStats.rank).all()
+    if not rows and session.query(CityFieldStats.eurostat_code).first() is None:
+        raise AggregatesNotBuilt("city_field_stats is empty; run `flask refresh_university_aggregates`")
+    return [row._asdict() for row in rows]
+
+
+def fetch_strong_fields(session: Any, max_rank: int = STRONG_FIELD_RANK) -> Dict[str, List[str]]:
+    """
+    Returns the fields each city is strong in, i.e. ranks within max_rank for.
+
+    Args:
+        session (Session): Open session.
+        max_rank (int): Lowest rank that still counts as strong.
+
+    Returns:
+        Dict[str, List[str]]: Field keys keyed by eurostat_code.
+    """
+    rows = session.query(CityFieldStats.eurostat_code, CityFieldStats.field).filter(
+        CityFieldStats.rank <= max_rank
+    ).order_by(CityFieldStats.field)
+    strong_fields: Dict[str, List[str]] = {}
+    for eurostat_code, field in rows:
+        strong_fields.setdefault(eurostat_code, []).append(field)
+    return strong_fields
+
+
+def fetch_top_universities(session: Any, limit: int = TOP_UNIVERSITIES) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns the largest universities of every city, by size class and then student count.
+
+    Args:
+        session (Session): Open session.
+        limit (int): Universities kept per city.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Universities keyed by eurostat_code, largest first.
+    """
+    ranked = select(
+        University.eurostat_code,
+        *[getattr(University, column) for column in TOP_UNIVERSITY_COLUMNS],
+        func.row_number().over(
+            partition_by=University.eurostat_code,
+            order_by=(
+                University.size_class.desc().nulls_last(),
+                University.total_students.desc().nulls_last(),
+                University.erasmus_code,
+            )
+        ).label('position'),
+    ).subquery()
+    rows = session.execute(
+        select(ranked).where(ranked.c.position <= limit).order_by(ranked.c.eurostat_code, ranked.c.position)
+    )
+
+    top_universities: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        top_universities.setdefault(row.eurostat_code, []).append(
+            {column: getattr(row, column) for column in TOP_UNIVERSITY_COLUMNS}
+        )
+    return top_universities
+
+
+def to_payload(stats: Any) -> Dict[str, Any]:
+    """
+    Turns a CityUniversityStats row into the dict stored in the city detail payload.
+    """
+    return {
+        'university_count': stats.university_count,
+        **{column: getattr(stats, column) for column in SUMMED_COLUMNS},
+        'foreign_share': stats.foreign_share,
+        'mobile_share': stats.mobile_share,
+        'top_universities': json.loads(stats.top_universities),
+    }
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ('name', 'picture', 'email_verified')
+
+# Stored for new users when Auth0 leaves the field out; existing users keep their stored value
+PROFILE_DEFAULTS = {'picture': '', 'email_verified': False}
+
+
+class UserProfileSync:
+    """
+    Keeps the users table in line with the Auth0 profile, writing only real changes.
+
+    Profiles are the dicts stored in session['user'] by /callback; optional fields
+    Auth0 did not send are absent rather than defaulted. last_login is
+    coarsened: it is only rewritten once the stored value is older than the
+    configured resolution, so repeated logins don't each cost a write (and a
+    LiteFS replication event).
+    """
+
+    def __init__(self, database_manager: Any, last_login_resolution: timedelta = timedelta(hours=1)):
+        """
+        Initializes the sync with a DatabaseManager.
+
+        Args:
+            database_manager (DatabaseManager): Provides database sessions.
+            last_login_resolution (timedelta): Minimum age of last_login before it is refreshed.
+        """
+        self.database_manager = database_manager
+        self.last_login_resolution = last_login_resolution
+
+    def needs_write(self, profile: Dict[str, Any]) -> bool:
+        """
+        Checks, with a read-only query, whether syncing the profile would write anything.
+
+        Safe to call on read-only replicas.
+
+        Args:
+            profile (Dict[str, Any]): Session user profile.
+
+        Returns:
+            bool: True if the stored user is missing or out of date.
+        """
+        with self.database_manager.get_session() as session:
+            user = session.query(User).filter_by(auth0_id=profile['user_id']).first()
+            return bool(self._changes(user, profile, datetime.utcnow()))
+
+    def sync(self, profile: Dict[str, Any]) -> bool:
+        """
+        Creates or updates the stored user, writing only the fields that changed.
+
+        Must run where the database is writable.
+
+        Args:
+            profile (Dict[str, Any]): Session user profile.
+
+        Returns:
+            bool: True if anything was written.
+        """
+        now = datetime.utcnow()
+        with self.database_manager.get_session() as session:
+            user = session.query(User).filter_by(auth0_id=profile['user_id']).first()
+            changes = self._changes(user, profile, now)
+            if not changes:
+                return False
+            if user is None:
+                session.add(User(auth0_id=profile['user_id'], email=profile['email'], **changes))
+                logger.info("Created user %s", profile['email'])
+            else:
+                for field, value in changes.items():
+                    setattr(user, field, value)
+                logger.info("Updated %s for user %s", ', '.join(sorted(changes)), user.email)
+            session.commit()
+            return True
+
+    def _changes(self, user: Optional[User], profile: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """
+        Returns the column values that differ between the stored user and the profile.
+        """
+        changes = {}
+        for field in PROFILE_FIELDS:
+            if field not in profile:
+                if user is None and field in PROFILE_DEFAULTS:
+                    changes[field] = PROFILE_DEFAULTS[field]
+                continue
+            if user is None or getattr(user, field) != profile[field]:
+                changes[field] = profile[field]
+        if user is None or user.last_login is None or now - user.last_login >= self.last_login_resolution:
+            changes['last_login'] = now
+        return changes
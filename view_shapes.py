@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+
+from models import City
+
+
+@dataclass(frozen=True)
+class ViewShape:
+    """
+    Declares every City column and relation column a view reads.
+
+    The shape drives the query options used to load cities for the view, so
+    anything the enrich code reads is fetched in the same round-trip and
+    anything it does not declare raises instead of issuing a lazy query.
+    """
+    columns: Tuple[str, ...]
+    relations: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    def extend(self, columns: Tuple[str, ...] = (), relations: Dict[str, Tuple[str, ...]] = None) -> 'ViewShape':
+        """
+        Returns a new shape with additional columns and relation columns.
+
+        Args:
+            columns (Tuple[str, ...]): Extra City columns.
+            relations (Dict[str, Tuple[str, ...]]): Extra relation columns keyed by relation name.
+
+        Returns:
+            ViewShape: The combined shape.
+        """
+        merged = dict(self.relations)
+        for name, relation_columns in (relations or {}).items():
+            merged[name] = merged.get(name, ()) + tuple(c for c in relation_columns if c not in merged.get(name, ()))
+        return ViewShape(
+            columns=self.columns + tuple(c for c in columns if c not in self.columns),
+            relations=merged
+        )
+
+    def query_options(self, selectin: Tuple[str, ...] = ()) -> List[Any]:
+        """
+        Builds the loader options for a City query of this shape.
+
+        Args:
+            selectin (Tuple[str, ...]): Relations to load with one extra IN query instead of a join.
+                Use this for collections when loading many cities, so the joined rows don't multiply.
+
+        Returns:
+            List[Any]: SQLAlchemy loader options.
+        """
+        options = [load_only(*[getattr(City, column) for column in self.columns], raiseload=True)]
+        for name, relation_columns in self.relations.items():
+            relationship = getattr(City, name)
+            target = relationship.property.mapper.class_
+            loader = selectinload if name in selectin else joinedload
+            options.append(
+                loader(relationship).load_only(
+                    *[getattr(target, column) for column in relation_columns], raiseload=True
+                )
+            )
+        options.append(raiseload('*'))
+        return options
+
+    def accessed(self) -> Set[Tuple[str, str]]:
+        """
+        Returns the declared (relation, column) pairs, with '' as the relation for City columns.
+        """
+        declared = {('', column) for column in self.columns}
+        for name, relation_columns in self.relations.items():
+            declared.update((name, column) for column in relation_columns)
+        return declared
+
+
+CITY_OVERVIEW_SHAPE = ViewShape(
+    columns=(
+        'eurostat_code', 'local_name', 'english_name', 'local_country', 'english_country',
+        'country_emoji', 'population', 'erasmus_population', 'image_slug',
+    ),
+    relations={
+        'cost_of_living': ('monthly_budget', 'cost_of_living_plus_rent_index'),
+        'climate': ('mean_feb_min', 'mean_jul_max'),
+        'climate_summary': ('temperatures', 'weather_category'),
+        'metrics': ('safety_index', 'university_count', 'public_transport_satisfaction'),
+    }
+)
+
+CITY_DETAIL_SHAPE = CITY_OVERVIEW_SHAPE.extend(
+    columns=('lat', 'lon'),
+    relations={
+        'climate_summary': ('winter_mean', 'summer_mean'),
+        'cost_of_living': ('rent_index', 'groceries_index'),
+        'housing': ('rent_per_sqm', 'area_per_person', 'erasmus_factor'),
+        'transport_budget': ('monthly_ticket',),
+        'guide': ('text',),
+        'universities': (
+            'erasmus_code', 'name', 'english_name', 'category', 'size_class',
+            'url', 'lat', 'lon', 'total_students',
+        ),
+        'university_stats': (
+            'university_count', 'total_students', 'mobile_students', 'generic_students',
+            'education_students', 'arts_humanities_students', 'social_sciences_students',
+            'business_law_students', 'it_students', 'aec_students', 'agriculture_vet_students',
+            'med_students', 'services_students', 'foreign_share', 'mobile_share', 'top_universities',
+        ),
+    }
+)
+
+
+# Placeholders for columns whose text has a format of its own, keyed by (table, column)
+PLACEHOLDERS: Dict[Tuple[str, str], Any] = {
+    ('city_university_stats', 'top_universities'): '[]',  # JSON list
+}
+
+_TYPE_PLACEHOLDERS = {
+    bool: False,
+    int: 1,
+    float: 1.0,
+    Decimal: Decimal(1),
+    str: '',
+    date: date(2000, 1, 1),
+    datetime: datetime(2000, 1, 1),
+}
+
+
+def _placeholder(column: Any) -> Any:
+    """
+    Returns a value of the column's Python type for the enrich code to work with.
+    """
+    if (column.table.name, column.name) in PLACEHOLDERS:
+        return PLACEHOLDERS[(column.table.name, column.name)]
+    python_type = column.type.python_type
+    if python_type is bytes:
+        return bytes(column.type.length or 0)
+    return _TYPE_PLACEHOLDERS[python_type]
+
+
+class _AccessRecorder:
+    """
+    Stand-in for a model instance that records every mapped attribute read from it.
+
+    Columns read as placeholders of their own type, so the enrich code runs as on real rows.
+    """
+
+    def __init__(self, model: Any, relation: str, accessed: Set[Tuple[str, str]]):
+        self._model = model
+        self._relation = relation
+        self._accessed = accessed
+
+    def __getattr__(self, name: str) -> Any:
+        mapper = inspect(self._model)
+        if name in mapper.relationships:
+            relationship = mapper.relationships[name]
+            recorder = _AccessRecorder(relationship.mapper.class_, name, self._accessed)
+            return [recorder] if relationship.uselist else recorder
+        if name in mapper.columns:
+            self._accessed.add((self._relation, name))
+            return _placeholder(mapper.columns[name])
+        raise AttributeError(name)
+
+
+def find_shape_drift(shape: ViewShape, enrich: Callable[[Any], Any]) -> Dict[str, Set[Tuple[str, str]]]:
+    """
+    Runs an enrich function against a recording City and compares its reads with a shape.
+
+    Args:
+        shape (ViewShape): The declared shape of the view.
+        enrich (Callable[[Any], Any]): The enrich function feeding the view.
+
+    Returns:
+        Dict[str, Set[Tuple[str, str]]]: 'undeclared' reads that would hit the database lazily
+                                         and 'unused' declarations that are loaded but never read.
+    """
+    accessed: Set[Tuple[str, str]] = set()
+    enrich(_AccessRecorder(City, '', accessed))
+    declared = shape.accessed()
+    return {
+        'undeclared': accessed - declared,
+        'unused': declared - accessed,
+    }
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from sqlalchemy.exc import OperationalError
+
+from models import Feedback, User
+
+logger = logging.getLogger(__name__)
+
+
+class WriteJournal:
+    """
+    Append-only JSON-lines journal shared by every worker process on the machine.
+
+    Appends take an exclusive file lock so records from concurrent workers never
+    interleave. Consumers read from the committed offset kept next to the journal
+    and compact the file once everything has been committed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the journal, creating its directory if needed.
+
+        Args:
+            path (str): Path of the journal file.
+        """
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.lock_path = f"{path}.lock"
+        self.drain_lock_path = f"{path}.drain"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _flock(self, path: str, blocking: bool = True):
+        with open(path, 'a') as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Durably appends a record to the journal.
+
+        Args:
+            record (Dict[str, Any]): JSON-serializable record.
+        """
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._flock(self.lock_path):
+            with open(self.path, 'a', encoding='utf-8') as journal:
+                journal.write(line)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def exclusive_consumer(self):
+        """
+        Context manager yielding True if this process may consume the journal right now.
+        """
+        return self._flock(self.drain_lock_path, blocking=False)
+
+    def read_pending(self, max_records: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Reads up to max_records uncommitted records.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: The records and the offset just past the last one.
+        """
+        pending, offset = self._scan(max_records)
+        return [record for record, _ in pending], offset
+
+    def read_pending_with_offsets(self, max_records: int) -> List[Tuple[Dict[str, Any], int]]:
+        """
+        Reads up to max_records uncommitted records, each with the offset just past it.
+
+        Returns:
+            List[Tuple[Dict[str, Any], int]]: Records paired with their end offsets.
+        """
+        return self._scan(max_records)[0]
+
+    def _scan(self, max_records: int) -> Tuple[List[Tuple[Dict[str, Any], int]], int]:
+        offset = self.committed_offset()
+        pending = []
+        try:
+            with open(self.path, 'rb') as journal:
+                journal.seek(offset)
+                while len(pending) < max_records:
+                    line = journal.readline()
+                    if not line.endswith(b'\n'):
+                        break  # nothing left, or a record still being written
+                    offset += len(line)
+                    try:
+                        pending.append((json.loads(line), offset))
+                    except json.JSONDecodeError:
+                        logger.error("Skipping corrupt journal record in %s: %r", self.path, line[:80])
+        except FileNotFoundError:
+            pass
+        return pending, offset
+
+    def commit(self, offset: int) -> None:
+        """
+        Marks everything before offset as applied and compacts the journal when it is fully drained.
+
+        Args:
+            offset (int): Offset returned by read_pending.
+        """
+        with self._flock(self.lock_path):
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if offset >= size:
+                open(self.path, 'w').close()
+                offset = 0
+            temporary_path = f"{self.offset_path}.tmp"
+            with open(temporary_path, 'w') as offset_file:
+                offset_file.write(str(offset))
+                offset_file.flush()
+                os.fsync(offset_file.fileno())
+            os.replace(temporary_path, self.offset_path)
+
+    def committed_offset(self) -> int:
+        """
+        Returns the offset up to which records have been applied.
+        """
+        try:
+            with open(self.offset_path) as offset_file:
+                return int(offset_file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+
+class WriteQueue:
+    """
+    Durable write-behind queue for small user submissions.
+
+    Request threads only journal the write; a background thread drains the
+    journal in batches, applying each batch in a single transaction. Delivery
+    is at-least-once: a crash between commit and offset update replays the
+    batch, which the waitlist handler absorbs through its email dedup.
+
+    On read-only replicas the journal is an outbox instead: batches are
+    handed to a forwarder that ships them to the primary's queue, and
+    listeners run on the primary when the writes are applied there.
+    """
+
+    def __init__(self, journal: WriteJournal, database_manager: Any,
+                 batch_size: int = 200, flush_interval: float = 0.5,
+                 forwarder: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        Initializes the queue.
+
+        Args:
+            journal (WriteJournal): Journal backing the queue.
+            database_manager (DatabaseManager): Provides transactional sessions.
+            batch_size (int): Maximum records applied per transaction.
+            flush_interval (float): Seconds between drains when idle.
+            forwarder (Optional[Callable[[List[Dict[str, Any]]], None]]): Ships batches of journal
+                records to the primary instead of applying them; see WriteForwarder.
+        """
+        self.journal = journal
+        self.database_manager = database_manager
+        self.forwarder = forwarder
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.handlers: Dict[str, Callable[[Any, List[Dict[str, Any]]], List[Any]]] = {
+            'feedback': apply_feedback,
+            'waitlist': apply_waitlist,
+            'ranking_weights': apply_ranking_weights,
+        }
+        self.listeners: Dict[str, List[Callable[[List[Any]], None]]] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> None:
+        """
+        Journals a write and wakes the drainer.
+
+        Args:
+            kind (str): Handler name, e.g. 'feedback' or 'waitlist'.
+            payload (Dict[str, Any]): JSON-serializable payload for the handler.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for write kind '{kind}'")
+        self.journal.append({'kind': kind, 'payload': payload, 'queued_at': datetime.utcnow().isoformat()})
+        self._wakeup.set()
+
+    def accept_forwarded(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Journals records forwarded by a replica's outbox, keeping their original queued_at.
+
+        Args:
+            records (List[Dict[str, Any]]): Journal records with 'kind', 'payload' and 'queued_at'.
+
+        Returns:
+            int: Number of records journaled.
+
+        Raises:
+            ValueError: If a record is malformed or of an unknown kind; nothing is journaled then.
+        """
+        for record in records:
+            if not isinstance(record, dict) or record.get('kind') not in self.handlers \
+                    or not isinstance(record.get('payload'), dict):
+                raise ValueError(f"Invalid forwarded write: {record!r}")
+        for record in records:
+            self.journal.append({'kind': record['kind'], 'payload': record['payload'],
+                                 'queued_at': record.get('queued_at') or datetime.utcnow().isoformat()})
+        self._wakeup.set()
+        return len(records)
+
+    def add_listener(self, kind: str, callback: Callable[[List[Any]], None]) -> None:
+        """
+        Registers a callback receiving the handler results of each committed batch of a kind.
+        """
+        self.listeners.setdefault(kind, []).append(callback)
+
+    def start(self) -> None:
+        """
+        Starts the background drainer thread.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stops the drainer after a final drain.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self.drain():
+                    pass
+            except Exception as e:
+                logger.error("Write queue drain failed, will retry: %s", e)
+                time.sleep(self.flush_interval)
+        try:
+            self.drain()
+        except Exception as e:
+            logger.error("Final write queue drain failed: %s", e)
+
+    def drain(self) -> int:
+        """
+        Applies one batch of pending writes, if this process holds the consumer lock.
+
+        Returns:
+            int: Number of records consumed.
+        """
+        with self.journal.exclusive_consumer() as acquired:
+            if not acquired:
+                return 0
+            records, offset = self.journal.read_pending(self.batch_size)
+            if not records:
+                if offset != self.journal.committed_offset():
+                    self.journal.commit(offset)  # only corrupt records were read
+                return 0
+            if self.forwarder is not None:
+                # A failed shipment raises and leaves the batch in the outbox for the next drain
+                self.forwarder(records)
+                self.journal.commit(offset)
+                return len(records)
+            try:
+                results = self._apply(records)
+            except OperationalError:
+                # The database is unavailable or locked; leave the batch in the journal
+                raise
+            except Exception as e:
+                logger.error("Batch of %s writes failed, applying one by one: %s", len(records), e)
+                results = {}
+                for record in records:
+                    try:
+                        for kind, kind_results in self._apply([record]).items():
+                            results.setdefault(kind, []).extend(kind_results)
+                    except OperationalError:
+                        raise
+                    except Exception as record_error:
+                        logger.error("Dropping write that cannot be applied: %r (%s)", record, record_error)
+            self.journal.commit(offset)
+
+        for kind, kind_results in results.items():
+            for callback in self.listeners.get(kind, []):
+                try:
+                    callback(kind_results)
+                except Exception as e:
+                    logger.error("Write queue listener for '%s' failed: %s", kind, e)
+        return len(records)
+
+    def _apply(self, records: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            if record.get('kind') not in self.handlers:
+                logger.error("Skipping write with unknown kind: %r", record)
+                continue
+            by_kind.setdefault(record['kind'], []).append(record['payload'])
+
+        results = {}
+        with self.database_manager.get_session() as session:
+            for kind, payloads in by_kind.items():
+                results[kind] = self.handlers[kind](session, payloads)
+        logger.info("Applied %s queued writes", sum(len(p) for p in by_kind.values()))
+        return results
+
+
+class WriteForwarder:
+    """
+    Ships outbox batches from a replica to the primary's /internal/writes endpoint.
+
+    The primary journals them into its own write queue, so a replica answers
+    feedback and waitlist posts locally instead of replaying the request to
+    the primary. Forwarding is at-least-once like the queue itself.
+    """
+
+    def __init__(self, url: str, token: str, timeout: float = 10.0):
+        """
+        Initializes the forwarder.
+
+        Args:
+            url (str): URL of the primary's /internal/writes endpoint.
+            token (str): Shared secret sent in the X-Write-Forward-Token header.
+            timeout (float): Seconds to wait for the primary.
+        """
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def __call__(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Sends a batch of journal records to the primary.
+
+        A batch the primary rejects as malformed is dropped rather than retried forever.
+
+        Raises:
+            requests.RequestException: If the primary is unreachable or failed to journal the batch.
+        """
+        response = self.session.post(
+            self.url, json={'records': records}, timeout=self.timeout,
+            headers={'X-Write-Forward-Token': self.token}
+        )
+        if response.status_code == 400:
+            logger.error("Primary rejected %s forwarded writes, dropping them: %s", len(records), response.text[:200])
+            return
+        response.raise_for_status()
+        logger.info("Forwarded %s queued writes to the primary", len(records))
+
+
+def apply_feedback(session: Any, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Inserts queued feedback.
+
+    Args:
+        session (Session): Open transaction.
+        payloads (List[Dict[str, Any]]): Feedback payloads with 'content' and 'timestamp'.
+
+    Returns:
+        List[Dict[str, Any]]: The inserted payloads.
+    """
+    session.add_all([
+        Feedback(content=payload['content'], timestamp=datetime.fromisoformat(payload['timestamp']))
+        for payload in payloads
+    ])
+    return payloads
+
+
+def apply_waitlist(session: Any, payloads: List[Dict[str, Any]]) -> List[str]:
+    """
+    Adds queued waitlist emails, skipping ones already registered or repeated in the batch.
+
+    Args:
+        session (Session): Open transaction.
+        payloads (List[Dict[str, Any]]): Waitlist payloads with 'email'.
+
+    Returns:
+        List[str]: Emails that were newly added.
+    """
+    emails = list(dict.fromkeys(payload['email'] for payload in payloads))
+    existing = {email for (email,) in session.query(User.email).filter(User.email.in_(emails))}
+    added = [email for email in emails if email not in existing]
+    session.add_all([User(email=email, auth0_id=f"waitlist_{email}") for email in added])
+    return added
+
+
+def apply_ranking_weights(session: Any, payloads: List[Dict[str, Any]]) -> List[str]:
+    """
+    Stores queued moonScore ranking weights; the last write per user in the batch wins.
+
+    Args:
+        session (Session): Open transaction.
+        payloads (List[Dict[str, Any]]): Payloads with 'auth0_id' and 'weights' (sub-score name to weight).
+
+    Returns:
+        List[str]: auth0_ids of the users whose weights were updated.
+    """
+    latest = {payload['auth0_id']: payload['weights'] for payload in payloads}
+    users = session.query(User).filter(User.auth0_id.in_(list(latest))).all()
+    for user in users:
+        for name, weight in latest[user.auth0_id].items():
+            setattr(user, f'weight_{name}', weight)
+    return [user.auth0_id for user in users]